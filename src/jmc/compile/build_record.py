@@ -0,0 +1,212 @@
+"""Module recording the input files of a build to skip building again when none of them changed"""
+from hashlib import sha256
+from json import JSONDecodeError, dumps, loads
+from pathlib import Path
+from typing import Any, Mapping
+
+from .log import Logger
+
+logger = Logger(__name__)
+BUILD_RECORD_FILE_NAME = 'jmc_build.json'
+BUILD_RECORD_VERSION = 2
+
+
+def hash_string(string: str) -> str:
+    """
+    Hash content of a file
+
+    :param string: Content of the file
+    :return: Hex digest
+    """
+    return sha256(string.encode()).hexdigest()
+
+
+def hash_file(path: Path) -> str | None:
+    """
+    Hash content of a file on disk
+
+    :param path: Path to the file
+    :return: Hex digest, None if the file doesn't exist
+    """
+    try:
+        with path.open('r') as file:
+            return hash_string(file.read())
+    except OSError:
+        return None
+
+
+def hash_folder(path: Path) -> str:
+    """
+    Hash names of JMC files inside a folder (for `@import "folder/*"`)
+
+    :param path: Path to the folder
+    :return: Hex digest
+    """
+    return hash_string('\n'.join(sorted(path_.name for path_ in path.glob("*.jmc"))))
+
+
+def hash_imports(path_str: str, files: Mapping[str, str | None], folders: Mapping[str, str],
+                 imports: Mapping[str, list[str]]) -> str:
+    """
+    Hash content of a JMC file and everything it imports (directly or indirectly)
+
+    :param path_str: Resolved path of the JMC file
+    :param files: Dictionary of resolved path and content hash
+    :param folders: Dictionary of path to a folder imported with `@import "folder/*"` and hash of its JMC file names
+    :param imports: Dictionary of resolved path of a JMC file and resolved paths (of files or folders) it imports
+    :return: Hex digest
+    """
+    hashes: dict[str, str | None] = {}
+    stack = [path_str]
+    while stack:
+        path_str = stack.pop()
+        if path_str in hashes:
+            continue
+        hashes[path_str] = files[path_str] if path_str in files else folders.get(
+            path_str)
+        stack.extend(imports.get(path_str, []))
+    return hash_string(dumps(sorted(hashes.items())))
+
+
+class BuildRecord:
+    """
+    Record of every file a build read, their content hashes and the `@import` graph between them
+
+    :param settings: Everything else the build depends on (configuration, compiler version)
+    :param files: Dictionary of resolved path and content hash (None if the file didn't exist)
+    :param folders: Dictionary of path to a folder imported with `@import "folder/*"` and hash of its JMC file names
+    :param imports: Dictionary of resolved path of a JMC file and resolved paths (of files or folders) it imports
+    """
+    __slots__ = ('settings', 'files', 'folders', 'imports')
+
+    settings: dict[str, Any]
+    """Everything else the build depends on (configuration, compiler version)"""
+    files: dict[str, str | None]
+    """Dictionary of resolved path and content hash (None if the file didn't exist)"""
+    folders: dict[str, str]
+    """Dictionary of path to a folder imported with `@import "folder/*"` and hash of its JMC file names"""
+    imports: dict[str, list[str]]
+    """Dictionary of resolved path of a JMC file and resolved paths (of files or folders) it imports"""
+
+    def __init__(self, settings: dict[str, Any], files: dict[str, str | None],
+                 folders: dict[str, str], imports: dict[str, list[str]]) -> None:
+        self.settings = settings
+        self.files = files
+        self.folders = folders
+        self.imports = imports
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildRecord | None":
+        """
+        Read a build record
+
+        :param path: Path to the build record
+        :return: Build record, None if it doesn't exist or is unreadable
+        """
+        try:
+            with path.open('r') as file:
+                return cls.loads(file.read())
+        except OSError:
+            logger.info(f"Build record not found: {path}")
+            return None
+
+    @classmethod
+    def loads(cls, string: str) -> "BuildRecord | None":
+        """
+        Read a build record from string
+
+        :param string: Content of the build record
+        :return: Build record, None if it's invalid
+        """
+        try:
+            json = loads(string)
+            if json["version"] != BUILD_RECORD_VERSION:
+                return None
+            return cls(json["settings"], json["files"], json["folders"], json["imports"])
+        except (JSONDecodeError, KeyError, TypeError):
+            logger.info("Build record is invalid")
+            return None
+
+    def save(self, path: Path) -> None:
+        """
+        Write the build record
+
+        :param path: Path to write the build record to
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('w+') as file:
+            file.write(self.dumps())
+
+    def dumps(self) -> str:
+        """
+        Turn the build record into string
+
+        :return: Content of the build record
+        """
+        return dumps({
+            "version": BUILD_RECORD_VERSION,
+            "settings": self.settings,
+            "files": self.files,
+            "folders": self.folders,
+            "imports": self.imports
+        }, indent=2)
+
+    def get_changed_files(self) -> set[str]:
+        """
+        Get files whose content changed and folders whose JMC files were added or removed since the build
+
+        :return: Set of paths
+        """
+        return {path_str for path_str, file_hash in self.files.items()
+                if hash_file(Path(path_str)) != file_hash} | {
+                    path_str for path_str, folder_hash in self.folders.items()
+                    if hash_folder(Path(path_str)) != folder_hash}
+
+    def get_dependents(self, path_strs: set[str]) -> set[str]:
+        """
+        Get JMC files that import any of the files (directly or indirectly), including the files themselves
+
+        :param path_strs: Set of resolved paths
+        :return: Set of resolved paths
+        """
+        imported_by: dict[str, list[str]] = {}
+        for path_str, imported_path_strs in self.imports.items():
+            for imported_path_str in imported_path_strs:
+                imported_by.setdefault(imported_path_str, []).append(path_str)
+
+        dependents = set(path_strs)
+        stack = list(path_strs)
+        while stack:
+            for path_str in imported_by.get(stack.pop(), []):
+                if path_str not in dependents:
+                    dependents.add(path_str)
+                    stack.append(path_str)
+        return dependents
+
+    def get_reusable_files(self) -> dict[str, str]:
+        """
+        Get JMC files whose parsing results can be reused (Neither they nor anything they import changed since the build)
+
+        :return: Dictionary of resolved path and hash of the file and everything it imports (from hash_imports)
+        """
+        dependents = self.get_dependents(self.get_changed_files())
+        return {path_str: hash_imports(path_str, self.files, self.folders, self.imports)
+                for path_str in self.imports if path_str not in dependents}
+
+    def is_up_to_date(self, settings: dict[str, Any]) -> bool:
+        """
+        Whether building again would give the same result
+
+        :param settings: Current settings
+        :return: Whether settings, every file and every imported folder are unchanged
+        """
+        if settings != self.settings:
+            logger.info("Build settings changed")
+            return False
+        changed = self.get_changed_files()
+        if changed:
+            logger.info("Changed files: " + ", ".join(sorted(changed)))
+            logger.info("Affected JMC files: " +
+                        ", ".join(sorted(self.get_dependents(changed))))
+            return False
+        return True
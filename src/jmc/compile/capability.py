@@ -0,0 +1,22 @@
+"""Module containing which minecraft commands each pack_format supports, for choosing how JMC features are turned into commands"""
+
+CAPABILITIES: dict[str, tuple[int, str]] = {
+    "return": (15, "`return <value>` (1.20)"),
+    "macro": (18, "Function macros, `$` lines and `function ... with` (1.20.2)"),
+    "random": (18, "`random value <range>` (1.20.2)"),
+    "return_run": (26, "`return run` that always returns, even if the command has no result (1.20.3)"),
+    "execute_if_function": (26, "`execute if/unless function` (1.20.3)"),
+}
+"""Dictionary of capability's name and (minimum pack_format, description)"""
+
+
+def is_supported(capability: str, pack_format: str | int) -> bool:
+    """
+    Whether a pack_format supports a capability
+
+    :param capability: Name of the capability (from CAPABILITIES)
+    :param pack_format: pack_format of the datapack
+    :raises KeyError: Unknown capability
+    :return: Whether the capability can be used
+    """
+    return int(pack_format) >= CAPABILITIES[capability][0]
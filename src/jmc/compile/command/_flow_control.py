@@ -1,10 +1,16 @@
 """Module for parsing flow controls (if-e;se, while, etc.), called from command/flow_control.py"""
 
+import re
+
 from .condition import parse_condition
 from .utils import ScoreboardPlayer, find_scoreboard_player_type, PlayerType
 from ..tokenizer import Token, Tokenizer, TokenType
-from ..datapack import DataPack
+from ..command_ir import Execute, RawCommand, ScoreboardPlayers, parse_command
+from ..datapack import DataPack, Function
 from ..exception import JMCSyntaxException
+from ..header import Header
+from ..optimizer import is_inlinable
+from ..utils import is_number
 
 
 def if_(command: list[Token], datapack: DataPack,
@@ -123,67 +129,253 @@ def do(command: list[Token], datapack: DataPack, tokenizer: Tokenizer) -> None:
 
 
 SWITCH_CASE_NAME = 'switch_case'
+SWITCH_STORAGE_PATH = 'switch'
+"""Path in the storage of JMC holding macro arguments of switch-case jump tables"""
+LINEAR_SWITCH_MAX_CASES = 4
+"""Maximum amount of cases for `#switch auto` to check every case one by one"""
+MACRO_SWITCH_MAX_SPREAD = 2
+"""Maximum (range of case numbers / amount of cases) of a jump table, sparser switch-cases use a binary tree"""
+
 
+def get_match_range(cases: list[int]) -> str:
+    """
+    Get the range of `matches` covering sorted cases
+
+    :param cases: Sorted case numbers
+    :return: `<min>..<max>` or `<case>` if there's only 1 case
+    """
+    if cases[0] == cases[-1]:
+        return str(cases[0])
+    return f"{cases[0]}..{cases[-1]}"
 
-def __parse_switch_binary(min_: int, max_: int, count: str, datapack: DataPack,
-                          func_contents: list[list[str]], scoreboard_player: ScoreboardPlayer, name: str) -> None:
+
+def get_weighted_split(weights: list[int]) -> int:
+    """
+    Get where to split cases so that both sides are as close in total weight as possible
+
+    :param weights: Weight of each case (at least 2 cases)
+    :return: Index of the first case of the right side
+    """
+    total = sum(weights)
+    best_index = len(weights) // 2
+    best_difference = None
+    left = 0
+    for index in range(1, len(weights)):
+        left += weights[index - 1]
+        difference = abs(total - 2 * left)
+        if best_difference is None or difference < best_difference:
+            best_index, best_difference = index, difference
+    return best_index
+
+
+def __parse_switch_tree(cases: list[int], weights: list[int] | None, count: str, datapack: DataPack,
+                        func_contents: dict[int, list[str]], scoreboard_player: ScoreboardPlayer, name: str) -> None:
     """
     For recursion of JMC switch-case's binary tree
 
-    :param min_: Minimum integer to trigger minecraft function
-    :param max_: Maximum integer to trigger minecraft function
+    :param cases: Sorted case numbers the function handles
+    :param weights: Weight of each case to split by, None to split in half
     :param count: Private function count for creating name of private function
     :param datapack: Datapack object
-    :param func_contents: List of function content(List of commands(string)) given by user
+    :param func_contents: Dictionary of case number and function content(List of commands(string)) given by user
     :param scoreboard_player: Minecraft scoreboard objective to check the integer
     :param name: Private function's group name
-    :raises ValueError: min_ is more than max_
+    :raises ValueError: No case
     """
-    if max_ < min_:
-        raise ValueError("min_ is more than max_ in __parse_switch_binary")
-    if max_ == min_:
+    if not cases:
+        raise ValueError("cases is empty in __parse_switch_tree")
+    if len(cases) == 1:
         datapack.add_raw_private_function(
-            name, func_contents[min_ - 1], count)
-    else:
-        count_less = datapack.get_count(name)
-        count_more = datapack.get_count(name)
+            name, func_contents[cases[0]], count)
+        return
 
-        half2 = min_ + (max_ - min_ + 1) // 2
-        half1 = half2 - 1
+    count_less = datapack.get_count(name)
+    count_more = datapack.get_count(name)
+    split = len(cases) // 2 if weights is None else get_weighted_split(weights)
 
-        match_less = f"{min_}..{half1}" if min_ != half1 else min_
-        match_more = f"{half2}..{max_}" if half2 != max_ else max_
+    if isinstance(scoreboard_player.value, int):
+        raise ValueError("scoreboard_player.value is int")
 
-        if isinstance(scoreboard_player.value, int):
-            raise ValueError("scoreboard_player.value is int")
+    datapack.add_raw_private_function(
+        name, [
+            f"execute if score {scoreboard_player.value[1]} {scoreboard_player.value[0]} matches {get_match_range(cases[:split])} run function {datapack.namespace}:{DataPack.private_name}/{name}/{count_less}",
+            f"execute if score {scoreboard_player.value[1]} {scoreboard_player.value[0]} matches {get_match_range(cases[split:])} run function {datapack.namespace}:{DataPack.private_name}/{name}/{count_more}",
+        ], count)
+
+    __parse_switch_tree(cases[:split], None if weights is None else weights[:split], count_less,
+                        datapack, func_contents, scoreboard_player, name)
+    __parse_switch_tree(cases[split:], None if weights is None else weights[split:], count_more,
+                        datapack, func_contents, scoreboard_player, name)
+
+
+def __parse_switch_linear(cases: list[int], count: str, datapack: DataPack,
+                          func_contents: dict[int, list[str]], scoreboard_player: ScoreboardPlayer, name: str) -> None:
+    """
+    Create a function checking every case one by one
+
+    - A case with a single command is run directly instead of through a function
 
+    :param cases: Sorted case numbers
+    :param count: Private function count for creating name of private function
+    :param datapack: Datapack object
+    :param func_contents: Dictionary of case number and function content(List of commands(string)) given by user
+    :param scoreboard_player: Minecraft scoreboard objective to check the integer
+    :param name: Private function's group name
+    """
+    if isinstance(scoreboard_player.value, int):
+        raise ValueError("scoreboard_player.value is int")
+    commands: list[str] = []
+    for case in cases:
+        content = func_contents[case]
+        if not content:
+            continue
+        if len(content) == 1 and '\n' not in content[0] and not content[0].startswith('$'):
+            run = content[0]
+        else:
+            run = datapack.add_raw_private_function(name, content)
+        commands.append(
+            f"execute if score {scoreboard_player.value[1]} {scoreboard_player.value[0]} matches {case} run {run}")
+    datapack.add_raw_private_function(name, commands, count)
+
+
+def __parse_switch_macro(cases: list[int], count: str, datapack: DataPack,
+                         func_contents: dict[int, list[str]], scoreboard_player: ScoreboardPlayer, name: str) -> None:
+    """
+    Create a jump table, a function macro calls the function of the case (`<count>/<case>`) directly
+
+    - Numbers between cases have no function, so the macro line fails without running anything
+
+    :param cases: Sorted case numbers
+    :param count: Private function count for creating name of private function
+    :param datapack: Datapack object
+    :param func_contents: Dictionary of case number and function content(List of commands(string)) given by user
+    :param scoreboard_player: Minecraft scoreboard objective to check the integer
+    :param name: Private function's group name
+    """
+    if isinstance(scoreboard_player.value, int):
+        raise ValueError("scoreboard_player.value is int")
+    for case in cases:
         datapack.add_raw_private_function(
-            name, [
-                f"execute if score {scoreboard_player.value[1]} {scoreboard_player.value[0]} matches {match_less} run function {datapack.namespace}:{DataPack.private_name}/{name}/{count_less}",
-                f"execute if score {scoreboard_player.value[1]} {scoreboard_player.value[0]} matches {match_more} run function {datapack.namespace}:{DataPack.private_name}/{name}/{count_more}",
-            ], count)
+            name, func_contents[case], f"{count}/{case}")
+    datapack.add_raw_private_function(
+        name, [f"$function {datapack.namespace}:{DataPack.private_name}/{name}/{count}/$(case)"], f"{count}/jump")
+    datapack.add_raw_private_function(name, [
+        f"execute store result storage {datapack.namespace}:{DataPack.storage_name} {SWITCH_STORAGE_PATH}.case int 1 run scoreboard players get {scoreboard_player.value[1]} {scoreboard_player.value[0]}",
+        f"execute if score {scoreboard_player.value[1]} {scoreboard_player.value[0]} matches {get_match_range(cases)} run function {datapack.namespace}:{DataPack.private_name}/{name}/{count}/jump with storage {datapack.namespace}:{DataPack.storage_name} {SWITCH_STORAGE_PATH}"
+    ], count)
+
+
+def get_switch_strategy(cases: list[int], weights: list[int] | None,
+                        datapack: DataPack) -> str:
+    """
+    Get the strategy to create a switch-case with (from `#switch` in header)
 
-        __parse_switch_binary(min_, half1, count_less,
-                              datapack, func_contents, scoreboard_player, name)
-        __parse_switch_binary(half2, max_, count_more,
-                              datapack, func_contents, scoreboard_player, name)
+    - macro falls back to binary when function macros are unavailable (pack_format or `#hash_private_names`),
+      when there's only 1 case or when the cases are too far apart
+    - auto uses linear for few cases, then weighted if any case has a weight, then macro, then binary
+
+    :param cases: Sorted case numbers
+    :param weights: Weight of each case, None if no case has a weight
+    :param datapack: Datapack object
+    :return: binary, linear, weighted or macro
+    """
+    strategy = Header().switch_strategy
+    if strategy == "auto":
+        if len(cases) <= LINEAR_SWITCH_MAX_CASES:
+            return "linear"
+        if weights is not None:
+            return "weighted"
+        strategy = "macro"
+    if strategy == "macro" and (
+        len(cases) == 1 or
+        not datapack.supports("macro") or
+        datapack.is_hash_private_name or
+        cases[-1] - cases[0] + 1 > MACRO_SWITCH_MAX_SPREAD * len(cases)
+    ):
+        return "binary"
+    return strategy
 
 
 def parse_switch(scoreboard_player: ScoreboardPlayer,
-                 func_contents: list[list[str]], datapack: DataPack, name: str = SWITCH_CASE_NAME) -> str:
+                 func_contents: list[list[str]], datapack: DataPack, name: str = SWITCH_CASE_NAME,
+                 cases: list[int] | None = None, weights: list[int] | None = None) -> str:
     """
-    Create a binary tree for JMC switch-case
+    Create functions for JMC switch-case with the strategy from `#switch` in header (binary tree by default)
 
     :param scoreboard_player: Minecraft scoreboard objective to check the integer
     :param func_contents: List of function content(List of commands(string)) given by user
     :param datapack: Datapack object
     :param name: Private function's group name, defaults to SWITCH_CASE_NAME
+    :param cases: Case number of each function content (must be unique), defaults to 1 to the amount of function content
+    :param weights: How often each case is expected to be hit (for weighted strategy), defaults to every case being the same
     :return: Minecraft function call to initiate switch case
     """
+    if cases is None:
+        cases = list(range(1, len(func_contents) + 1))
+    contents = dict(zip(cases, func_contents))
+    if weights is not None:
+        weights = [weight for _, weight in sorted(zip(cases, weights))]
+    cases = sorted(cases)
+    strategy = get_switch_strategy(cases, weights, datapack)
+
     count = datapack.get_count(name)
-    __parse_switch_binary(1, len(func_contents), count,
-                          datapack, func_contents, scoreboard_player, name)
-    return f"function {datapack.namespace}:{DataPack.private_name}/{name}/{count}"
+    if strategy == "linear":
+        __parse_switch_linear(cases, count, datapack,
+                              contents, scoreboard_player, name)
+    elif strategy == "macro":
+        __parse_switch_macro(cases, count, datapack,
+                             contents, scoreboard_player, name)
+    else:
+        __parse_switch_tree(cases, weights if strategy == "weighted" else None, count,
+                            datapack, contents, scoreboard_player, name)
+    call = f"function {datapack.namespace}:{DataPack.private_name}/{name}/{count}"
+    if len(cases) == 1 and strategy != "linear":
+        if isinstance(scoreboard_player.value, int):
+            raise ValueError("scoreboard_player.value is int")
+        # The only case function is called without checking the score otherwise
+        return f"execute if score {scoreboard_player.value[1]} {scoreboard_player.value[0]} matches {cases[0]} run {call}"
+    return call
+
+
+def parse_case(tokens: list[Token], tokenizer: Tokenizer) -> tuple[int, int | None, list[Token]]:
+    """
+    Parse `case <number>:` or `case <number> (weight=<weight>):`
+
+    :param tokens: Tokens starting with `case`
+    :param tokenizer: tokens' Tokenizer
+    :return: Tuple of case number, weight (None if it isn't given) and tokens after the colon
+    """
+    if len(tokens) == 1:
+        raise JMCSyntaxException(
+            "Expected case number", tokens[0], tokenizer, col_length=True)
+
+    case_str = tokens[1].string
+    is_colon = case_str.endswith(":")
+    if is_colon:
+        case_str = case_str[:-1]
+    if tokens[1].token_type != TokenType.KEYWORD or not is_number(case_str):
+        raise JMCSyntaxException(
+            "Expected case number", tokens[1], tokenizer)
+    case = int(case_str)
+    if is_colon:
+        return case, None, tokens[2:]
+
+    weight = None
+    index = 2
+    if len(tokens) > index and tokens[index].token_type == TokenType.PAREN_ROUND:
+        args, kwargs = tokenizer.parse_func_args(tokens[index])
+        if args or set(kwargs) != {"weight"} or not kwargs["weight"].string.isdigit() or int(kwargs["weight"].string) < 1:
+            raise JMCSyntaxException(
+                "Expected (weight=<positive integer>)", tokens[index], tokenizer)
+        weight = int(kwargs["weight"].string)
+        index += 1
+    if len(tokens) <= index:
+        raise JMCSyntaxException(
+            "Expected colon (:)", tokens[index - 1], tokenizer, col_length=True)
+    if tokens[index].token_type != TokenType.KEYWORD or tokens[index].string != ':':
+        raise JMCSyntaxException(
+            "Expected colon (:)", tokens[index], tokenizer)
+    return case, weight, tokens[index + 1:]
 
 
 def switch(command: list[Token], datapack: DataPack,
@@ -204,10 +396,10 @@ def switch(command: list[Token], datapack: DataPack,
         raise JMCSyntaxException(
             "Switch content cannot be empty", command[2], tokenizer)
 
-    list_of_tokens = tokenizer.parse(
-        command[2].string[1:-1], command[2].line, command[2].col + 1, expect_semicolon=True)
+    list_of_tokens = tokenizer.parse_paren(command[2], expect_semicolon=True)
 
-    case_count = 1
+    cases: list[int] = []
+    weights: list[int | None] = []
     cases_content: list[list[list[Token]]] = []
     current_case_content: list[list[Token]] = []
     if list_of_tokens[0][0].string != 'case' or list_of_tokens[0][0].token_type != TokenType.KEYWORD:
@@ -218,41 +410,15 @@ def switch(command: list[Token], datapack: DataPack,
         if tokens[0].string == 'case' and tokens[0].token_type == TokenType.KEYWORD:
             cases_content.append(current_case_content)
             current_case_content = []
-            if len(tokens) == 1:
+            case_token = tokens[1] if len(tokens) > 1 else tokens[0]
+            case, weight, tokens = parse_case(tokens, tokenizer)
+            if case in cases:
                 raise JMCSyntaxException(
-                    "Expected case number", tokens[0], tokenizer, col_length=True)
-
-            if tokens[1].string.endswith(":"):
-                count_str = tokens[1].string[:-1]
-                if not count_str.isalnum():
-                    raise JMCSyntaxException(
-                        "Expected case number", tokens[1], tokenizer)
-
-                count = int(count_str)
-                if count != case_count:
-                    raise JMCSyntaxException(
-                        f"Expected case {case_count} got case {count}", tokens[1], tokenizer)
-
-                tokens = tokens[2:]
-            else:
-                count_str = tokens[1].string
-                if not count_str.isalnum():
-                    raise JMCSyntaxException(
-                        "Expected case number", tokens[1], tokenizer)
-
-                count = int(count_str)
-                if count != case_count:
-                    raise JMCSyntaxException(
-                        f"Expected case {case_count} got case {count}", tokens[1], tokenizer)
-                if len(tokens) < 3:
-                    raise JMCSyntaxException(
-                        "Expected colon (:)", tokens[1], tokenizer, col_length=True)
-                if tokens[2].token_type != TokenType.KEYWORD or tokens[2].string != ':':
-                    raise JMCSyntaxException(
-                        "Expected colon (:)", tokens[2], tokenizer)
-
-                tokens = tokens[3:]
-            case_count += 1
+                    f"Duplicated case {case}", case_token, tokenizer)
+            cases.append(case)
+            weights.append(weight)
+            if not tokens:
+                continue
         # End If case
         if tokens[0].string == 'break' and tokens[0].token_type == TokenType.KEYWORD and len(
                 tokens) == 1:
@@ -268,8 +434,7 @@ def switch(command: list[Token], datapack: DataPack,
             tokenizer, case_content, is_load=False))
 
     # Parse variable
-    tokens = tokenizer.parse(
-        command[1].string[1:-1], command[1].line, command[1].col + 1, expect_semicolon=False)[0]
+    tokens = tokenizer.parse_paren(command[1], expect_semicolon=False)[0]
     if len(tokens) > 1:
         raise JMCSyntaxException(
             f"Unexpected token({tokens[1].string})", tokens[1], tokenizer)
@@ -281,10 +446,13 @@ def switch(command: list[Token], datapack: DataPack,
         raise JMCSyntaxException(
             f"Unexpected integer in switch case", tokens[0], tokenizer)
 
-    return parse_switch(scoreboard_player, func_contents, datapack)
+    return parse_switch(scoreboard_player, func_contents, datapack, cases=cases, weights=None if all(
+        weight is None for weight in weights) else [1 if weight is None else weight for weight in weights])
 
 
 FOR_NAME = 'for_loop'
+FUNCTION_REFERENCE_PATTERN = re.compile(r"function (\S+)")
+"""Pattern of a function (or function tag) called by a command"""
 
 
 def for_(command: list[Token], datapack: DataPack,
@@ -304,8 +472,8 @@ def for_(command: list[Token], datapack: DataPack,
     if command[2].string == '{}':
         raise JMCSyntaxException(
             "For loop content cannot be empty", command[2], tokenizer)
-    statements = tokenizer.parse(command[1].string[1:-1], command[1].line,
-                                 command[1].col + 1, expect_semicolon=True, allow_last_missing_semicolon=True)
+    statements = tokenizer.parse_paren(
+        command[1], expect_semicolon=True, allow_last_missing_semicolon=True)
     if len(statements) != 3:
         raise JMCSyntaxException(
             f"Expected 3 statements (got {len(statements)})", command[1], tokenizer)
@@ -334,6 +502,12 @@ def for_(command: list[Token], datapack: DataPack,
     count = datapack.get_count(FOR_NAME)
     call_func = f"{precommand}execute {condition} run {datapack.call_func(FOR_NAME, count)}"
 
+    if datapack.optimizer.is_enabled("unroll") and not precommand:
+        unrolled = unroll_for(first_statement, condition, last_statement,
+                              command[2], tokenizer, datapack, count, call_func)
+        if unrolled is not None:
+            return unrolled
+
     datapack.add_custom_private_function(
         FOR_NAME,
         command[2],
@@ -349,3 +523,91 @@ def for_(command: list[Token], datapack: DataPack,
         *first_statement,
         call_func
     ])
+
+
+def is_unrollable(commands: list[str], private_functions: dict[str, dict[str, Function]],
+                  holder: str, datapack: DataPack) -> bool:
+    """
+    Whether iterations of a for loop's body can be repeated without checking the condition in between
+
+    - Every function the body calls must be a private function made by the body, since anything else may change the variable
+    - The body can't write to the variable, `return` or have macro lines
+
+    :param commands: Commands of the body
+    :param private_functions: Private functions made by parsing the body
+    :param holder: Score holder of the variable
+    :param datapack: Datapack object
+    :return: Whether the body can be unrolled
+    """
+    locations = {f"{datapack.namespace}:{DataPack.private_name}/{name}/{path}"
+                 for name, functions in private_functions.items() for path in functions}
+    write_pattern = re.compile(
+        r"(?:scoreboard players \w+|store \w+ score) " + re.escape(holder) + r"(?: |$)")
+    for lines in (commands, *(func.lines for functions in private_functions.values()
+                              for func in functions.values())):
+        for line in '\n'.join(lines).split('\n'):
+            if (
+                not is_inlinable(RawCommand(line)) or
+                ' * ' in line or
+                write_pattern.search(line) or
+                any(location not in locations for location in FUNCTION_REFERENCE_PATTERN.findall(line))
+            ):
+                return False
+    return True
+
+
+def unroll_for(first_statement: list[str], condition: str, last_statement: list[str], body: Token,
+               tokenizer: Tokenizer, datapack: DataPack, count: str, call_func: str) -> str | None:
+    """
+    Unroll a for loop whose variable's values are known at compile time (`#optimize unroll`)
+
+    - Short loops become their iterations
+    - Longer loops call a function running a block of iterations (remaining iterations are run before the first call),
+      checking the condition once per block
+
+    :param first_statement: Commands of the first statement
+    :param condition: Condition of the loop (from parse_condition without precommands)
+    :param last_statement: Commands of the last statement
+    :param body: paren_curly token of the body
+    :param tokenizer: body's Tokenizer
+    :param datapack: Datapack object
+    :param count: Private function count of the loop
+    :param call_func: Command calling the loop's function if the condition passes
+    :return: Commands replacing the loop, None if it can't be unrolled
+    """
+    optimizer = datapack.optimizer
+    condition_command = parse_command(f"execute {condition} run {datapack.call_func(FOR_NAME, count)}")
+    if not isinstance(condition_command, Execute):
+        return None
+    start = [parse_command(command) for command in first_statement]
+    values = optimizer.get_loop_values(
+        start, condition_command.subcommands, [parse_command(command) for command in last_statement])
+    if values is None or not isinstance(start[0], ScoreboardPlayers):
+        return None
+
+    private_functions = datapack.isolate_private_functions()
+    try:
+        commands = datapack.parse_function_token(body, tokenizer)
+    finally:
+        new_private_functions = datapack.restore_private_functions(
+            private_functions)
+    for name, functions in new_private_functions.items():
+        datapack.private_functions[name].update(functions)
+
+    iteration = [*commands, *last_statement]
+    block_size = optimizer.unroll_max_length // len(
+        '\n'.join(iteration).split('\n'))
+    # A single iteration is never longer than the loop
+    is_whole = len(values) <= max(block_size, 1)
+    if not (is_whole or block_size >= 2) or not is_unrollable(
+            commands, new_private_functions, start[0].target, datapack):
+        datapack.add_raw_private_function(
+            FOR_NAME, [*iteration, call_func], count)
+        return '\n'.join([*first_statement, call_func])
+
+    optimizer.hit("unroll")
+    if is_whole:
+        return '\n'.join([*first_statement, *iteration * len(values)])
+    datapack.add_raw_private_function(
+        FOR_NAME, [*iteration * block_size, call_func], count)
+    return '\n'.join([*first_statement, *iteration * (len(values) % block_size), call_func])
@@ -69,6 +69,10 @@ class MathSqrt(JMCFunction):
         return '\n'.join(run)
 
 
+MAX_RANDOM_RANGE = 2147483647
+"""Exclusive maximum of max - min for `random value`"""
+
+
 @func_property(
     func_type=FuncType.VARIABLE_OPERATION,
     call_string='Math.random',
@@ -93,6 +97,10 @@ class MathRandom(JMCFunction):
         if end < start:
             raise JMCValueError(
                 f"max cannot be less than min in {self.call_string}", self.token, self.tokenizer, suggestion="Try swapping max and min")
+        if self.datapack.supports("random") and end - start < MAX_RANDOM_RANGE:
+            if start == end:
+                return f"scoreboard players set {self.var} {var} {start}"
+            return f"execute store result score {self.var} {var} run random value {start}..{end}"
         if self.is_never_used():
             self.datapack.add_load_command(
                 f"""execute unless score {seed} {var} matches -2147483648..2147483647 run {
@@ -39,7 +39,7 @@ class StringIsEqual(JMCFunction):
     current_object = "currentObject"
 
     def call_bool(self) -> tuple[str, bool, list[str]]:
-        bool_result = self.datapack.data.get_current_bool_result()
+        bool_result = self.datapack.data.get_temporary('__bool_result__')
         return f'score {bool_result} {self.datapack.var_name} matches 0', IF, [
             f"data modify storage {self.datapack.namespace}:{self.datapack.storage_name} currentObject set from storage {self.datapack.namespace}:{self.args['storage']} {self.args['path']}",
             f"execute store success score {bool_result} {self.datapack.var_name} run data modify storage {self.datapack.namespace}:{self.datapack.storage_name} {self.current_object} set value {self.args['string']}"
@@ -79,7 +79,7 @@ class HardcodeRepeat(JMCFunction):
             try:
                 commands.extend(self.datapack.parse_function_token(
                     Token(
-                        TokenType.PAREN_CURLY,
+                        TokenType.FUNC,
                         self.raw_args["function"].token.line,
                         self.raw_args["function"].token.col,
                         _hardcode_process(
@@ -125,7 +125,7 @@ class HardcodeSwitch(JMCFunction):
             try:
                 func_contents.append(self.datapack.parse_function_token(
                     Token(
-                        TokenType.PAREN_CURLY,
+                        TokenType.FUNC,
                         self.raw_args["function"].token.line,
                         self.raw_args["function"].token.col,
                         _hardcode_process(
@@ -302,7 +302,7 @@ class RaycastSimple(JMCFunction):
             try:
                 recursion_commands = self.datapack.parse_function_token(
                     Token(
-                        TokenType.PAREN_CURLY,
+                        TokenType.FUNC,
                         self.raw_args["overideRecursion"].token.line,
                         self.raw_args["overideRecursion"].token.col,
                         self.raw_args["overideRecursion"].token.string.replace(
@@ -88,7 +88,7 @@ class RightClickSetup(JMCFunction):
 
             main_func.append(
                 f"""execute if score {self.tag_id_var} {DataPack.var_name} matches 1.. run {parse_switch(ScoreboardPlayer(
-                    PlayerType.SCOREBOARD, (self.tag_id_var, '@s')), func_contents, self.datapack, self.name)}""")
+                    PlayerType.SCOREBOARD, (self.tag_id_var, '@s')), func_contents, self.datapack, self.name, cases=list(func_map))}""")
         else:
             main_func.append(
                 f"execute if score {self.tag_id_var} {DataPack.var_name} matches 1.. run {self.datapack.call_func(self.name, main_count)}")
@@ -367,7 +367,7 @@ class TriggerSetup(JMCFunction):
                         [f"function {self.datapack.namespace}:{func}"])
             run = [
                 parse_switch(ScoreboardPlayer(
-                    PlayerType.SCOREBOARD, (obj, '@s')), func_contents, self.datapack, self.name),
+                    PlayerType.SCOREBOARD, (obj, '@s')), func_contents, self.datapack, self.name, cases=list(func_map)),
             ]
         else:
             run = []
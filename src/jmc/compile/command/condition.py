@@ -19,6 +19,8 @@ IF = True
 UNLESS = False
 
 VAR = '__logic__'
+LOGIC_NAME = 'logic'
+"""Private function's group name of OR conditions checked with `execute if function`"""
 BOOL_FUNCTIONS = JMCFunction.get_subclasses(FuncType.BOOL_FUNCTION)
 
 
@@ -238,8 +240,7 @@ def condition_to_ast(
             raise JMCSyntaxException(
                 "Empty round parenthesis () inside condition", tokens[0], tokenizer)
 
-        tokenizer = Tokenizer(tokens[0].string[1:-1], tokenizer.file_path,
-                              tokens[0].line, tokens[0].col + 1, tokenizer.file_string, expect_semicolon=False)
+        tokenizer = tokenizer.tokenize_paren(tokens[0], expect_semicolon=False)
         tokens = tokenizer.programs[0]
     tokens = tokenizer.split_keyword_tokens(tokens, [OR_OPERATOR])
     list_of_tokens = find_operator(tokens, OR_OPERATOR, tokenizer)
@@ -263,7 +264,7 @@ def condition_to_ast(
 
 
 def ast_to_commands(
-        ast: AST_TYPE, datapack: DataPack) -> tuple[list[Condition], list[tuple[list[Condition], int]] | None]:
+        ast: AST_TYPE, datapack: DataPack) -> tuple[list[Condition], list[tuple[list[Condition], str]] | None]:
     """
     Parse abstract syntax tree into list of conditions and list of commands that need to come before for it to works
 
@@ -273,7 +274,7 @@ def ast_to_commands(
         A chain of conditions(List of Condition)
         and
         Commands(
-            List of Condition and n (`__logic__n` for minecraft function name)
+            List of Condition and `__logic__n` fake player it sets
         ) that need to come before (can be None)
     )
     """
@@ -282,7 +283,7 @@ def ast_to_commands(
 
     if ast["operator"] == AND_OPERATOR:
         conditions: list[Condition] = []
-        precommand_and: list[tuple[list[Condition], int]] = []
+        precommand_and: list[tuple[list[Condition], str]] = []
         if isinstance(ast["body"], Condition):
             raise ValueError(
                 'ast["body"] is a Condition instead of list in AND')
@@ -296,22 +297,35 @@ def ast_to_commands(
         return conditions, (precommand_and if precommand_and else None)
 
     elif ast["operator"] == OR_OPERATOR:
-        _count = datapack.data.condition_count
-        datapack.data.condition_count += 1
-        precommand_or: list[tuple[list[Condition], int]] = []
         if isinstance(ast["body"], Condition):
             raise ValueError(
                 'ast["body"] is a Condition instead of list in OR')
+        if datapack.supports("execute_if_function"):
+            # The function returns 1 as soon as a condition passes
+            commands: list[str] = []
+            for or_body in ast["body"]:
+                if isinstance(or_body, str):
+                    raise ValueError('ast["body"] is string')
+                condition_string, precommand_string = ast_to_strings(
+                    or_body, datapack)
+                if precommand_string:
+                    commands.extend(precommand_string.split('\n'))
+                commands.append(f"execute {condition_string} run return 1")
+            call = datapack.add_raw_private_function(LOGIC_NAME, commands)
+            return [Condition(call, IF)], None
+
+        logic = datapack.data.get_temporary(VAR)
+        precommand_or: list[tuple[list[Condition], str]] = []
         for or_body in ast["body"]:
             if isinstance(or_body, str):
                 raise ValueError('ast["body"] is string')
             conditions, precommand = ast_to_commands(or_body, datapack)
             if precommand is not None:
                 precommand_or.extend(precommand)
-            precommand_or.append((conditions, _count))
+            precommand_or.append((conditions, logic))
 
         return [Condition(
-            f"score {VAR}{_count} {DataPack.var_name} matches 1", IF)], precommand_or
+            f"score {logic} {DataPack.var_name} matches 1", IF)], precommand_or
 
     elif ast["operator"] == NOT_OPERATOR:
         if isinstance(ast["body"], Condition):
@@ -344,24 +358,22 @@ def ast_to_strings(ast: AST_TYPE, datapack: DataPack) -> tuple[str, str]:
         precommand = ""
     else:
         precommands: list[str] = []
-        current_count = -1
-        for conditions_and_count in precommand_conditions:
-            if conditions_and_count[1] > current_count:
-                current_count += 1
+        started_logics: set[str] = set()
+        for conditions_, logic in precommand_conditions:
+            merged_condition, merged_condition_pre_command = merge_condition(
+                conditions_)
+            if logic not in started_logics:
+                started_logics.add(logic)
                 precommands.append(
-                    f"scoreboard players set {VAR}{current_count} {DataPack.var_name} 0")
-                merged_condition, merged_condition_pre_command = merge_condition(
-                    conditions_and_count[0])
+                    f"scoreboard players set {logic} {DataPack.var_name} 0")
                 precommands.extend(merged_condition_pre_command)
                 precommands.append(
-                    f"execute {merged_condition} run scoreboard players set {VAR}{current_count} {DataPack.var_name} 1")
+                    f"execute {merged_condition} run scoreboard players set {logic} {DataPack.var_name} 1")
                 continue
 
-            merged_condition, merged_condition_pre_command = merge_condition(
-                conditions_and_count[0])
             precommands.extend(merged_condition_pre_command)
             precommands.append(
-                f"execute unless score {VAR}{current_count} {DataPack.var_name} matches 1 {merged_condition} run scoreboard players set {VAR}{current_count} {DataPack.var_name} 1")
+                f"execute unless score {logic} {DataPack.var_name} matches 1 {merged_condition} run scoreboard players set {logic} {DataPack.var_name} 1")
         precommand = '\n'.join(precommands)
 
     condition_string, precommands_ = merge_condition(conditions)
@@ -389,11 +401,15 @@ def parse_condition(condition_token: Token |
     :param datapack: Datapack object
     :return: tuple of `execute if` command(excluding `execute`) a multiple line string representing precommands
     """
-    datapack.data.condition_count = 0
     tokens = condition_token if isinstance(
         condition_token, list) else [condition_token]
 
-    ast = condition_to_ast(tokens, tokenizer, datapack)
-    condition, precommand = ast_to_strings(ast, datapack)
+    temporaries = set(datapack.data.temporaries)
+    try:
+        ast = condition_to_ast(tokens, tokenizer, datapack)
+        condition, precommand = ast_to_strings(ast, datapack)
+    finally:
+        # Temporary fake players of the condition are only read by the `execute` right after the precommands
+        datapack.data.temporaries = temporaries
     precommand = precommand + '\n' if precommand else ""
     return condition, precommand
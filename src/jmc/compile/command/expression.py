@@ -0,0 +1,369 @@
+"""Module compiling arithmetic expressions (right side of `$var = ...`) into scoreboard operations, called from command/var_operation.py"""
+from dataclasses import dataclass
+from typing import Union
+
+from ..tokenizer import Token, TokenType, Tokenizer
+from ..exception import JMCSyntaxException
+from ..datapack import DataPack
+from ..optimizer import MAX_SCORE, wrap_score
+from .utils import find_scoreboard_player_type, PlayerType
+
+ADDITIVE_OPERATORS = ('+', '-')
+MULTIPLICATIVE_OPERATORS = ('*', '/', '%')
+COMMUTATIVE_OPERATORS = {'+', '*'}
+EXPRESSION_OPERATORS = [*ADDITIVE_OPERATORS, *MULTIPLICATIVE_OPERATORS]
+VAR = '__expr__'
+"""Prefix of fake players holding intermediate results"""
+
+
+@dataclass(frozen=True, slots=True)
+class Operand:
+    """
+    Dataclass for a score inside an expression
+    """
+    holder: str
+    objective: str
+
+    def __str__(self) -> str:
+        return f"{self.holder} {self.objective}"
+
+
+@dataclass(frozen=True, slots=True)
+class BinaryOperation:
+    """
+    Dataclass for `<left> <operator> <right>` inside an expression
+    """
+    operator: str
+    """+, -, *, / or %"""
+    left: "Expression"
+    right: "Expression"
+
+
+Expression = Union[int, Operand, BinaryOperation]
+"""Integer constant, score or binary operation"""
+
+
+def calculate(operator: str, left: int, right: int,
+              token: Token, tokenizer: Tokenizer) -> int:
+    """
+    Calculate an operation on 2 integers the same way scoreboard operation does
+
+    :param operator: +, -, *, / or %
+    :param left: Left integer
+    :param right: Right integer
+    :param token: Token of the operation (for error)
+    :param tokenizer: token's Tokenizer
+    :raises JMCSyntaxException: Division by zero
+    :return: Result
+    """
+    if operator in {'/', '%'} and right == 0:
+        raise JMCSyntaxException(
+            "Division by zero", token, tokenizer)
+    if operator == '+':
+        return wrap_score(left + right)
+    if operator == '-':
+        return wrap_score(left - right)
+    if operator == '*':
+        return wrap_score(left * right)
+    if operator == '/':
+        return wrap_score(left // right)
+    return left % right
+
+
+def make_operation(operator: str, left: Expression, right: Expression,
+                   token: Token, tokenizer: Tokenizer) -> Expression:
+    """
+    Create a binary operation, folding integer constants and operations that do nothing
+
+    - `1 + 2` becomes `3`, `$a + 1 + 2` becomes `$a + 3` and `$a * 2 * 3` becomes `$a * 6`
+    - `$a + 0`, `$a - 0`, `$a * 1` and `$a / 1` become `$a`
+
+    :param operator: +, -, *, / or %
+    :param left: Left expression
+    :param right: Right expression
+    :param token: Token of the operator (for error)
+    :param tokenizer: token's Tokenizer
+    :raises JMCSyntaxException: Division by zero
+    :return: Expression
+    """
+    if isinstance(left, int) and isinstance(right, int):
+        return calculate(operator, left, right, token, tokenizer)
+    if isinstance(right, int):
+        if operator in {'/', '%'} and right == 0:
+            raise JMCSyntaxException(
+                "Division by zero", token, tokenizer)
+        if operator in ADDITIVE_OPERATORS and isinstance(left, BinaryOperation) and left.operator in ADDITIVE_OPERATORS and isinstance(left.right, int):
+            # Integers wrap around the same way no matter the order of additions
+            right = calculate(
+                '+', left.right if left.operator == '+' else -left.right,
+                right if operator == '+' else -right, token, tokenizer)
+            operator, left = '+', left.left
+        elif operator == '*' and isinstance(left, BinaryOperation) and left.operator == '*' and isinstance(left.right, int):
+            right = calculate('*', left.right, right, token, tokenizer)
+            left = left.left
+        if (operator in ADDITIVE_OPERATORS and right == 0) or (
+                operator in {'*', '/'} and right == 1):
+            return left
+    return BinaryOperation(operator, left, right)
+
+
+def is_mentioned(expression: Expression, operand: Operand) -> bool:
+    """
+    Whether an expression reads a score
+
+    :param expression: Expression
+    :param operand: Score
+    :return: Whether the score is used anywhere in the expression
+    """
+    if isinstance(expression, BinaryOperation):
+        return is_mentioned(expression.left, operand) or is_mentioned(
+            expression.right, operand)
+    return expression == operand
+
+
+def count_temporaries(expression: Expression) -> int:
+    """
+    Count the amount of intermediate scores needed to calculate an expression into a score
+
+    :param expression: Expression
+    :return: Amount of intermediate scores (excluding the result)
+    """
+    if not isinstance(expression, BinaryOperation):
+        return 0
+    left = count_temporaries(expression.left)
+    if not isinstance(expression.right, BinaryOperation):
+        return left
+    right = count_temporaries(expression.right)
+    if expression.operator in COMMUTATIVE_OPERATORS:
+        return min(max(left, right + 1), max(right, left + 1))
+    return max(left, right + 1)
+
+
+class ExpressionParser:
+    """
+    Recursive descent parser turning tokens of an arithmetic expression into Expression
+
+    - Precedence from lowest: `+ -`, `* / %`, unary `-`, then integer, score or round parenthesis
+
+    :param tokens: Tokens of the expression
+    :param tokenizer: tokens' Tokenizer
+    """
+    __slots__ = ('tokens', 'tokenizer', 'index')
+
+    def __init__(self, tokens: list[Token], tokenizer: Tokenizer) -> None:
+        self.tokens = tokenizer.split_keyword_tokens(
+            tokens, EXPRESSION_OPERATORS)
+        self.tokenizer = tokenizer
+        self.index = 0
+
+    def peek(self, operators: tuple[str, ...]) -> Token | None:
+        """
+        Get the current token if it's one of the operators
+
+        :param operators: Operators to look for
+        :return: Operator token, None if the current token isn't one of the operators
+        """
+        if self.index >= len(self.tokens):
+            return None
+        token = self.tokens[self.index]
+        if token.token_type == TokenType.KEYWORD and token.string in operators:
+            return token
+        return None
+
+    def parse(self) -> Expression:
+        """
+        Parse every token
+
+        :raises JMCSyntaxException: Tokens left after the expression
+        :return: Expression
+        """
+        expression = self.parse_sum()
+        if self.index < len(self.tokens):
+            raise JMCSyntaxException(
+                f"Unexpected token ({self.tokens[self.index].string})", self.tokens[self.index], self.tokenizer, suggestion="Expected operator (+, -, *, /, %)")
+        return expression
+
+    def parse_sum(self) -> Expression:
+        expression = self.parse_product()
+        while (token := self.peek(ADDITIVE_OPERATORS)) is not None:
+            self.index += 1
+            expression = make_operation(
+                token.string, expression, self.parse_product(), token, self.tokenizer)
+        return expression
+
+    def parse_product(self) -> Expression:
+        expression = self.parse_unary()
+        while (token := self.peek(MULTIPLICATIVE_OPERATORS)) is not None:
+            self.index += 1
+            expression = make_operation(
+                token.string, expression, self.parse_unary(), token, self.tokenizer)
+        return expression
+
+    def parse_unary(self) -> Expression:
+        token = self.peek(('-', ))
+        if token is None:
+            return self.parse_primary()
+        self.index += 1
+        return make_operation(
+            '*', self.parse_unary(), -1, token, self.tokenizer)
+
+    def parse_primary(self) -> Expression:
+        if self.index >= len(self.tokens):
+            raise JMCSyntaxException(
+                "Expected integer, variable, objective:selector or (", self.tokens[-1], self.tokenizer, col_length=True)
+        token = self.tokens[self.index]
+        self.index += 1
+        if token.token_type == TokenType.PAREN_ROUND:
+            if token.string == '()':
+                raise JMCSyntaxException(
+                    "Empty round parenthesis () inside expression", token, self.tokenizer)
+            tokenizer = self.tokenizer.tokenize_paren(
+                token, expect_semicolon=False)
+            return ExpressionParser(tokenizer.programs[0], tokenizer).parse()
+        if token.token_type == TokenType.KEYWORD and token.string in EXPRESSION_OPERATORS:
+            raise JMCSyntaxException(
+                f"Unexpected operator ({token.string})", token, self.tokenizer, suggestion="Expected integer, variable, objective:selector or (")
+
+        scoreboard_player = find_scoreboard_player_type(token, self.tokenizer)
+        if scoreboard_player.player_type == PlayerType.INTEGER:
+            if not isinstance(scoreboard_player.value, int):
+                raise ValueError("scoreboard_player.value is not int")
+            return scoreboard_player.value
+        if isinstance(scoreboard_player.value, int):
+            raise ValueError("scoreboard_player.value is int")
+        return Operand(scoreboard_player.value[1], scoreboard_player.value[0])
+
+
+class ExpressionCompiler:
+    """
+    Turn Expression into scoreboard commands storing the result in a score
+
+    - Intermediate results are kept in `__expr__.<n>` fake players (Data.get_temporary), a fake player is reused as soon as its value has been used
+    - Operands of `+` and `*` are swapped when it needs less intermediate scores
+
+    :param datapack: Datapack object
+    """
+    __slots__ = ('datapack', 'commands')
+
+    def __init__(self, datapack: DataPack) -> None:
+        self.datapack = datapack
+        self.commands: list[str] = []
+
+    def compile(self, expression: Expression, target: Operand) -> list[str]:
+        """
+        Compile an expression
+
+        :param expression: Expression
+        :param target: Score to store the result in
+        :return: List of commands
+        """
+        self.commands = []
+        self.calculate(expression, target)
+        if not self.commands:
+            # `$x = $x`
+            self.commands.append(
+                f"scoreboard players operation {target} = {target}")
+        return self.commands
+
+    def allocate(self) -> Operand:
+        """
+        Get an intermediate score that is not in use
+
+        :return: Score
+        """
+        return Operand(self.datapack.data.get_temporary(
+            f"{VAR}."), DataPack.var_name)
+
+    def free(self, temporary: Operand) -> None:
+        """
+        Allow an intermediate score to be reused
+
+        :param temporary: Score from ExpressionCompiler.allocate
+        """
+        self.datapack.data.temporaries.discard(temporary.holder)
+
+    def calculate(self, expression: Expression, target: Operand) -> None:
+        """
+        Add commands storing the result of an expression into a score
+
+        :param expression: Expression
+        :param target: Score to store the result in
+        """
+        if isinstance(expression, int):
+            self.commands.append(
+                f"scoreboard players set {target} {expression}")
+            return
+        if isinstance(expression, Operand):
+            if expression != target:
+                self.commands.append(
+                    f"scoreboard players operation {target} = {expression}")
+            return
+
+        first, second = expression.left, expression.right
+        if expression.operator in COMMUTATIVE_OPERATORS and isinstance(second, BinaryOperation) and (
+                not isinstance(first, BinaryOperation) or count_temporaries(second) > count_temporaries(first)):
+            first, second = second, first
+        if is_mentioned(second, target):
+            # The target is overwritten by the first operand before the second operand is read
+            if expression.operator in COMMUTATIVE_OPERATORS and not is_mentioned(first, target):
+                first, second = second, first
+            else:
+                temporary = self.allocate()
+                self.calculate(second, temporary)
+                self.calculate(first, target)
+                self.free(temporary)
+                self.commands.append(
+                    f"scoreboard players operation {target} {expression.operator}= {temporary}")
+                return
+
+        self.calculate(first, target)
+        self.apply(expression.operator, second, target)
+
+    def apply(self, operator: str, expression: Expression,
+              target: Operand) -> None:
+        """
+        Add commands applying an operation with an expression on a score
+
+        :param operator: +, -, *, / or %
+        :param expression: Expression on the right side of the operator
+        :param target: Score on the left side of the operator
+        """
+        if isinstance(expression, int):
+            if operator in ADDITIVE_OPERATORS and expression != -MAX_SCORE - 1:
+                if (expression < 0) == (operator == '+'):
+                    self.commands.append(
+                        f"scoreboard players remove {target} {abs(expression)}")
+                else:
+                    self.commands.append(
+                        f"scoreboard players add {target} {abs(expression)}")
+                return
+            self.datapack.add_int(expression)
+            self.commands.append(
+                f"scoreboard players operation {target} {operator}= {expression} {DataPack.int_name}")
+            return
+        if isinstance(expression, Operand):
+            self.commands.append(
+                f"scoreboard players operation {target} {operator}= {expression}")
+            return
+
+        temporary = self.allocate()
+        self.calculate(expression, temporary)
+        self.free(temporary)
+        self.commands.append(
+            f"scoreboard players operation {target} {operator}= {temporary}")
+
+
+def compile_expression(tokens: list[Token], tokenizer: Tokenizer,
+                       datapack: DataPack, target: str) -> list[str]:
+    """
+    Compile an arithmetic expression with `+ - * / %`, round parenthesis and unary `-` into scoreboard commands
+
+    :param tokens: Tokens of the expression
+    :param tokenizer: tokens' Tokenizer
+    :param datapack: Datapack object
+    :param target: Variable to store the result in
+    :return: List of commands
+    """
+    expression = ExpressionParser(tokens, tokenizer).parse()
+    return ExpressionCompiler(datapack).compile(
+        expression, Operand(target, DataPack.var_name))
@@ -4,6 +4,7 @@ from ..datapack import DataPack
 from ..exception import JMCSyntaxException
 from ..tokenizer import Token, TokenType, Tokenizer
 from .utils import find_scoreboard_player_type, PlayerType
+from .expression import compile_expression
 
 VAR_OPERATION_COMMANDS = JMCFunction.get_subclasses(
     FuncType.VARIABLE_OPERATION)
@@ -38,8 +39,12 @@ def variable_operation(
         raise JMCSyntaxException(
             "Expected operator after variable", tokens[0], tokenizer, col_length=True)
 
-    for operator in ('*=', '+=', '-=', '*=', '/=', '%=',
-                     '++', '--', '><', "->", '>', '<', '='):  # sort key=len
+    operators: tuple[str, ...] = ('*=', '+=', '-=', '*=', '/=', '%=',
+                                  '++', '--', '><', "->", '>', '<', '=')  # sort key=len
+    if tokens[1].token_type == TokenType.KEYWORD and tokens[1].string == '=':
+        # Everything after `=` is the value, operators inside it (`$a - -$c`) belong to the expression
+        operators = ('=', )
+    for operator in operators:
         list_of_tokens = tokenizer.find_tokens(tokens, operator)
         if len(list_of_tokens) == 1:
             continue
@@ -85,6 +90,15 @@ def variable_operation(
             return VAR_OPERATION_COMMANDS[list_of_tokens[1][0].string](
                 list_of_tokens[1][1], datapack, tokenizer, var=list_of_tokens[0][0].string, is_execute=is_execute).call()
 
+        if operator == '=' and (len(list_of_tokens[1]) > 1 or
+                                list_of_tokens[1][0].token_type == TokenType.PAREN_ROUND or
+                                '/' in list_of_tokens[1][0].string):
+            commands = compile_expression(
+                list_of_tokens[1], tokenizer, datapack, list_of_tokens[0][0].string)
+            if is_execute and len(commands) > 1:
+                return datapack.add_raw_private_function('expression', commands)
+            return '\n'.join(commands)
+
         if len(list_of_tokens[1]) > 1:
             raise JMCSyntaxException(
                 f"Unexpected token ({list_of_tokens[1][1].string})", list_of_tokens[1][1], tokenizer)
@@ -0,0 +1,286 @@
+"""Module containing the intermediate representation (IR) of minecraft commands stored in functions"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+import re
+
+
+@dataclass(frozen=True, eq=True, slots=True)
+class Command(ABC):
+    """
+    Base dataclass of a minecraft command inside a function (Turn into string with `str()`)
+    """
+
+    @abstractmethod
+    def __str__(self) -> str:
+        pass
+
+
+@dataclass(frozen=True, eq=True, slots=True)
+class RawCommand(Command):
+    """
+    Dataclass containing a command that JMC doesn't look into
+    """
+    string: str
+
+    def __str__(self) -> str:
+        return self.string
+
+
+@dataclass(frozen=True, eq=True, slots=True)
+class FunctionCall(Command):
+    """
+    Dataclass containing `function <function> [<arguments>]`
+    """
+    function: str
+    """Resource location of the function"""
+    arguments: str = ''
+    """Arguments after the function (macro arguments), empty string if there's none"""
+
+    def __str__(self) -> str:
+        if self.arguments:
+            return f"function {self.function} {self.arguments}"
+        return f"function {self.function}"
+
+
+@dataclass(frozen=True, eq=True, slots=True)
+class ScoreboardPlayers(Command):
+    """
+    Dataclass containing `scoreboard players <action> <target> <objective> [<arguments>]`
+    """
+    action: str
+    """set, add, remove, reset, get, enable or operation"""
+    target: str
+    objective: str
+    """Objective, empty string if it's omitted (`scoreboard players reset <target>`)"""
+    arguments: tuple[str, ...] = ()
+    """Arguments after the objective (value of set/add/remove, operator, source and source objective of operation)"""
+
+    def __str__(self) -> str:
+        return ' '.join(
+            (f"scoreboard players {self.action} {self.target}",
+             *((self.objective, ) if self.objective else ()),
+             *self.arguments))
+
+
+@dataclass(frozen=True, eq=True, slots=True)
+class Execute(Command):
+    """
+    Dataclass containing `execute <subcommands> [run <command>]`
+    """
+    subcommands: tuple[str, ...]
+    """Subcommands with their arguments (for example `as @a` and `if score @s obj matches 1`)"""
+    run: Command | None = None
+    """Command after `run`, None if there's no `run`"""
+
+    def __str__(self) -> str:
+        subcommands = ' '.join(self.subcommands)
+        if self.run is None:
+            return f"execute {subcommands}"
+        if not subcommands:
+            return f"execute run {self.run}"
+        return f"execute {subcommands} run {self.run}"
+
+
+OPENING_BRACKETS = {'[': ']', '{': '}', '(': ')'}
+CLOSING_BRACKETS = {']', '}', ')'}
+SPECIAL_CHAR_PATTERN = re.compile(r'[\[\]{}()"\'\\ ]')
+"""Pattern of characters split_arguments has to look at"""
+
+
+def split_arguments(string: str) -> list[str] | None:
+    """
+    Split a command into arguments by spaces that are not inside a bracket or a quote
+
+    :param string: Command
+    :return: List of arguments, None if brackets or quotes aren't closed or there are consecutive spaces
+    """
+    if not string or string[-1] == ' ':
+        return None
+    if all(char not in string for char in '[]{}()"'):
+        # Fast path, nothing to keep together
+        split = string.split(' ')
+        return None if '' in split else split
+
+    arguments: list[str] = []
+    brackets: list[str] = []
+    quote: str | None = None
+    escaped_index = -1  # Index of the character escaped by a backslash inside a quote
+    start = 0
+    for match in SPECIAL_CHAR_PATTERN.finditer(string):
+        char = match.group(0)
+        index = match.start()
+        if quote is not None:
+            if index == escaped_index:
+                continue
+            if char == '\\':
+                escaped_index = index + 1
+            elif char == quote:
+                quote = None
+        elif char == '"' or (char == "'" and brackets):
+            # Single quote is only a quote in NBT
+            quote = char
+        elif char in OPENING_BRACKETS:
+            brackets.append(OPENING_BRACKETS[char])
+        elif char in CLOSING_BRACKETS:
+            if not brackets or brackets.pop() != char:
+                return None
+        elif char == ' ' and not brackets:
+            if index == start:
+                return None
+            arguments.append(string[start:index])
+            start = index + 1
+    if quote is not None or brackets:
+        return None
+    arguments.append(string[start:])
+    return arguments
+
+
+def get_subcommand_length(arguments: list[str], index: int) -> int:
+    """
+    Get the amount of arguments of an execute subcommand (including the subcommand itself)
+
+    :param arguments: Arguments of execute command
+    :param index: Index of the subcommand
+    :return: Amount of arguments, 0 if it's not a known subcommand
+    """
+    subcommand = arguments[index]
+    next_argument = arguments[index +
+                              1] if index + 1 < len(arguments) else None
+    if subcommand in {'align', 'anchored', 'as', 'at', 'in', 'on', 'summon'}:
+        return 2
+    if subcommand == 'rotated':
+        # `rotated as <targets>` or `rotated <yaw> <pitch>`
+        return 3
+    if subcommand == 'facing':
+        # `facing entity <targets> <anchor>` or `facing <x> <y> <z>`
+        return 4
+    if subcommand == 'positioned':
+        return 3 if next_argument in {'as', 'over'} else 4
+    if subcommand == 'store':
+        if index + 2 >= len(arguments):
+            return 0
+        return {
+            'score': 5,
+            'block': 9,
+            'bossbar': 5,
+            'storage': 7,
+            'entity': 7
+        }.get(arguments[index + 2], 0)
+    if subcommand in {'if', 'unless'}:
+        if next_argument == 'data':
+            if index + 2 >= len(arguments):
+                return 0
+            return 7 if arguments[index + 2] == 'block' else 5
+        if next_argument == 'score':
+            if index + 4 >= len(arguments):
+                return 0
+            return 6 if arguments[index + 4] == 'matches' else 7
+        if next_argument == 'items':
+            if index + 2 >= len(arguments):
+                return 0
+            return 8 if arguments[index + 2] == 'block' else 6
+        return {
+            'biome': 6,
+            'block': 6,
+            'blocks': 12,
+            'dimension': 3,
+            'entity': 3,
+            'function': 3,
+            'loaded': 5,
+            'predicate': 3
+        }.get(next_argument, 0)  # type: ignore[arg-type]
+    return 0
+
+
+def parse_execute(arguments: list[str]) -> Execute | None:
+    """
+    Parse arguments after `execute`
+
+    :param arguments: Arguments after `execute`
+    :return: Execute, None if there's an unknown subcommand
+    """
+    subcommands: list[str] = []
+    index = 0
+    while index < len(arguments):
+        if arguments[index] == 'run':
+            if index + 1 >= len(arguments):
+                return None
+            return Execute(tuple(subcommands), parse_arguments(arguments[index + 1:]))
+        length = get_subcommand_length(arguments, index)
+        if not length or index + length > len(arguments):
+            return None
+        subcommands.append(' '.join(arguments[index:index + length]))
+        index += length
+    return Execute(tuple(subcommands))
+
+
+def parse_arguments(arguments: list[str]) -> Command:
+    """
+    Parse a command that is already split into arguments
+
+    :param arguments: Arguments of the command
+    :return: Command
+    """
+    command: Command | None = None
+    if arguments[0] == 'execute':
+        command = parse_execute(arguments[1:])
+    elif arguments[0] == 'function' and len(arguments) >= 2:
+        command = FunctionCall(arguments[1], ' '.join(arguments[2:]))
+    elif arguments[0] == 'scoreboard' and len(arguments) >= 4 and arguments[1] == 'players':
+        action = arguments[2]
+        if action in {'set', 'add', 'remove', 'get', 'enable', 'operation'} and len(arguments) >= 5:
+            command = ScoreboardPlayers(
+                action, arguments[3], arguments[4], tuple(arguments[5:]))
+        elif action == 'reset':
+            command = ScoreboardPlayers(
+                action, arguments[3], arguments[4] if len(arguments) > 4 else '', tuple(arguments[5:]))
+    if command is None:
+        return RawCommand(' '.join(arguments))
+    return command
+
+
+def parse_command(string: str) -> Command:
+    """
+    Parse a single line of minecraft command into IR
+
+    - Commands are only parsed if they can be turned back into the exact same string
+
+    :param string: Minecraft command
+    :return: Command
+    """
+    if not string.startswith(('execute ', 'function ', 'scoreboard players ')):
+        return RawCommand(string)
+    arguments = split_arguments(string)
+    if arguments is None:
+        return RawCommand(string)
+    command = parse_arguments(arguments)
+    if isinstance(command, RawCommand) or str(command) != string:
+        return RawCommand(string)
+    return command
+
+
+def optimize_command(command: Command) -> Command:
+    """
+    Optimize a command by removing redundancy from execute
+
+    - `execute run <command>` becomes `<command>`
+    - `execute ... run execute ...` is merged into a single execute
+    - `execute as @s` becomes `execute if entity @s`
+
+    :param command: Command
+    :return: Optimized command
+    """
+    if not isinstance(command, Execute):
+        return command
+    subcommands = command.subcommands
+    run = command.run
+    while isinstance(run, Execute):
+        subcommands += run.subcommands
+        run = run.run
+    subcommands = tuple('if entity @s' if subcommand == 'as @s' else subcommand
+                        for subcommand in subcommands)
+    if not subcommands and run is not None:
+        return run
+    if subcommands == command.subcommands and run is command.run:
+        return command
+    return Execute(subcommands, run)
@@ -1,13 +1,17 @@
 """Module responsibile for all compiling in jmc"""
-from json import JSONDecodeError, dump, dumps, loads
+from json import JSONDecodeError, dumps, loads
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Iterator
+from zipfile import ZIP_DEFLATED, BadZipFile, ZipFile, ZipInfo
 
+from .build_record import BUILD_RECORD_FILE_NAME, BuildRecord, hash_file
+from .function_cache import FunctionCache
 from .header import Header
 from .header_parse import parse_header
 from .lexer import Lexer
 from .log import Logger
-from .datapack import DataPack
+from .output_writer import OUTPUT_MANIFEST_FILE_NAME, ZIP_DATE_TIME, OutputSink, OutputWriter, VirtualSink, ZipSink
+from .datapack import DataPack, Function
 from .exception import JMCBuildError
 
 import shutil
@@ -19,22 +23,195 @@ logger = Logger(__name__)
 JMC_CERT_FILE_NAME = 'jmc.txt'
 
 
-def compile_jmc(config: "Configuration", debug: bool = False) -> None:
+def compile_jmc(config: "Configuration", debug: bool = False,
+                is_force_build: bool = False, is_streaming: bool = False) -> None:
     """
     Compile the files and build the datapack
 
+    - Skip everything if no file was changed since the last build (According to the build record next to JMC.txt) and the output is intact
+    - With `#cache`, imported files are reused from the last build when neither they nor anything they import changed
+    - In streaming mode, every function (and private functions made inside it) is written and released as soon as it's parsed
+
     :param config: Configuration dictionary
     :param debug: Whether to debug into log, defaults to False
+    :param is_force_build: Whether to build even if no file was changed, defaults to False
+    :param is_streaming: Whether to write functions while parsing to lower memory usage, defaults to False
     """
     logger.info("Configuration:\n" + dumps(config.toJSON(), indent=2))
+    namespace_folder = Path(config.output) / 'data' / config.namespace
+    record_file = namespace_folder / BUILD_RECORD_FILE_NAME
+    settings = get_build_settings(config)
+    record = None
+    if not is_force_build:
+        if is_zip_output(config):
+            record_str = read_zip_file(Path(config.output), record_file)
+            record = None if record_str is None else BuildRecord.loads(
+                record_str)
+        else:
+            record = BuildRecord.load(record_file)
+        if record is not None and record.is_up_to_date(settings) and is_output_intact(config):
+            logger.info("Nothing changed since the last build")
+            return
     Header.clear()
     read_header(config)
     read_cert(config)
     logger.info("Parsing")
-    lexer = Lexer(config)
+    cache_folder = Header().cache_folder
+    function_cache = None if cache_folder is None else FunctionCache(
+        cache_folder, settings)
+    sink = make_output_sink(config)
+    streamed_count = 0
+    streamed_size = 0
+
+    def stream(func_path: str, func: Function) -> None:
+        nonlocal streamed_count, streamed_size
+        content = post_process(func.content)
+        if content:
+            sink.add(get_function_path(func_path, config), content)
+            streamed_count += 1
+            streamed_size += len(content)
+
+    # Imported files are reused from the function cache unless they or anything they import changed
+    reusable_files = None if record is None or function_cache is None else record.get_reusable_files()
+    lexer = Lexer(config, function_cache=function_cache,
+                  stream=stream if is_streaming else None, reusable_files=reusable_files)
+    if function_cache is not None:
+        logger.info(
+            f"Function cache: {function_cache.hits} hits, {function_cache.misses} misses")
+    if is_streaming:
+        logger.info(
+            f"Streamed {streamed_count} functions ({streamed_size} characters) before building instead of keeping them in memory")
     if debug:
         logger.info(f'Datapack :{lexer.datapack!r}')
-    build(lexer.datapack, config)
+    build(lexer.datapack, config, sink=sink)
+    if is_zip_output(config):
+        sink.add(namespace_folder / JMC_CERT_FILE_NAME,
+                 cert_config_to_string(get_cert()))
+    if function_cache is not None:
+        function_cache.evict()
+    sink.close()
+    # Only recorded after every file is written, a failed build must never be up to date
+    save_build_record(make_build_record(
+        lexer, config, settings), record_file, config)
+
+
+def is_zip_output(config: "Configuration") -> bool:
+    """
+    Whether to build the datapack into a zip file instead of a folder (Output path ends with .zip)
+
+    :param config: JMC configuration
+    :return: Whether the output is a zip file
+    """
+    return Path(config.output).suffix.lower() == '.zip'
+
+
+def is_output_intact(config: "Configuration") -> bool:
+    """
+    Whether every file the last build wrote is still in the output
+
+    :param config: JMC configuration
+    :return: Whether no output file was deleted or modified
+    """
+    if is_zip_output(config):
+        # The build record is read from inside the zip file, which is only ever replaced as a whole
+        return True
+    output_folder = Path(config.output)
+    return OutputWriter.is_intact(
+        output_folder, output_folder / 'data' / config.namespace / OUTPUT_MANIFEST_FILE_NAME)
+
+
+def read_zip_file(zip_path: Path, path: Path) -> str | None:
+    """
+    Read a file inside a zip output
+
+    :param zip_path: Path to the zip file
+    :param path: Path to the file (as if the zip file was a folder)
+    :return: Content of the file, None if the zip file or the file doesn't exist
+    """
+    try:
+        with ZipFile(zip_path) as zip_file:
+            return zip_file.read(path.relative_to(zip_path).as_posix()).decode()
+    except (OSError, KeyError, BadZipFile):
+        return None
+
+
+def save_build_record(record: BuildRecord, path: Path,
+                      config: "Configuration") -> None:
+    """
+    Write the build record into the output (appended into the zip file if the output is a zip file)
+
+    :param record: Build record
+    :param path: Path to the build record (as if the zip file was a folder)
+    :param config: JMC configuration
+    """
+    if not is_zip_output(config):
+        record.save(path)
+        return
+    zip_path = Path(config.output)
+    info = ZipInfo(path.relative_to(zip_path).as_posix(),
+                   date_time=ZIP_DATE_TIME)
+    info.compress_type = ZIP_DEFLATED
+    with ZipFile(zip_path, 'a', ZIP_DEFLATED) as zip_file:
+        zip_file.writestr(info, record.dumps())
+
+
+def make_output_sink(config: "Configuration") -> OutputSink:
+    """
+    Make the sink that built files are written to
+
+    :param config: JMC configuration
+    :return: ZipSink if the output is a zip file, otherwise OutputWriter
+    """
+    output_folder = Path(config.output)
+    if is_zip_output(config):
+        return ZipSink(output_folder)
+    namespace_folder = output_folder / 'data' / config.namespace
+    return OutputWriter(
+        output_folder,
+        namespace_folder / OUTPUT_MANIFEST_FILE_NAME,
+        [namespace_folder, output_folder / 'data' / 'minecraft'],
+        {*Header().statics,
+         namespace_folder / JMC_CERT_FILE_NAME,
+         namespace_folder / BUILD_RECORD_FILE_NAME,
+         namespace_folder / OUTPUT_MANIFEST_FILE_NAME}
+    )
+
+
+def get_build_settings(config: "Configuration") -> dict[str, Any]:
+    """
+    Get everything other than files that the build depends on
+
+    :param config: JMC configuration
+    :return: Dictionary of setting name and its value
+    """
+    return {
+        "config": config.toJSON(),
+        "version": getattr(config.global_data, "VERSION", None)
+    }
+
+
+def make_build_record(lexer: Lexer, config: "Configuration",
+                      settings: dict[str, Any]) -> BuildRecord:
+    """
+    Make a build record of files read in the build
+
+    :param lexer: Lexer of the build
+    :param config: JMC configuration
+    :param settings: Everything other than files that the build depends on
+    :return: Build record
+    """
+    files: dict[str, str | None] = {
+        Path(path_str).resolve().as_posix(): hash_file(Path(path_str))
+        for path_str in Header().file_read
+    }
+    # Creating the main header file changes the build
+    main_header_file = Path(config.target_str[:-len(".jmc")] + ".hjmc")
+    files[main_header_file.resolve().as_posix()] = hash_file(main_header_file)
+    cert_file = Path(config.output) / 'data' / \
+        config.namespace / JMC_CERT_FILE_NAME
+    files[cert_file.resolve().as_posix()] = hash_file(cert_file)
+    files.update(lexer.file_hashes)
+    return BuildRecord(settings, files, lexer.import_folders, lexer.imports)
 
 
 def cert_config_to_string(cert_config: dict[str, str]) -> str:
@@ -166,6 +343,15 @@ def read_cert(config: "Configuration", _test_file: str | None = None):
     namespace_folder = Path(config.output) / 'data' / config.namespace
     minecraft_folder = Path(config.output) / 'data' / 'minecraft'
     cert_file = namespace_folder / JMC_CERT_FILE_NAME
+    if _test_file is None and is_zip_output(config):
+        # The certificate is written into the zip file by compile_jmc
+        if Path(config.output).is_file():
+            cert_str = read_zip_file(Path(config.output), cert_file)
+            if cert_str is None:
+                raise JMCBuildError(
+                    f"{JMC_CERT_FILE_NAME} file not found in {Path(config.output).name}.\n To prevent accidental overriding of your datapack please delete the zip file yourself.")
+            set_cert(cert_str)
+        return
     old_cert_config = get_cert()
     if namespace_folder.is_dir() or _test_file is not None:
         if not cert_file.is_file() and _test_file is None:
@@ -176,24 +362,10 @@ def read_cert(config: "Configuration", _test_file: str | None = None):
                 cert_str = file.read()
         else:
             cert_str = _test_file
-        try:
-            cert_config = string_to_cert_config(cert_str)
-        except ValueError:
-            cert_config = {}
-        DataPack.load_name = cert_config.get(
-            "LOAD", old_cert_config["LOAD"])
-        DataPack.tick_name = cert_config.get(
-            "TICK", old_cert_config["TICK"])
-        DataPack.private_name = cert_config.get(
-            "PRIVATE", old_cert_config["PRIVATE"])
-        DataPack.var_name = cert_config.get(
-            "VAR", old_cert_config["VAR"])
-        DataPack.int_name = cert_config.get(
-            "INT", old_cert_config["INT"])
-        DataPack.storage_name = cert_config.get(
-            "STORAGE", old_cert_config["STORAGE"])
+        set_cert(cert_str)
         cert_config = get_cert()
-        if _test_file is None:
+        # With a manifest of the last build, stale files are deleted after building instead
+        if _test_file is None and not (namespace_folder / OUTPUT_MANIFEST_FILE_NAME).is_file():
             statics = Header().statics
             if statics:
                 rmtree(namespace_folder, statics)
@@ -207,6 +379,31 @@ def read_cert(config: "Configuration", _test_file: str | None = None):
         make_cert(cert_config, cert_file)
 
 
+def set_cert(cert_str: str) -> None:
+    """
+    Set DataPack class info from certificate (Missing keys are left unchanged)
+
+    :param cert_str: Content of certificate file
+    """
+    old_cert_config = get_cert()
+    try:
+        cert_config = string_to_cert_config(cert_str)
+    except ValueError:
+        cert_config = {}
+    DataPack.load_name = cert_config.get(
+        "LOAD", old_cert_config["LOAD"])
+    DataPack.tick_name = cert_config.get(
+        "TICK", old_cert_config["TICK"])
+    DataPack.private_name = cert_config.get(
+        "PRIVATE", old_cert_config["PRIVATE"])
+    DataPack.var_name = cert_config.get(
+        "VAR", old_cert_config["VAR"])
+    DataPack.int_name = cert_config.get(
+        "INT", old_cert_config["INT"])
+    DataPack.storage_name = cert_config.get(
+        "STORAGE", old_cert_config["STORAGE"])
+
+
 def read_func_tag(path: Path, config: "Configuration") -> dict[str, Any]:
     """
     Read minecraft function tag file
@@ -254,90 +451,105 @@ def post_process(string: str) -> str:
     return string
 
 
-def build(datapack: DataPack, config: "Configuration",
-          _is_virtual: bool = False) -> dict[str, str] | None:
+def get_function_path(func_path: str, config: "Configuration") -> Path:
     """
-    Build and write files for minecraft datapack
+    Get path of the mcfunction file of a function
+
+    :param func_path: Path of the function (key of DataPack.functions)
+    :param config: JMC configuration
+    :return: Path to the mcfunction file
+    """
+    if Header().is_override_minecraft and func_path.startswith("minecraft/"):
+        # len("minecraft/") = 10
+        return Path(config.output) / 'data' / 'minecraft' / 'functions' / \
+            (func_path[10:] + '.mcfunction')
+    return Path(config.output) / 'data' / config.namespace / \
+        'functions' / (func_path + '.mcfunction')
+
+
+def iter_build(datapack: DataPack, config: "Configuration", is_merge_tags: bool = False,
+               is_pack_meta: bool = True) -> Iterator[tuple[Path, str]]:
+    """
+    Finalize the datapack and make its files one by one (NO file writing)
+
+    - Content of each file is only made when it's reached, so the whole datapack is never held as strings at once
 
     :param datapack: DataPack object
     :param config: JMC configuration
-    :param _is_virtual: Whether to make a dictionary of output result instead of writing to files
-    :returns: Dictionary of file path and file content if _is_virtual is True
+    :param is_merge_tags: Whether to merge function tags (load.json and tick.json) with existing ones in the output folder, defaults to False
+    :param is_pack_meta: Whether to make pack.mcmeta, defaults to True
+    :return: Iterator of file path and file content
     """
-    output: dict[str, Any] = {}
     header = Header()
-
-    logger.debug(f"Building (_is_virtual={_is_virtual})")
     datapack.build()
     output_folder = Path(config.output)
     namespace_folder = output_folder / 'data' / config.namespace
-    functions_tags_folder = output_folder / \
-        'data' / 'minecraft' / 'tags' / 'functions'
-
-    if not _is_virtual:
-        functions_tags_folder.mkdir(exist_ok=True, parents=True)
+    minecraft_folder = output_folder / 'data' / 'minecraft'
+    functions_tags_folder = minecraft_folder / 'tags' / 'functions'
     load_tag = functions_tags_folder / 'load.json'
     tick_tag = functions_tags_folder / 'tick.json'
 
-    load_json = {"values": []} if _is_virtual else read_func_tag(
-        load_tag, config)
-    tick_json = {"values": []} if _is_virtual else read_func_tag(
-        tick_tag, config)
+    if is_merge_tags:
+        load_json = read_func_tag(load_tag, config)
+        tick_json = read_func_tag(tick_tag, config)
+    else:
+        load_json = {"values": []}
+        tick_json = {"values": []}
 
     load_json["values"].append(f'{config.namespace}:{DataPack.load_name}')
-    if _is_virtual:
-        output[load_tag.as_posix()] = dumps(load_json, indent=2)
-    else:
-        with load_tag.open('w+') as file:
-            dump(load_json, file, indent=2)
+    yield load_tag, dumps(load_json, indent=2)
 
     if DataPack.tick_name in datapack.functions and datapack.functions[DataPack.tick_name]:
         tick_json["values"].append(
             f'{config.namespace}:{DataPack.tick_name}')
-        if _is_virtual:
-            output[tick_tag.as_posix()] = dumps(tick_json, indent=2)
-        else:
-            with tick_tag.open('w+') as file:
-                dump(tick_json, file, indent=2)
+        yield tick_tag, dumps(tick_json, indent=2)
 
     for func_path, func in datapack.functions.items():
-        if header.is_override_minecraft and func_path.startswith("minecraft/"):
-            # len("minecraft/") = 10
-            path = output_folder / 'data' / 'minecraft' / 'functions' / \
-                (func_path[10:] + '.mcfunction')
-        else:
-            path = namespace_folder / 'functions' / (func_path + '.mcfunction')
         content = post_process(func.content)
         if content:
-            if _is_virtual:
-                output[path.as_posix()] = content
-            else:
-                path.parent.mkdir(parents=True, exist_ok=True)
-                with path.open('w+') as file:
-                    file.write(content)
+            yield get_function_path(func_path, config), content
 
     for json_path, json in datapack.jsons.items():
         if header.is_override_minecraft and json_path.startswith("minecraft/"):
             # len("minecraft/") = 10
-            path = output_folder / 'data' / \
-                'minecraft' / (json_path[10:] + '.json')
+            path = minecraft_folder / (json_path[10:] + '.json')
         else:
             path = namespace_folder / (json_path + '.json')
         if json:
-            if _is_virtual:
-                output[path.as_posix()] = dumps(json, indent=2)
-            else:
-                path.parent.mkdir(parents=True, exist_ok=True)
-                with path.open('w+') as file:
-                    dump(json, file, indent=2)
-    if _is_virtual:
-        return output
-
-    with (output_folder / 'pack.mcmeta').open('w+') as file:
-        dump({
+            yield path, dumps(json, indent=2)
+
+    if is_pack_meta:
+        yield output_folder / 'pack.mcmeta', dumps({
             "pack": {
                 "pack_format": int(config.pack_format),
                 "description": config.description
             }
-        }, file, indent=2)
+        }, indent=2)
+
+
+def build(datapack: DataPack, config: "Configuration",
+          _is_virtual: bool = False, sink: OutputSink | None = None) -> dict[str, str] | None:
+    """
+    Build and write files for minecraft datapack
+
+    - Files are added to the sink as they are made, the sink is closed only if it's made here
+
+    :param datapack: DataPack object
+    :param config: JMC configuration
+    :param _is_virtual: Whether to make a dictionary of output result instead of writing to files
+    :param sink: Sink to add built files to, defaults to make_output_sink(config)
+    :returns: Dictionary of file path and file content if _is_virtual is True
+    """
+    is_close = sink is None
+    if sink is None:
+        sink = VirtualSink() if _is_virtual else make_output_sink(config)
+
+    logger.debug(f"Building (_is_virtual={_is_virtual})")
+    for path, content in iter_build(datapack, config, is_merge_tags=sink.is_merge_tags,
+                                    is_pack_meta=not _is_virtual):
+        sink.add(path, content)
+    if is_close:
+        sink.close()
+    if isinstance(sink, VirtualSink):
+        return sink.outputs
     return None
@@ -1,12 +1,18 @@
 """Module handling datapack"""
 from collections import defaultdict
-from typing import TYPE_CHECKING, Any, Iterable
+from hashlib import sha256
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
 from json import JSONEncoder, dumps
+import re
 
 
 from .tokenizer import Token, TokenType, Tokenizer
-from .datapack_data import Data
+from .capability import is_supported
+from .datapack_data import Data, Item
+from .command_ir import Command, RawCommand, parse_command
 from .exception import JMCSyntaxWarning, JMCValueError
+from .header import Header
+from .optimizer import Optimizer
 from .log import Logger
 
 if TYPE_CHECKING:
@@ -17,6 +23,127 @@ logger = Logger(__name__)
 
 
 NEW_LINE = '\n'
+PRIVATE_COUNT_MARK = '\x00'
+"""Character surrounding a private function's group and count when private function names are hashed"""
+PRIVATE_COUNT_PATTERN = re.compile(
+    f"{PRIVATE_COUNT_MARK}([^{PRIVATE_COUNT_MARK}]*){PRIVATE_COUNT_MARK}([0-9]+){PRIVATE_COUNT_MARK}")
+"""Pattern matching a count from DataPack.get_count when private function names are hashed"""
+HASH_NAME_LENGTH = 12
+"""Length of a hashed private function name"""
+
+
+def replace_private_counts(obj: Any, replace: Callable[[re.Match[str]], str]) -> Any:
+    """
+    Replace every count from DataPack.get_count in strings (including dictionary keys) inside JSON serializable object
+
+    :param obj: JSON serializable object
+    :param replace: Function returning replacement of a count
+    :return: Object after replacing
+    """
+    if isinstance(obj, str):
+        return PRIVATE_COUNT_PATTERN.sub(
+            replace, obj) if PRIVATE_COUNT_MARK in obj else obj
+    if isinstance(obj, list):
+        return [replace_private_counts(item, replace) for item in obj]
+    if isinstance(obj, dict):
+        return {replace_private_counts(key, replace): replace_private_counts(value, replace)
+                for key, value in obj.items()}
+    return obj
+
+
+def replace_strings(obj: Any, replace: Callable[[str], str]) -> Any:
+    """
+    Replace every string value (not dictionary keys) inside JSON serializable object
+
+    :param obj: JSON serializable object
+    :param replace: Function returning replacement of a string
+    :return: Object after replacing
+    """
+    if isinstance(obj, str):
+        return replace(obj)
+    if isinstance(obj, list):
+        return [replace_strings(item, replace) for item in obj]
+    if isinstance(obj, dict):
+        return {key: replace_strings(value, replace)
+                for key, value in obj.items()}
+    return obj
+
+
+def get_reference_pattern(prefix: str) -> re.Pattern[str]:
+    """
+    Get pattern matching a resource location starting with a prefix (for example `namespace:__private__/`)
+
+    :param prefix: Start of the resource location
+    :return: Pattern matching the whole resource location
+    """
+    return re.compile(r"(?<![\w.:/-])" + re.escape(prefix) + r"[\w./-]+")
+
+
+def iter_strings(obj: Any) -> Iterator[str]:
+    """
+    Iterate through every string value (not dictionary keys) inside JSON serializable object
+
+    :param obj: JSON serializable object
+    :return: Iterator of strings
+    """
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, list):
+        for item in obj:
+            yield from iter_strings(item)
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            yield from iter_strings(value)
+
+
+def get_strongly_connected_components(
+        graph: dict[str, list[str]]) -> list[list[str]]:
+    """
+    Find strongly connected components of a graph (Tarjan's algorithm)
+
+    :param graph: Dictionary of node and nodes it points to
+    :return: List of components, a component comes after every component it points to
+    """
+    indexes: dict[str, int] = {}
+    low_links: dict[str, int] = {}
+    stack: list[str] = []
+    on_stack: set[str] = set()
+    components: list[list[str]] = []
+    for root in graph:
+        if root in indexes:
+            continue
+        work: list[tuple[str, int]] = [(root, 0)]
+        while work:
+            node, edge_index = work.pop()
+            if edge_index == 0:
+                indexes[node] = low_links[node] = len(indexes)
+                stack.append(node)
+                on_stack.add(node)
+            edges = graph[node]
+            while edge_index < len(edges):
+                child = edges[edge_index]
+                edge_index += 1
+                if child not in indexes:
+                    work.append((node, edge_index))
+                    work.append((child, 0))
+                    break
+                if child in on_stack:
+                    low_links[node] = min(low_links[node], indexes[child])
+            else:
+                if low_links[node] == indexes[node]:
+                    component: list[str] = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+                if work:
+                    parent = work[-1][0]
+                    low_links[parent] = min(
+                        low_links[parent], low_links[node])
+    return components
 
 
 class FunctionEncoder(JSONEncoder):
@@ -26,7 +153,7 @@ class FunctionEncoder(JSONEncoder):
 
     def default(self, o):
         if isinstance(o, Function):
-            return o.commands
+            return o.lines
         return super().default(o)
 
 
@@ -34,10 +161,12 @@ class Function:
     """
     A class representation for a minecraft function (.mcfunction)
 
+    - Commands are stored as IR and only turned into strings when the function is built
+
     :param commands: List of minecraft commands(string), defaults to empty list
     """
     __slots__ = ('commands', )
-    commands: list[str]
+    commands: list[Command]
 
     def __init__(self, commands: list[str] | None = None) -> None:
         if commands is None:
@@ -49,7 +178,7 @@ class Function:
         """
         Add empty line at the end of the function
         """
-        self.commands.append('')
+        self.commands.append(RawCommand(''))
 
     def append(self, command: str) -> None:
         """
@@ -84,6 +213,19 @@ class Function:
         """
         del self.commands[index]
 
+    @property
+    def lines(self) -> list[str]:
+        """
+        Commands of the function as strings
+
+        :return: List of minecraft commands(string)
+        """
+        return [str(command) for command in self.commands]
+
+    @lines.setter
+    def lines(self, lines: list[str]) -> None:
+        self.commands = [parse_command(line) for line in lines]
+
     @property
     def content(self) -> str:
         """
@@ -91,7 +233,7 @@ class Function:
 
         :return: Commands of the function in form of a single string
         """
-        return '\n'.join(self.commands)
+        return '\n'.join(self.lines)
 
     @property
     def length(self) -> int:
@@ -103,23 +245,23 @@ class Function:
         return len(self.commands)
 
     def __repr__(self) -> str:
-        return f"Function({repr(self.commands)})"
+        return f"Function({repr(self.lines)})"
 
     def __iter__(self) -> Iterable:
-        return self.commands.__iter__()
+        return self.lines.__iter__()
 
     def __bool__(self):
         return bool(self.commands)
 
-    def __split(self, strings: list[str]) -> list[str]:
+    def __split(self, strings: list[str]) -> list[Command]:
         """
         Loop through every line in each string of command(s) and make a new list with every element having only 1 line of command
 
         :param strings: minecraft commands(strings),each string can have multiple lines
-        :return: minecraft commands(strings),each string can have only a single line
+        :return: minecraft commands(IR),each having only a single line
         """
         return [
-            line for string in strings for line in string.split('\n') if line]
+            parse_command(line) for string in strings for line in string.split('\n') if line]
 
 
 class DataPack:
@@ -180,8 +322,17 @@ class DataPack:
         self.data = Data()
         """Extra information that can be shared across all JMC function"""
 
-        self.defined_file_pos: dict[str, tuple[Token, Tokenizer]] = {}
-        """Dictionary of mcfunction or json path and it's first defined token and tokenizer"""
+        self.defined_file_pos: dict[str, tuple[int, int, str]] = {}
+        """Dictionary of mcfunction or json path and line, column and file path where it was first defined (Tokenizers aren't kept alive)"""
+
+        self.is_hash_private_name = Header().is_hash_private_name
+        """Whether to name private functions by hash of their content instead of count (`#hash_private_names`)"""
+
+        self.is_marking_counts = self.is_hash_private_name
+        """Whether DataPack.get_count marks counts so that they can be relocated or hashed (while parsing a cached function or with `#hash_private_names`)"""
+
+        self.optimizer = Optimizer(Header().optimizations, self.int_name)
+        """Optimizer of commands (`#optimize`)"""
 
     def add_objective(self, objective: str, criteria: str = 'dummy') -> None:
         """
@@ -196,6 +347,15 @@ class DataPack:
                 f"Conflict on adding scoreboard, '{objective}' objective with '{self.__scoreboards[objective]}' criteria already exist.\nGot same objective with '{criteria}' criteria.")
         self.__scoreboards[objective] = criteria
 
+    def supports(self, capability: str) -> bool:
+        """
+        Whether pack_format of the datapack supports a capability
+
+        :param capability: Name of the capability (from capability.CAPABILITIES)
+        :return: Whether commands of the capability can be used
+        """
+        return is_supported(capability, self.lexer.config.pack_format)
+
     def get_count(self, name: str) -> str:
         """
         Get count as a string from private function's group
@@ -205,6 +365,10 @@ class DataPack:
         """
         count = self.private_function_count[name]
         self.private_function_count[name] += 1
+        if self.is_marking_counts:
+            # Replaced with the hash (or the count if it's not a private function's name) in DataPack.build,
+            # or with the count in DataPack.resolve_private_counts
+            return f"{PRIVATE_COUNT_MARK}{name}{PRIVATE_COUNT_MARK}{count}{PRIVATE_COUNT_MARK}"
         return str(count)
 
     def call_func(self, name: str, count: str) -> str:
@@ -309,8 +473,7 @@ class DataPack:
         :param tokenizer: token's tokenizer
         :return: List of minecraft commands(string)
         """
-        return self.lexer.parse_func_content(
-            token.string[1:-1], tokenizer.file_path, token.line, token.col, tokenizer.file_string)
+        return self.lexer.parse_func_content(token, tokenizer)
 
     def add_tick_command(self, command: str) -> None:
         """
@@ -336,6 +499,555 @@ class DataPack:
         """
         self.ints.add(integer)
 
+    def get_state(self) -> list[Any]:
+        """
+        Get everything in the datapack that can change the result of parsing a function (for caching parsed functions)
+
+        :return: JSON serializable state
+        """
+        # Counts are relocated in DataPack.relocate_private_counts instead
+        # (Data counters are only used by load only commands, which are never cached)
+        return [
+            sorted((item_id, str(item))
+                   for item_id, item in self.data.item.items()),
+            sorted(self.used_command)
+        ]
+
+    def get_file_state(self) -> list[Any]:
+        """
+        Get everything in the datapack that can change the result of parsing a file (for caching parsed files)
+
+        :return: JSON serializable state
+        """
+        # Load only commands in the file can use Data counters
+        return [self.get_state(), self.data.get_counts(),
+                sorted(self.defined_file_pos)]
+
+    def isolate_private_functions(self) -> dict[str, dict[str, Function]]:
+        """
+        Replace private functions with an empty one so that private functions made by parsing a function can be taken out
+
+        :return: Previous private functions (for DataPack.restore_private_functions)
+        """
+        private_functions = self.private_functions
+        self.private_functions = defaultdict(dict)
+        return private_functions
+
+    def restore_private_functions(
+            self, private_functions: dict[str, dict[str, Function]]) -> dict[str, dict[str, Function]]:
+        """
+        Put previous private functions back without adding private functions made since DataPack.isolate_private_functions
+
+        :param private_functions: Previous private functions
+        :return: Private functions made since DataPack.isolate_private_functions
+        """
+        new_private_functions = self.private_functions
+        self.private_functions = private_functions
+        return new_private_functions
+
+    def isolate_outputs(self) -> tuple[Any, ...]:
+        """
+        Replace outputs with empty ones so that outputs of parsing a function can be taken out
+
+        :return: Previous outputs (for DataPack.restore_outputs)
+        """
+        outputs = (self.private_functions, self.jsons, self.__scoreboards, self.loads, self.ticks,
+                   set(self.ints), set(self.used_command), dict(self.private_function_count), self.data.get_counts())
+        self.private_functions = defaultdict(dict)
+        self.jsons = defaultdict(dict)
+        self.__scoreboards = {}
+        self.loads = []
+        self.ticks = []
+        return outputs
+
+    def restore_outputs(self, outputs: tuple[Any, ...]) -> dict[str, Any]:
+        """
+        Put previous outputs back and take outputs made since DataPack.isolate_outputs out
+
+        :param outputs: Previous outputs
+        :return: JSON serializable changes (for DataPack.apply_changes)
+        """
+        private_functions, jsons, scoreboards, loads, ticks, ints, used_command, private_function_count, data_counts = outputs
+        changes = {
+            "private_functions": {name: {count: func.lines for count, func in functions.items()}
+                                  for name, functions in self.private_functions.items()},
+            "jsons": dict(self.jsons),
+            "objectives": self.__scoreboards,
+            "loads": self.loads,
+            "ticks": self.ticks,
+            "ints": sorted(self.ints - ints),
+            "used_command": sorted(self.used_command - used_command),
+            "private_function_count": {name: count - private_function_count.get(name, 0)
+                                       for name, count in self.private_function_count.items()
+                                       if private_function_count.get(name, 0) != count},
+            "private_function_start": {name: private_function_count.get(name, 0)
+                                       for name, count in self.private_function_count.items()
+                                       if private_function_count.get(name, 0) != count},
+            "data": [count - start for count, start in zip(self.data.get_counts(), data_counts)],
+            "functions": {},
+            "items": {},
+            "defined_file_pos": {}
+        }
+        self.private_functions = private_functions
+        self.jsons = jsons
+        self.__scoreboards = scoreboards
+        self.loads = loads
+        self.ticks = ticks
+        self.ints = ints
+        self.used_command = used_command
+        self.private_function_count = defaultdict(int, private_function_count)
+        self.data.set_counts(data_counts)
+        return changes
+
+    def get_snapshot(self) -> tuple[Any, ...]:
+        """
+        Get sizes of outputs so that outputs made since then can be taken without isolating them
+        (Load only commands add to private functions made by earlier files)
+
+        :return: Snapshot (for DataPack.get_changes)
+        """
+        return ({path: func.length for path, func in self.functions.items()},
+                {name: {count: func.length for count, func in functions.items()}
+                 for name, functions in self.private_functions.items()},
+                {path: dumps(json) for path, json in self.jsons.items()},
+                dict(self.__scoreboards), len(self.loads), len(self.ticks),
+                set(self.ints), set(self.used_command), dict(self.private_function_count),
+                self.data.get_counts(), dict(self.data.item), set(self.defined_file_pos))
+
+    def get_changes(self, snapshot: tuple[Any, ...]) -> dict[str, Any] | None:
+        """
+        Get outputs made since DataPack.get_snapshot
+
+        :param snapshot: Snapshot from DataPack.get_snapshot
+        :return: JSON serializable changes (for DataPack.apply_changes), None if an output was shortened
+        """
+        (function_lengths, private_function_lengths, jsons, scoreboards, loads_length, ticks_length,
+         ints, used_command, private_function_count, data_counts, items, defined_file_pos) = snapshot
+
+        def get_added_lines(func: Function, length: int) -> list[str] | None:
+            if func.length < length:
+                return None
+            return [str(command) for command in func.commands[length:]]
+        functions: dict[str, list[str]] = {}
+        for path, func in self.functions.items():
+            lines = get_added_lines(func, function_lengths.get(path, 0))
+            if lines is None:
+                return None
+            if lines or path not in function_lengths:
+                functions[path] = lines
+        private_functions: dict[str, dict[str, list[str]]] = defaultdict(dict)
+        for name, functions_ in self.private_functions.items():
+            lengths = private_function_lengths.get(name, {})
+            for count, func in functions_.items():
+                lines = get_added_lines(func, lengths.get(count, 0))
+                if lines is None:
+                    return None
+                if lines or count not in lengths:
+                    private_functions[name][count] = lines
+        if len(self.loads) < loads_length or len(self.ticks) < ticks_length:
+            return None
+        return {
+            "private_functions": dict(private_functions),
+            "jsons": {path: json for path, json in self.jsons.items()
+                      if jsons.get(path) != dumps(json)},
+            "objectives": {objective: criteria for objective, criteria in self.__scoreboards.items()
+                           if objective not in scoreboards},
+            "loads": self.loads[loads_length:],
+            "ticks": self.ticks[ticks_length:],
+            "ints": sorted(self.ints - ints),
+            "used_command": sorted(self.used_command - used_command),
+            "private_function_count": {name: count - private_function_count.get(name, 0)
+                                       for name, count in self.private_function_count.items()
+                                       if private_function_count.get(name, 0) != count},
+            "private_function_start": {name: private_function_count.get(name, 0)
+                                       for name, count in self.private_function_count.items()
+                                       if private_function_count.get(name, 0) != count},
+            "data": [count - start for count, start in zip(self.data.get_counts(), data_counts)],
+            "functions": functions,
+            "items": {item_id: [item.item_type, item.nbt] for item_id, item in self.data.item.items()
+                      if items.get(item_id) != item},
+            "defined_file_pos": {path: pos for path, pos in self.defined_file_pos.items()
+                                 if path not in defined_file_pos}
+        }
+
+    def apply_changes(self, changes: dict[str, Any]) -> None:
+        """
+        Add outputs of parsing a function or a file
+
+        :param changes: Changes from DataPack.restore_outputs or DataPack.get_changes (after relocating and resolving counts)
+        """
+        # Lines are added as they are, Function.extend would drop empty lines
+        for name, functions in changes["private_functions"].items():
+            for count, commands in functions.items():
+                if count not in self.private_functions[name]:
+                    self.private_functions[name][count] = Function()
+                self.private_functions[name][count].commands.extend(
+                    parse_command(line) for line in commands)
+        for path, commands in changes["functions"].items():
+            if path not in self.functions:
+                self.functions[path] = Function()
+            self.functions[path].commands.extend(
+                parse_command(line) for line in commands)
+        self.jsons.update(changes["jsons"])
+        for objective, criteria in changes["objectives"].items():
+            self.add_objective(objective, criteria)
+        self.loads.extend(changes["loads"])
+        self.ticks.extend(changes["ticks"])
+        self.ints.update(changes["ints"])
+        self.used_command.update(changes["used_command"])
+        for name, count in changes["private_function_count"].items():
+            self.private_function_count[name] += count
+        self.data.set_counts([count + change for count, change in zip(
+            self.data.get_counts(), changes["data"])])
+        for item_id, (item_type, nbt) in changes["items"].items():
+            self.data.item[item_id] = Item(item_type, nbt)
+        for path, (line, col, file_path) in changes["defined_file_pos"].items():
+            self.defined_file_pos[path] = (line, col, file_path)
+
+    def relocate_private_counts(self, obj: Any,
+                                private_function_start: dict[str, int]) -> Any:
+        """
+        Shift counts (from DataPack.get_count while marking counts) made when the counts started at a different number
+
+        :param obj: JSON serializable object containing counts
+        :param private_function_start: Dictionary of private function's group and its count at the time the object was made
+        :return: Object after relocating
+        """
+        offsets = {name: self.private_function_count[name] - count
+                   for name, count in private_function_start.items()
+                   if self.private_function_count[name] != count}
+        if not offsets:
+            return obj
+
+        def relocate(match: re.Match[str]) -> str:
+            name, count = match.group(1), int(match.group(2))
+            if name not in offsets or count < private_function_start[name]:
+                return match.group(0)
+            return f"{PRIVATE_COUNT_MARK}{name}{PRIVATE_COUNT_MARK}{count + offsets[name]}{PRIVATE_COUNT_MARK}"
+        return replace_private_counts(obj, relocate)
+
+    @staticmethod
+    def resolve_private_counts(obj: Any) -> Any:
+        """
+        Replace every count from DataPack.get_count while marking counts with the count itself
+
+        :param obj: JSON serializable object containing counts
+        :return: Object after resolving
+        """
+        return replace_private_counts(obj, lambda match: match.group(2))
+
+    def resolve_private_names(self) -> None:
+        """
+        Replace every count from DataPack.get_count while marking counts with the count itself
+        """
+        for func in [*self.functions.values(), *(func for functions in self.private_functions.values()
+                                                 for func in functions.values())]:
+            lines = func.lines
+            if any(PRIVATE_COUNT_MARK in line for line in lines):
+                func.lines = self.resolve_private_counts(lines)
+        self.private_functions = self.resolve_private_counts(
+            self.private_functions)
+        self.jsons = self.resolve_private_counts(self.jsons)
+
+    def hash_private_names(self) -> None:
+        """
+        Replace every count from DataPack.get_count with the hash of the private function's group and content
+        (or the count itself if it isn't used as a private function's name)
+
+        - Called functions are hashed first so that a change in them changes the hash of their callers
+        - Functions calling each other in a loop are hashed together
+        """
+        groups: dict[str, str] = {}
+        contents: dict[str, str] = {}
+        for name, functions in self.private_functions.items():
+            for count, func in functions.items():
+                if PRIVATE_COUNT_PATTERN.fullmatch(count):
+                    groups[count] = name
+                    contents[count] = func.content
+        calls: dict[str, list[str]] = {
+            count: [match.group(0) for match in PRIVATE_COUNT_PATTERN.finditer(content)
+                    if match.group(0) in contents]
+            for count, content in contents.items()
+        }
+
+        names: dict[str, str] = {}
+        used_names: set[tuple[str, str]] = set()
+        for component in get_strongly_connected_components(calls):
+            def replace(match: re.Match[str]) -> str:
+                if match.group(0) in names:
+                    return names[match.group(0)]
+                if match.group(0) in component:
+                    return PRIVATE_COUNT_MARK
+                return match.group(2)
+            digests = {
+                count: sha256(
+                    f"{groups[count]}{PRIVATE_COUNT_MARK}{PRIVATE_COUNT_PATTERN.sub(replace, contents[count])}".encode()).hexdigest()
+                for count in component
+            }
+            if len(component) > 1 or component[0] in calls[component[0]]:
+                component_digest = "".join(sorted(digests.values()))
+                digests = {count: sha256((component_digest + digest).encode()).hexdigest()
+                           for count, digest in digests.items()}
+            for count in component:
+                name = digests[count][:HASH_NAME_LENGTH]
+                suffix = 1
+                while (groups[count], name) in used_names:
+                    suffix += 1
+                    name = f"{digests[count][:HASH_NAME_LENGTH]}_{suffix}"
+                used_names.add((groups[count], name))
+                names[count] = name
+
+        def resolve(match: re.Match[str]) -> str:
+            return names.get(match.group(0), match.group(2))
+        for func in self.functions.values():
+            func.lines = replace_private_counts(func.lines, resolve)
+        for functions in self.private_functions.values():
+            for func in functions.values():
+                func.lines = replace_private_counts(func.lines, resolve)
+        self.private_functions = replace_private_counts(
+            self.private_functions, resolve)
+        self.jsons = replace_private_counts(self.jsons, resolve)
+
+    def tree_shake_functions(self) -> None:
+        """
+        Remove functions (including private functions) that can't be reached from a root
+
+        - Roots are load and tick function, functions in `#keep`, every reference in jsons and in files of static folders
+          (and every function in minecraft namespace with `#override_minecraft`)
+        - Nothing is removed if a macro line can build a reference to the namespace, since where it goes is unknown
+        """
+        header = Header()
+        prefix = self.namespace + ':'
+        reference_pattern = get_reference_pattern(prefix)
+
+        def get_references(string: str) -> list[str]:
+            if prefix not in string:
+                return []
+            return [match.group(0)[len(prefix):] for match in reference_pattern.finditer(string)
+                    if match.group(0)[len(prefix):] in self.functions]
+
+        for func_path, func in self.functions.items():
+            for line in func.lines:
+                if line.startswith('$') and "$(" in line and self.namespace + ':' in line:
+                    logger.info(
+                        f"Tree shaking skipped, macro line in {func_path} may call any function: {line}")
+                    return
+
+        roots = [self.load_name, self.tick_name, *header.keep_functions]
+        if header.is_override_minecraft:
+            roots.extend(func_path for func_path in self.functions
+                         if func_path.startswith("minecraft/"))
+        for json in self.jsons.values():
+            for string in iter_strings(json):
+                roots.extend(get_references(string))
+        for static_folder in header.statics:
+            for path in static_folder.rglob('*'):
+                if path.suffix in {'.mcfunction', '.json'}:
+                    roots.extend(get_references(
+                        path.read_text(errors='ignore')))
+
+        reachable: set[str] = set()
+        stack = [root for root in roots if root in self.functions]
+        while stack:
+            func_path = stack.pop()
+            if func_path in reachable:
+                continue
+            reachable.add(func_path)
+            for line in self.functions[func_path].lines:
+                stack.extend(get_references(line))
+
+        removed = [
+            func_path for func_path in self.functions if func_path not in reachable]
+        for func_path in removed:
+            del self.functions[func_path]
+            self.optimizer.hit("tree_shake")
+        if removed:
+            logger.info(
+                f"Tree shaking removed {len(removed)} functions: " + ", ".join(sorted(removed)))
+
+    def remove_unused_ints(self) -> None:
+        """
+        Remove integer constants that no function uses anymore from load function (after constant folding)
+
+        - Nothing is removed if functions were already streamed, or a macro line, a json or a file of static folders mentions the integer objective
+        """
+        header = Header()
+        if self.lexer.streamed_functions:
+            return
+        if any(self.int_name in string for json in self.jsons.values() for string in iter_strings(json)):
+            return
+        for static_folder in header.statics:
+            for path in static_folder.rglob('*'):
+                if path.suffix in {'.mcfunction', '.json'} and self.int_name in path.read_text(errors='ignore'):
+                    return
+
+        int_pattern = re.compile(rf"(-?\d+) {re.escape(self.int_name)}\b")
+        definitions = {
+            f"scoreboard players set {n} {self.int_name} {n}" for n in self.ints}
+        used: set[str] = set()
+        for func in self.functions.values():
+            for line in func.lines:
+                if self.int_name not in line or line in definitions:
+                    continue
+                if line.startswith('$'):
+                    return
+                used.update(match.group(1) for match in int_pattern.finditer(line))
+
+        unused = {f"scoreboard players set {n} {self.int_name} {n}"
+                  for n in self.ints if str(n) not in used}
+        load = self.functions[self.load_name]
+        lines = load.lines
+        if any(line in unused for line in lines):
+            load.lines = [line for line in lines if line not in unused]
+            self.optimizer.hit("fold_constants")
+
+    def inline_private_functions(self) -> None:
+        """
+        Move content of small private functions into the only command calling them (Optimizer.inline_call)
+
+        - Only private functions referenced exactly once (by a function, not a json) are inlined
+        - Functions in a loop (calling themselves directly or through other functions) are never inlined
+        - Repeated until nothing changes, since a function inlined into its caller makes the caller bigger but keeps its callees single-caller
+        """
+        prefix = f"{self.namespace}:{self.private_name}/"
+        reference_pattern = get_reference_pattern(prefix)
+        json_references: set[str] = {
+            match.group(0) for json in self.jsons.values() for string in iter_strings(json)
+            if prefix in string for match in reference_pattern.finditer(string)}
+
+        while True:
+            callers: dict[str, list[str]] = defaultdict(list)
+            for func_path, func in self.functions.items():
+                for line in func.lines:
+                    if prefix in line:
+                        for match in reference_pattern.finditer(line):
+                            callers[match.group(0)[len(self.namespace) + 1:]].append(
+                                func_path)
+            calls: dict[str, list[str]] = {func_path: [] for func_path in self.functions}
+            for callee, callers_ in callers.items():
+                if callee in self.functions:
+                    for caller_name in callers_:
+                        calls[caller_name].append(callee)
+            looped = {func_path for component in get_strongly_connected_components(calls)
+                      for func_path in component
+                      if len(component) > 1 or func_path in calls[func_path]}
+
+            inlined: set[str] = set()
+            for callee, callers_ in callers.items():
+                location = f"{self.namespace}:{callee}"
+                if (
+                    len(callers_) != 1 or
+                    callee not in self.functions or
+                    callee in looped or
+                    location in json_references or
+                    callers_[0] in inlined
+                ):
+                    continue
+                caller_func = self.functions[callers_[0]]
+                for index, command in enumerate(caller_func.commands):
+                    commands = self.optimizer.inline_call(
+                        command, location, self.functions[callee].commands)
+                    if commands is not None:
+                        caller_func.commands[index:index + 1] = commands
+                        break
+                else:
+                    continue
+                del self.functions[callee]
+                inlined.add(callee)
+                self.optimizer.hit("inline")
+            if not inlined:
+                return
+
+    def deduplicate_private_functions(self) -> None:
+        """
+        Keep only 1 copy of private functions (and private jsons of the same type) with the same content and make every reference use it
+
+        - A function calling itself is compared as if it calls the copy it's compared to
+        - Private functions used by `schedule` are kept since scheduling the same function replaces the previous schedule
+        - Private names shared by a function and a json (or jsons of different types) are never removed since their references can't be told apart
+        - Private functions a macro line can call (starting with the resource location before `$(`, for example jump tables of switch-case) are kept
+        - Repeated until nothing changes, since references being merged can make their callers the same
+        """
+        prefix = f"{self.namespace}:{self.private_name}/"
+        reference_pattern = get_reference_pattern(prefix)
+        scheduled_pattern = re.compile(
+            r"schedule (?:function|clear) #?(" + reference_pattern.pattern + ")")
+        macro_prefix_pattern = re.compile(
+            r"(?<![\w.:/-])" + re.escape(prefix) + r"[\w./-]*$")
+        kept: set[str] = set()
+        macro_prefixes: list[str] = []
+        for func in self.functions.values():
+            for line in func.lines:
+                if "schedule " in line:
+                    kept.update(match.group(1)
+                                for match in scheduled_pattern.finditer(line))
+                if line.startswith('$') and "$(" in line and prefix in line:
+                    match = macro_prefix_pattern.search(
+                        line[:line.index("$(")])
+                    if match is not None:
+                        macro_prefixes.append(match.group(0))
+
+        kinds: dict[str, set[str]] = defaultdict(set)
+        for func_path in self.functions:
+            if func_path.startswith(self.private_name + '/'):
+                kinds[f"{self.namespace}:{func_path}"].add("function")
+        for json_path in self.jsons:
+            json_type, separator, name = json_path.partition(
+                f"/{self.private_name}/")
+            if separator:
+                kinds[prefix + name].add(json_type)
+        if macro_prefixes:
+            kept.update(location for location in kinds
+                        if location.startswith(tuple(macro_prefixes)))
+
+        while True:
+            canonicals: dict[tuple[str, str], str] = {}
+            redirects: dict[str, str] = {}
+            for func_path, func in self.functions.items():
+                location = f"{self.namespace}:{func_path}"
+                if location not in kinds or location in kept:
+                    continue
+                content = reference_pattern.sub(
+                    lambda match: PRIVATE_COUNT_MARK if match.group(0) == location else match.group(0), func.content)  # pylint: disable=cell-var-from-loop
+                key = ("function", content)
+                if key not in canonicals:
+                    canonicals[key] = location
+                elif len(kinds[location]) == 1:
+                    redirects[location] = canonicals[key]
+            for json_path, json in self.jsons.items():
+                json_type, separator, name = json_path.partition(
+                    f"/{self.private_name}/")
+                if not separator or not json:
+                    continue
+                location = prefix + name
+                key = (json_type, dumps(json, sort_keys=True))
+                if key not in canonicals:
+                    canonicals[key] = location
+                elif len(kinds[location]) == 1 and location not in kept:
+                    redirects[location] = canonicals[key]
+            if not redirects:
+                return
+
+            for location in redirects:
+                (kind, ) = kinds.pop(location)
+                name = location[len(prefix):]
+                if kind == "function":
+                    del self.functions[f"{self.private_name}/{name}"]
+                else:
+                    del self.jsons[f"{kind}/{self.private_name}/{name}"]
+                self.optimizer.hit("deduplicate")
+
+            def redirect(string: str) -> str:
+                if prefix not in string:
+                    return string
+                return reference_pattern.sub(lambda match: redirects.get(match.group(0), match.group(0)), string)
+            for func in self.functions.values():
+                lines = func.lines
+                if any(prefix in line for line in lines):
+                    func.lines = [redirect(line) for line in lines]
+            for json_path, json in self.jsons.items():
+                self.jsons[json_path] = replace_strings(json, redirect)
+
     def build(self) -> None:
         """
         Finializing DataPack for building (NO file writing)
@@ -353,6 +1065,10 @@ class DataPack:
                 self.functions[self.tick_name].insert_extend(self.ticks, 0)
             else:
                 self.functions[self.tick_name] = Function(self.ticks)
+        if self.is_hash_private_name:
+            self.hash_private_names()
+        elif self.is_marking_counts:
+            self.resolve_private_names()
         for name, functions in self.private_functions.items():
             for path, func in functions.items():
                 self.functions[f"{self.private_name}/{name}/{path}"] = func
@@ -360,6 +1076,26 @@ class DataPack:
         self.private_functions = {}
         self.loads = []
         self.ticks = []
+        if self.optimizer.optimizations:
+            if self.optimizer.is_enabled("tree_shake"):
+                self.tree_shake_functions()
+            if self.optimizer.is_enabled("inline"):
+                self.inline_private_functions()
+            for func in self.functions.values():
+                self.optimize_function(func)
+            if self.optimizer.is_enabled("fold_constants"):
+                self.remove_unused_ints()
+            if self.optimizer.is_enabled("deduplicate"):
+                self.deduplicate_private_functions()
+            logger.info(f"Optimizer: {self.optimizer.report()}")
+
+    def optimize_function(self, func: Function) -> None:
+        """
+        Run enabled peephole optimizations over a function
+
+        :param func: Function to optimize
+        """
+        func.commands = self.optimizer.optimize(func.commands)
 
     def parse_func_map(self, token: Token,
                        tokenizer: Tokenizer) -> dict[int, tuple[str, bool]]:
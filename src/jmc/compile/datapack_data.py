@@ -14,13 +14,13 @@ class Data:
     """
     Data shared across all JMC function in the datapack
     """
-    __slots__ = 'item', '__item_id_count', 'condition_count', '__bool_result_count'
+    __slots__ = 'item', '__item_id_count', 'temporaries'
 
     def __init__(self) -> None:
         self.item: dict[str, Item] = {}
         self.__item_id_count = 0
-        self.condition_count = 0  # Used in condition.py
-        self.__bool_result_count = -1  # Used in BOOL_FUNCTION
+        self.temporaries: set[str] = set()
+        """Set of temporary fake players (from Data.get_temporary) whose value is still needed"""
 
     def get_item_id(self) -> str:
         """
@@ -31,16 +31,43 @@ class Data:
         self.__item_id_count += 1
         return str(self.__item_id_count)
 
-    def get_current_bool_result(self) -> str:
+    def get_temporary(self, prefix: str) -> str:
         """
-        Get bool result string (variable) for complex bool function (starts at 0)
+        Get a temporary fake player whose value isn't needed anymore (starts at 0)
 
-        :return: __bool_result_n
+        - Used by conditions (`__logic__n`), bool functions (`__bool_result__n`) and expressions (`__expr__.n`)
+        - A fake player is in use until it's removed from Data.temporaries (usually when the command reading it is made)
+
+        :param prefix: Prefix of the fake player
+        :return: <prefix>n
         .. example::
-        >>> data.get_current_bool_result()
+        >>> data.get_temporary("__bool_result__")
         "__bool_result__0"
-        >>> data.get_current_bool_result()
+        >>> data.get_temporary("__bool_result__")
         "__bool_result__1"
+        >>> data.temporaries.clear()
+        >>> data.get_temporary("__bool_result__")
+        "__bool_result__0"
+        """
+        count = 0
+        while f"{prefix}{count}" in self.temporaries:
+            count += 1
+        name = f"{prefix}{count}"
+        self.temporaries.add(name)
+        return name
+
+    def get_counts(self) -> list[int]:
+        """
+        Get every counter (for caching parsed functions)
+
+        :return: List of item id count
+        """
+        return [self.__item_id_count]
+
+    def set_counts(self, counts: list[int]) -> None:
+        """
+        Set every counter (for caching parsed functions)
+
+        :param counts: List of item id count
         """
-        self.__bool_result_count += 1
-        return f"__bool_result__{self.__bool_result_count}"
+        self.__item_id_count, = counts
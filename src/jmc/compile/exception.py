@@ -37,38 +37,29 @@ def error_msg(message: str, token: "Token|None", tokenizer: "Tokenizer", col_len
     """
 
     if token is None:
-        string = ""
-        length = 1
-        col = tokenizer.col
         line = tokenizer.line
+        col = tokenizer.col
+        end = (line, col + 1)
     else:
-        string = token.get_full_string()
-        length = token.length
-        col = token.col
         line = token.line
+        col = token.col
+        end = token.get_end()
 
     display_line = line
     display_col = col
 
     if col_length:
-        if '\n' in string:
-            line += string.count('\n')
-            col = length - string.rfind('\n')
-        else:
-            col += length
+        line, col = end
 
     if display_col_length:
-        if '\n' in string:
-            display_line += string.count('\n')
-            display_col = length - string.rfind('\n')
-        else:
-            display_col += length
+        display_line, display_col = end
     else:
         display_col += 1
+    line_str = overide_file_str(tokenizer.line_index.get_line(display_line))
     if entire_line:
-        msg = f"In {tokenizer.file_path}\n{message} at line {line}.\n{overide_file_str(tokenizer.file_string.split(NEW_LINE)[display_line-1])} <-"
+        msg = f"In {tokenizer.file_path}\n{message} at line {line}.\n{line_str} <-"
     else:
-        msg = f"In {tokenizer.file_path}\n{message} at line {line} col {col}.\n{overide_file_str(tokenizer.file_string.split(NEW_LINE)[display_line-1])[:display_col-1]} <-"
+        msg = f"In {tokenizer.file_path}\n{message} at line {line} col {col}.\n{line_str[:display_col-1]} <-"
     if suggestion is not None:
         msg += '\n' + suggestion
     return msg
@@ -178,7 +169,7 @@ class JMCDecodeJSONError(ValueError):
         col = token.col + error.colno - 1 \
             if token.line == line else error.colno
 
-        msg = f"In {tokenizer.file_path}\n{error.msg} at line {line} col {col}.\n{tokenizer.file_string.split(NEW_LINE)[line-1][:col-1]} <-"
+        msg = f"In {tokenizer.file_path}\n{error.msg} at line {line} col {col}.\n{tokenizer.line_index.get_line(line)[:col-1]} <-"
 
         log(self, (msg, ))
         super().__init__(msg)
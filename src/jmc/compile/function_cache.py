@@ -0,0 +1,139 @@
+"""Module caching parsed functions on disk"""
+from hashlib import sha256
+from json import JSONDecodeError, dump, dumps, load
+from pathlib import Path
+from typing import Any
+import os
+
+from .datapack import DataPack
+from .header import Header
+from .log import Logger
+
+logger = Logger(__name__)
+FUNCTION_CACHE_FOLDER_NAME = '.jmc_cache'
+FUNCTION_CACHE_VERSION = 5
+FUNCTION_CACHE_MAX_SIZE = 64 * 1024 * 1024
+"""Default maximum size of the cache folder in bytes"""
+
+
+class FunctionCache:
+    """
+    Content-addressed cache of parsed functions, keyed on everything parsing a function depends on
+
+    - Only used when the header has `#cache` (`.jmc_cache` next to the main JMC file, or `#cache "folder"`)
+    - Imported JMC files are cached as a whole too, they're reused when neither they nor anything they import changed
+    - The folder is created with a .gitignore ignoring everything inside it
+
+    :param folder: Folder to store the cache in
+    :param settings: Everything else parsing every function depends on (namespace, compiler version)
+    :param max_size: Maximum size of the folder in bytes, defaults to FUNCTION_CACHE_MAX_SIZE
+    """
+    __slots__ = ('folder', 'settings', 'max_size', 'hits', 'misses')
+
+    folder: Path
+    """Folder to store the cache in"""
+    settings: str
+    """Everything else parsing every function depends on (as JSON)"""
+    max_size: int
+    """Maximum size of the folder in bytes, least recently used entries are removed over this size"""
+    hits: int
+    misses: int
+
+    def __init__(self, folder: Path, settings: dict[str, Any],
+                 max_size: int = FUNCTION_CACHE_MAX_SIZE) -> None:
+        header = Header()
+        self.folder = folder
+        self.settings = dumps([
+            FUNCTION_CACHE_VERSION,
+            settings,
+            [DataPack.load_name, DataPack.tick_name, DataPack.private_name,
+             DataPack.var_name, DataPack.int_name, DataPack.storage_name],
+            header.macros,
+            sorted(header.commands),
+            header.is_override_minecraft,
+            header.is_hash_private_name,
+            sorted(header.optimizations),
+            header.switch_strategy
+        ])
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, content: str, datapack: DataPack) -> str:
+        """
+        Get the key of a function
+
+        :param content: Source of the function's content
+        :param datapack: Datapack the function will be parsed into
+        :return: Key
+        """
+        return sha256(dumps([self.settings, content, datapack.get_state()]).encode()).hexdigest()
+
+    def get_file_key(self, import_hash: str, file_state: list[Any]) -> str:
+        """
+        Get the key of a JMC file
+
+        :param import_hash: Hash of the file and everything it imports (from build_record.hash_imports)
+        :param file_state: State of the datapack before parsing the file (from DataPack.get_file_state)
+        :return: Key
+        """
+        return sha256(dumps([self.settings, "file", import_hash, file_state]).encode()).hexdigest()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """
+        Get a cached function or JMC file
+
+        :param key: Key from FunctionCache.get_key or FunctionCache.get_file_key
+        :return: Dictionary of commands and changes made to the datapack, None if it's not cached
+        """
+        path = self.folder / (key + '.json')
+        try:
+            with path.open('r') as file:
+                entry: dict[str, Any] = load(file)
+            os.utime(path)
+        except (OSError, JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def set(self, key: str, commands: list[str],
+            changes: dict[str, Any]) -> None:
+        """
+        Cache a function or a JMC file
+
+        :param key: Key from FunctionCache.get_key or FunctionCache.get_file_key
+        :param commands: Commands of the function (empty for a JMC file)
+        :param changes: Changes made to the datapack from DataPack.restore_outputs or DataPack.get_changes
+        """
+        if not self.folder.is_dir():
+            self.folder.mkdir(parents=True, exist_ok=True)
+            with (self.folder / '.gitignore').open('w') as file:
+                file.write('*\n')
+        path = self.folder / (key + '.json')
+        temp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with temp_path.open('w') as file:
+            dump({"commands": commands, "changes": changes}, file)
+        os.replace(temp_path, path)
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until the folder is smaller than FunctionCache.max_size
+        """
+        if not self.folder.is_dir():
+            return
+        entries: list[tuple[float, int, Path]] = []
+        size = 0
+        for path in self.folder.glob('*.json'):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+            size += stat.st_size
+        if size <= self.max_size:
+            return
+        entries.sort()
+        for _, entry_size, path in entries:
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            if size <= self.max_size:
+                break
+        logger.info(f"Function cache evicted to {size} bytes")
@@ -1,5 +1,6 @@
 """Module handling jmc's header"""
 from pathlib import Path
+import re
 
 from .utils import SingleTon
 from .log import Logger
@@ -14,6 +15,7 @@ class Header(SingleTon):
     __slots__ = (
         'file_read',
         'macros',
+        'macro_pattern',
         'credits',
         'is_enable_macro',
         'commands',
@@ -24,12 +26,24 @@ class Header(SingleTon):
     """Set of files that was already read (to prevent reading the same file multiple times"""
     macros: dict[str, str]
     """Dictionary of keyword to replace and what to replace it with"""
+    macro_pattern: re.Pattern[str] | None
+    """Compiled pattern matching a macro separated by `:` or `.` (None if there's no macro to expand)"""
     credits: list[str]
     """Dictionary of string to replace and what to replace it with"""
     is_enable_macro: bool
     """Whether to enable macro at the time of creating a token"""
     is_override_minecraft: bool
     """Whether to allow jmc to take control over minecraft namespace"""
+    is_hash_private_name: bool
+    """Whether to name private functions by hash of their content instead of count"""
+    optimizations: set[str]
+    """Names of enabled optimizations (from optimizer.OPTIMIZATIONS)"""
+    switch_strategy: str
+    """Name of the strategy to create switch-cases with (from optimizer.SWITCH_STRATEGIES)"""
+    cache_folder: Path | None
+    """Folder to cache parsed functions in (`#cache`), None to parse every function on every build"""
+    keep_functions: set[str]
+    """Paths of functions that are never removed by `#optimize tree_shake` (functions called from outside the datapack)"""
     commands: set[str]
     """List of extra command(first arguments) to allow"""
     statics: set[Path]
@@ -49,12 +63,46 @@ class Header(SingleTon):
     def __clear(obj: "Header"):
         obj.file_read = set()
         obj.macros = {}
+        obj.macro_pattern = None
         obj.credits = []
         obj.is_enable_macro = True
         obj.is_override_minecraft = False
+        obj.is_hash_private_name = False
+        obj.optimizations = set()
+        obj.switch_strategy = "binary"
+        obj.cache_folder = None
+        obj.keep_functions = set()
         obj.commands = set()
         obj.statics = set()
 
+    def compile_macros(self) -> None:
+        """
+        Compile macros into macro_pattern (Must be called after macros is changed)
+        """
+        if not self.macros or not self.is_enable_macro:
+            self.macro_pattern = None
+            return
+        self.macro_pattern = re.compile(
+            r"(?<![^:.])(?:" +
+            "|".join(re.escape(macro) for macro in sorted(
+                self.macros, key=len, reverse=True)) +
+            r")(?![^:.])")
+
+    def expand_macros(self, string: str) -> str:
+        """
+        Replace a keyword(and each part of it separated by `:` or `.`) according to macros defined
+
+        :param string: Keyword
+        :return: Keyword after replacing macros
+        """
+        if self.macro_pattern is None:
+            return string
+        string = self.macros.get(string, string)
+        if ":" in string or "." in string:
+            string = self.macro_pattern.sub(
+                lambda match: self.macros[match.group()], string)
+        return string
+
     def add_file_read(self, path: Path) -> None:
         """
         Add path to file_read
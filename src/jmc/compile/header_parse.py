@@ -2,7 +2,9 @@ from pathlib import Path
 from .header import Header
 from .tokenizer import TokenType, Tokenizer
 from .exception import HeaderDuplicatedMacro, HeaderFileNotFoundError, HeaderSyntaxException, JMCFileNotFoundError
+from .function_cache import FUNCTION_CACHE_FOLDER_NAME
 from .log import Logger
+from .optimizer import EXPLICIT_OPTIMIZATIONS, OPTIMIZATIONS, SWITCH_STRATEGIES
 
 logger = Logger(__name__)
 
@@ -91,6 +93,63 @@ def __parse_header(header_str: str, file_name: str,
                     f"Expected 0 arguments after '#override_minecraft' (got {len(arg_tokens)})", file_name, line, line_str)
             header.is_override_minecraft = True
 
+        # #hash_private_names
+        elif directive_token.string == "hash_private_names":
+            if arg_tokens:
+                raise HeaderSyntaxException(
+                    f"Expected 0 arguments after '#hash_private_names' (got {len(arg_tokens)})", file_name, line, line_str)
+            header.is_hash_private_name = True
+
+        # #optimize
+        elif directive_token.string == "optimize":
+            if not arg_tokens:
+                header.optimizations.update(
+                    set(OPTIMIZATIONS) - EXPLICIT_OPTIMIZATIONS)
+            for arg_token in arg_tokens:
+                if arg_token.token_type != TokenType.KEYWORD:
+                    raise HeaderSyntaxException(
+                        f"Expected keyword after '#optimize' (got {arg_token.token_type})", file_name, line, line_str)
+                if arg_token.string not in OPTIMIZATIONS:
+                    raise HeaderSyntaxException(
+                        f"Unrecognized optimization '{arg_token.string}'", file_name, line, line_str, suggestion="Available optimizations: " + ", ".join(OPTIMIZATIONS))
+                header.optimizations.add(arg_token.string)
+
+        # #switch
+        elif directive_token.string == "switch":
+            if len(arg_tokens) != 1:
+                raise HeaderSyntaxException(
+                    f"Expected 1 argument after '#switch' (got {len(arg_tokens)})", file_name, line, line_str)
+            if arg_tokens[0].token_type != TokenType.KEYWORD:
+                raise HeaderSyntaxException(
+                    f"Expected keyword after '#switch' (got {arg_tokens[0].token_type})", file_name, line, line_str)
+            if arg_tokens[0].string not in SWITCH_STRATEGIES:
+                raise HeaderSyntaxException(
+                    f"Unrecognized switch strategy '{arg_tokens[0].string}'", file_name, line, line_str, suggestion="Available strategies: " + ", ".join(SWITCH_STRATEGIES))
+            header.switch_strategy = arg_tokens[0].string
+
+        # #cache
+        elif directive_token.string == "cache":
+            if len(arg_tokens) > 1:
+                raise HeaderSyntaxException(
+                    f"Expected 0-1 arguments after '#cache' (got {len(arg_tokens)})", file_name, line, line_str)
+            if arg_tokens and arg_tokens[0].token_type != TokenType.STRING:
+                raise HeaderSyntaxException(
+                    f"Expected folder path(string) after '#cache' (got {arg_tokens[0].token_type})", file_name, line, line_str)
+            header.cache_folder = parent_target / \
+                (arg_tokens[0].string if arg_tokens else FUNCTION_CACHE_FOLDER_NAME)
+
+        # #keep
+        elif directive_token.string == "keep":
+            if not arg_tokens:
+                raise HeaderSyntaxException(
+                    "Expected function name(keyword) after '#keep'", file_name, line, line_str)
+            for arg_token in arg_tokens:
+                if arg_token.token_type != TokenType.KEYWORD:
+                    raise HeaderSyntaxException(
+                        f"Expected keyword after '#keep' (got {arg_token.token_type})", file_name, line, line_str)
+                header.keep_functions.add(
+                    arg_token.string.lower().replace('.', '/'))
+
         # #command
         elif directive_token.string == "command":
             if not arg_tokens or len(arg_tokens) != 1:
@@ -153,4 +212,5 @@ def parse_header(header_str: str, file_name: str,
         parent_target,
         namespace_path)
     header.is_enable_macro = True
+    header.compile_macros()
     return return_value
@@ -1,11 +1,15 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from pathlib import Path
 from json import loads, JSONDecodeError, dumps
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable
+import os
 
 
+from .build_record import hash_folder, hash_imports, hash_string
 from .header import Header
 from .exception import JMCDecodeJSONError, JMCFileNotFoundError, JMCSyntaxException, MinecraftSyntaxWarning
-from .tokenizer import Tokenizer, Token, TokenType
+from .tokenizer import StreamToken, TokenStream, Tokenizer, Token, TokenType
 from .datapack import DataPack, Function
 from .log import Logger
 from .utils import convention_jmc_to_mc, search_to_string
@@ -14,6 +18,7 @@ from .lexer_func_content import FuncContent
 
 if TYPE_CHECKING:
     from ..terminal import Configuration
+    from .function_cache import FunctionCache
 
 logger = Logger(__name__)
 
@@ -39,6 +44,72 @@ JSON_FILE_TYPES = [
 """List of all possible vanilla json file types"""
 
 
+def find_imports(programs: list[list[Token]], file_path: Path) -> list[Path]:
+    """
+    Find paths of files imported with `@import` (Invalid `@import` is ignored)
+
+    :param programs: Programs of the file
+    :param file_path: Path to the file
+    :return: List of paths in the same order Lexer.parse_file parses them
+    """
+    paths: list[Path] = []
+    for command in programs:
+        if (command[0].string != '@import' or len(command) != 2 or
+                command[1].token_type != TokenType.STRING):
+            continue
+        try:
+            if command[1].string.endswith(
+                    "/*") or command[1].string.endswith("\\*"):
+                folder = Path(command[1].string[:-2])
+                if folder.is_dir():
+                    paths.extend(folder.glob("*.jmc"))
+                # Lexer.parse_file stops parsing the file after a folder import
+                break
+            new_path = Path((file_path.parent / command[1].string).resolve())
+            if new_path.suffix != '.jmc':
+                new_path = Path(
+                    (file_path.parent / (command[1].string + '.jmc')).resolve())
+        except Exception:  # pylint: disable=broad-except
+            continue
+        paths.append(new_path)
+    return paths
+
+
+def init_import_worker(macros: dict[str, str]) -> None:
+    """
+    Initialize a process for tokenize_import
+
+    :param macros: Macros defined in the header of the main process
+    """
+    header = Header()
+    header.macros = macros
+    header.compile_macros()
+
+
+def tokenize_import(
+        file_path_str: str) -> tuple[TokenStream, list[list[int]], list[str]] | None:
+    """
+    Read and tokenize an imported file (Inside a worker process)
+
+    :param file_path_str: Resolved path to the file
+    :return: Token stream, index of every token in each program and paths imported by the file,
+        None if the file can't be tokenized (Lexer.parse_file will tokenize it again and raise the error)
+    """
+    try:
+        with open(file_path_str, 'r') as file:
+            raw_string = file.read()
+        tokenizer = Tokenizer(raw_string, file_path_str)
+    except Exception:  # pylint: disable=broad-except
+        return None
+    return (
+        tokenizer.stream,
+        [[token.index for token in program]  # type: ignore[attr-defined]
+         for program in tokenizer.programs],
+        [path.resolve().as_posix() for path in find_imports(
+            tokenizer.programs, Path(file_path_str))]
+    )
+
+
 class Lexer:
     """
     Lexical Analyizer
@@ -49,17 +120,46 @@ class Lexer:
     """Tokenizer for load function"""
     do_while_box: Token | None = None
     """paren_curly token for code block of `do` in `do while`"""
-
-    def __init__(self, config: "Configuration",
-                 _test_file: str | None = None) -> None:
+    import_workers: int | None = None
+    """Maximum amount of processes tokenizing imported files, None to use the amount of CPUs (Imported files are tokenized serially if it's 1)"""
+    import_pool_threshold: int = 8
+    """Amount of files found in the import graph before the rest is tokenized in a process pool (Starting the processes costs more than tokenizing a few files)"""
+
+    def __init__(self, config: "Configuration", _test_file: str | None = None,
+                 function_cache: "FunctionCache | None" = None,
+                 stream: Callable[[str, Function], None] | None = None,
+                 reusable_files: dict[str, str] | None = None) -> None:
         logger.debug("Initializing Lexer")
         self.if_else_box: list[tuple[Token | None, Token]] = []
         """List of tuple of condition(Token) and code block(paren_curly Token) in if-else chain"""
         self.config = config
         """JMC configuration"""
+        self.function_cache = function_cache
+        """Cache of parsed functions, None to always parse"""
+        self.stream = stream
+        """Function writing a finished function (by its path) right away, None to keep every function until the datapack is built"""
+        self.streamed_functions: set[str] = set()
+        """Set of path of every function given to Lexer.stream (They're no longer in the datapack)"""
         self.datapack = DataPack(config.namespace, self)
         """Datapack object"""
+        if self.stream is not None and self.datapack.optimizer.is_whole_datapack:
+            logger.info(
+                "Streaming is disabled since optimizations need every function at once")
+            self.stream = None
+        self.reusable_files = {} if reusable_files is None else reusable_files
+        """Dictionary of resolved path of imported files that can be taken from self.function_cache and hash of them and everything they import"""
+        if self.function_cache is not None and self.stream is None:
+            # Counts in a cached file are relocated when it's reused, they're resolved in DataPack.build
+            self.datapack.is_marking_counts = True
         self.datapack.functions[self.datapack.load_name] = Function()
+        self.tokenizers: dict[str, Tokenizer] = {}
+        """Dictionary of resolved path and tokenizer of imported files that were tokenized ahead of time"""
+        self.file_hashes: dict[str, str] = {}
+        """Dictionary of resolved path and content hash of every JMC file parsed"""
+        self.imports: dict[str, list[str]] = {}
+        """Dictionary of resolved path of every JMC file parsed and resolved paths it imports"""
+        self.import_folders: dict[str, str] = {}
+        """Dictionary of path to every folder imported with `@import "folder/*"` and hash of its JMC file names"""
         self.parse_file(Path(self.config.target), _test_file, is_load=True)
 
         logger.debug("Load Function")
@@ -88,18 +188,15 @@ class Lexer:
         """
         logger.info(f"Parsing file: {file_path}")
         file_path_str = file_path.resolve().as_posix()
-        if _test_file is None:
-            try:
-                with file_path.open('r') as file:
-                    raw_string = file.read()
-            except FileNotFoundError as error:
-                raise JMCFileNotFoundError(
-                    f"JMC file not found: {file_path.resolve().as_posix()}") from error
+        if file_path_str in self.tokenizers:
+            tokenizer = self.tokenizers.pop(file_path_str)
         else:
-            raw_string = _test_file
-        tokenizer = Tokenizer(raw_string, file_path_str)
+            tokenizer = self.tokenize_file(file_path, file_path_str, _test_file)
+        self.file_hashes[file_path_str] = hash_string(tokenizer.raw_string)
+        imports = self.imports.setdefault(file_path_str, [])
         if is_load:
             self.load_tokenizer = tokenizer
+            self.tokenize_imports(tokenizer, file_path)
 
         for command in tokenizer.programs:
             if command[0].string == 'function' and len(command) == 4:
@@ -135,9 +232,14 @@ class Lexer:
                         raise JMCFileNotFoundError(
                             f"Directory(folder) not found: {folder.resolve().as_posix()}")
 
+                    self.import_folders[folder.resolve().as_posix()] = hash_folder(folder)
+                    # Adding or removing a file in the folder changes the importing file
+                    imports.append(folder.resolve().as_posix())
+                    self.parse_current_load()
                     new_paths = folder.glob("*.jmc")
                     for new_path in new_paths:
-                        self.parse_file(file_path=new_path)
+                        imports.append(new_path.resolve().as_posix())
+                        self.parse_cached_file(file_path=new_path)
                     return
                 try:
                     new_path = Path(
@@ -151,7 +253,9 @@ class Lexer:
                 except Exception as error:
                     raise JMCSyntaxException(
                         f"Unexpected invalid path ({command[1].string})", command[1], tokenizer) from error
-                self.parse_file(file_path=new_path)
+                imports.append(new_path.as_posix())
+                self.parse_current_load()
+                self.parse_cached_file(file_path=new_path)
             else:
                 # if not is_load:
                 #     raise JMCSyntaxException(
@@ -161,6 +265,129 @@ class Lexer:
 
                 self.datapack.load_function.append(command)
 
+    def parse_cached_file(self, file_path: Path) -> None:
+        """
+        Parse imported JMC file or get it from self.function_cache
+
+        - Commands for load function are parsed before and after the file so that the file's result only has its own commands
+        - The result is stored even if the file can't be reused yet, so that the next build can reuse it
+
+        :param file_path: Path to file to parse
+        """
+        if self.function_cache is None or self.stream is not None:
+            self.parse_file(file_path)
+            self.parse_current_load()
+            return
+
+        file_path_str = file_path.resolve().as_posix()
+        file_state = self.datapack.get_file_state()
+        if file_path_str in self.reusable_files:
+            entry = self.function_cache.get(self.function_cache.get_file_key(
+                self.reusable_files[file_path_str], file_state))
+            if entry is not None:
+                logger.info(f"Reusing file: {file_path}")
+                changes = self.datapack.relocate_private_counts(
+                    entry["changes"], entry["changes"]["private_function_start"])
+                self.datapack.apply_changes(changes)
+                self.file_hashes.update(changes["files"])
+                self.imports.update(changes["imports"])
+                self.import_folders.update(changes["folders"])
+                return
+
+        snapshot = self.datapack.get_snapshot()
+        file_paths, import_paths, folder_paths = set(
+            self.file_hashes), set(self.imports), set(self.import_folders)
+        self.parse_file(file_path)
+        self.parse_current_load()
+        new_changes = self.datapack.get_changes(snapshot)
+        if new_changes is None:
+            return
+        new_changes["files"] = {path: file_hash for path, file_hash in self.file_hashes.items()
+                                if path not in file_paths}
+        new_changes["imports"] = {path: imported_paths for path, imported_paths in self.imports.items()
+                                  if path not in import_paths}
+        new_changes["folders"] = {path: folder_hash for path, folder_hash in self.import_folders.items()
+                                  if path not in folder_paths}
+        self.function_cache.set(self.function_cache.get_file_key(
+            hash_imports(file_path_str, self.file_hashes,
+                         self.import_folders, self.imports),
+            file_state), [], new_changes)
+
+    def tokenize_file(self, file_path: Path, file_path_str: str,
+                      _test_file: str | None = None) -> Tokenizer:
+        """
+        Read and tokenize JMC file
+
+        :param file_path: Path to file to tokenize
+        :param file_path_str: Resolved path to the file as string
+        :raises JMCFileNotFoundError: Can't find the JMC file
+        :return: Tokenizer of the file
+        """
+        if _test_file is None:
+            try:
+                with file_path.open('r') as file:
+                    raw_string = file.read()
+            except FileNotFoundError as error:
+                raise JMCFileNotFoundError(
+                    f"JMC file not found: {file_path.resolve().as_posix()}") from error
+        else:
+            raw_string = _test_file
+        return Tokenizer(raw_string, file_path_str)
+
+    def tokenize_imports(self, tokenizer: Tokenizer, file_path: Path) -> None:
+        """
+        Tokenize every file in the import graph of a file ahead of time and store them in self.tokenizers
+
+        - Files are still parsed in the order they're imported, this only moves reading and tokenizing ahead of time
+        - The graph is walked breadth-first in this process until it has Lexer.import_pool_threshold files,
+          the rest of the graph is tokenized in a process pool
+
+        :param tokenizer: Tokenizer of the file
+        :param file_path: Path to the file
+        """
+        max_workers = self.import_workers or os.cpu_count() or 1
+        if max_workers <= 1:
+            return
+        # Reusable files (and everything they import) are only tokenized if they're missing from self.function_cache
+        queue = deque(path.resolve().as_posix()
+                      for path in find_imports(tokenizer.programs, file_path)
+                      if path.resolve().as_posix() not in self.reusable_files)
+        found = set(queue)
+        found.add(file_path.resolve().as_posix())
+
+        def add_result(path: str, result: tuple[TokenStream, list[list[int]], list[str]] | None) -> list[str]:
+            if result is None:
+                return []
+            stream, programs, imported_paths = result
+            self.tokenizers[path] = Tokenizer(
+                stream.source, path, programs=[
+                    [StreamToken(stream, index) for index in program] for program in programs])
+            new_paths = [
+                imported_path for imported_path in imported_paths
+                if imported_path not in found and imported_path not in self.reusable_files]
+            found.update(new_paths)
+            return new_paths
+
+        while queue and len(found) < max(self.import_pool_threshold, 1):
+            path = queue.popleft()
+            queue.extend(add_result(path, tokenize_import(path)))
+        if not queue:
+            return
+
+        logger.info(
+            f"Tokenizing imported files with {max_workers} processes ({len(found)} files found so far)")
+        with ProcessPoolExecutor(max_workers, initializer=init_import_worker,
+                                 initargs=(Header().macros,)) as executor:
+            futures: dict[Future, str] = {
+                executor.submit(tokenize_import, path): path for path in queue}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = futures.pop(future)
+                    for imported_path in add_result(path, future.result()):
+                        futures[executor.submit(
+                            tokenize_import, imported_path)] = imported_path
+
     def parse_func(self, tokenizer: Tokenizer,
                    command: list[Token], file_path_str: str, prefix: str = '') -> None:
         """
@@ -194,22 +421,41 @@ class Lexer:
             raise JMCSyntaxException(
                 f"Function({func_path}) may override private function of JMC", command[1], tokenizer, suggestion=f"Please avoid starting function's path with {DataPack.private_name}")
         logger.debug(f"Function: {func_path}")
-        func_content = command[3].string[1:-1]
         if func_path == self.datapack.load_name:
             raise JMCSyntaxException(
                 "Load function is defined", command[1], tokenizer)
-        if func_path in self.datapack.functions:
-            old_function_token, old_function_tokenizer = self.datapack.defined_file_pos[
+        if func_path in self.datapack.functions or func_path in self.streamed_functions:
+            old_line, old_col, old_file_path = self.datapack.defined_file_pos[
                 func_path]
             raise JMCSyntaxException(
                 f"Duplicate function declaration({func_path})", command[1], tokenizer,
-                suggestion=f"This function was already defined at line {old_function_token.line} col {old_function_token.col} in {old_function_tokenizer.file_path}")
+                suggestion=f"This function was already defined at line {old_line} col {old_col} in {old_file_path}")
         if func_path == self.datapack.private_name:
             raise JMCSyntaxException(
                 "Private function is defined", command[1], tokenizer, display_col_length=False)
-        self.datapack.defined_file_pos[func_path] = (command[1], tokenizer)
-        self.datapack.functions[func_path] = Function(self.parse_func_content(
-            func_content, file_path_str, line=command[3].line, col=command[3].col, file_string=tokenizer.file_string))
+        self.datapack.defined_file_pos[func_path] = (
+            command[1].line, command[1].col, tokenizer.file_path)
+        # Tick function gets tick commands and private function names are only known after every function is parsed
+        if self.stream is None or func_path == self.datapack.tick_name or self.datapack.is_hash_private_name:
+            self.datapack.functions[func_path] = Function(
+                self.parse_cached_func_content(command[3], tokenizer))
+            return
+
+        private_functions = self.datapack.isolate_private_functions()
+        try:
+            func = Function(
+                self.parse_cached_func_content(command[3], tokenizer))
+        finally:
+            new_private_functions = self.datapack.restore_private_functions(
+                private_functions)
+        self.streamed_functions.add(func_path)
+        self.datapack.optimize_function(func)
+        self.stream(func_path, func)
+        for name, functions in new_private_functions.items():
+            for path, private_func in functions.items():
+                self.datapack.optimize_function(private_func)
+                self.stream(
+                    f"{DataPack.private_name}/{name}/{path}", private_func)
 
     def parse_new(self, tokenizer: Tokenizer,
                   command: list[Token], prefix: str = ''):
@@ -286,11 +532,11 @@ class Lexer:
         logger.debug(f"JSON: {json_type}({json_path})")
         json_content = command[3].string
         if json_path in self.datapack.jsons:
-            old_json_token, old_json_tokenizer = self.datapack.defined_file_pos[
+            old_line, old_col, old_file_path = self.datapack.defined_file_pos[
                 json_path]
             raise JMCSyntaxException(
                 f"Duplicate JSON({json_path})", command[2], tokenizer,
-                suggestion=f"This json was already defined at line {old_json_token.line} col {old_json_token.col} in {old_json_tokenizer.file_path}")
+                suggestion=f"This json was already defined at line {old_line} col {old_col} in {old_file_path}")
 
         try:
             json: dict[str, str] = loads(json_content)
@@ -299,7 +545,8 @@ class Lexer:
         if not json:
             raise JMCSyntaxException(
                 "JSON content cannot be empty", command[3], tokenizer)
-        self.datapack.defined_file_pos[json_path] = (command[1], tokenizer)
+        self.datapack.defined_file_pos[json_path] = (
+            command[1].line, command[1].col, tokenizer.file_path)
         self.datapack.jsons[json_path] = json
 
     def parse_class(self, tokenizer: Tokenizer,
@@ -331,9 +578,8 @@ class Lexer:
                 "Expected {", command[2], tokenizer)
 
         class_path = prefix + convention_jmc_to_mc(command[1], tokenizer)
-        class_content = command[2].string[1:-1]
         self.parse_class_content(class_path + '/',
-                                 class_content, file_path_str, line=command[2].line, col=command[2].col, file_string=tokenizer.file_string)
+                                 command[2], tokenizer, file_path_str)
 
     def parse_load_func_content(
             self, programs: list[list[Token]]) -> list[str]:
@@ -357,24 +603,53 @@ class Lexer:
         """
         return self._parse_func_content(tokenizer, [tokens], is_load=False)
 
-    def parse_func_content(self,
-                           func_content: str, file_path_str: str,
-                           line: int, col: int, file_string: str) -> list[str]:
+    def parse_func_content(self, token: Token,
+                           tokenizer: Tokenizer) -> list[str]:
         """
         Parse function's content
 
-        :param func_content: String containing function's content
-        :param file_path_str: File path to current JMC function as string
-        :param line: Current line in current JMC function
-        :param col: Current column in current JMC function
-        :param file_string: Content of current JMC function
+        :param token: paren_curly token(or arrow function token) containing function's content
+        :param tokenizer: token's Tokenizer
         :return: List of commands(string)
         """
-        tokenizer = Tokenizer(func_content, file_path_str,
-                              line=line, col=col, file_string=file_string)
+        tokenizer = tokenizer.tokenize_paren(token)
         programs = tokenizer.programs
         return self._parse_func_content(tokenizer, programs, is_load=False)
 
+    def parse_cached_func_content(
+            self, token: Token, tokenizer: Tokenizer) -> list[str]:
+        """
+        Parse function's content or get it from self.function_cache
+
+        :param token: paren_curly token containing function's content
+        :param tokenizer: token's Tokenizer
+        :return: List of commands(string)
+        """
+        if self.function_cache is None:
+            return self.parse_func_content(token, tokenizer)
+
+        key = self.function_cache.get_key(token.string, self.datapack)
+        entry = self.function_cache.get(key)
+        is_marking_counts = self.datapack.is_marking_counts
+        if entry is None:
+            # Counts are marked so that the entry doesn't depend on how many private functions were made before
+            outputs = self.datapack.isolate_outputs()
+            self.datapack.is_marking_counts = True
+            try:
+                commands = self.parse_func_content(token, tokenizer)
+            finally:
+                self.datapack.is_marking_counts = is_marking_counts
+                changes = self.datapack.restore_outputs(outputs)
+            self.function_cache.set(key, commands, changes)
+            entry = {"commands": commands, "changes": changes}
+
+        entry = self.datapack.relocate_private_counts(
+            entry, entry["changes"]["private_function_start"])
+        if not is_marking_counts:
+            entry = self.datapack.resolve_private_counts(entry)
+        self.datapack.apply_changes(entry["changes"])
+        return entry["commands"]
+
     def _parse_func_content(self, tokenizer: Tokenizer,
                             programs: list[list[Token]], is_load: bool) -> list[str]:
         """
@@ -388,22 +663,19 @@ class Lexer:
 
         return FuncContent(tokenizer, programs, is_load, self).parse()
 
-    def parse_class_content(self, prefix: str, class_content: str,
-                            file_path_str: str, line: int, col: int, file_string: str) -> None:
+    def parse_class_content(self, prefix: str, token: Token,
+                            tokenizer: Tokenizer, file_path_str: str) -> None:
         """
         Parse content of a class
 
         :param prefix: Prefix of class(for Class feature)
-        :param class_content: Content inside class as string
+        :param token: paren_curly token containing class's content
+        :param tokenizer: token's Tokenizer
         :param file_path_str: File path to current JMC function as string
-        :param line: Current line in current JMC function
-        :param col: Current column in current JMC function
-        :param file_string: Content of current JMC function
         :raises JMCSyntaxException: Importing in class
         :raises JMCSyntaxException: Got something else beside 'function' or 'new' or 'class'
         """
-        tokenizer = Tokenizer(class_content, file_path_str,
-                              line=line, col=col, file_string=file_string)
+        tokenizer = tokenizer.tokenize_paren(token)
         for command in tokenizer.programs:
             if command[0].string == 'function' and len(command) == 4:
                 self.parse_func(tokenizer, command, file_path_str, prefix)
@@ -442,6 +714,8 @@ class Lexer:
             return return_value
 
         # Case 2: Has `else` or `else if`
+        if self.datapack.supports("return_run"):
+            return self.__parse_if_else_return(if_else_box, condition, precommand, tokenizer, name)
         count = self.datapack.get_count(name)
         count_alt = self.datapack.get_count(name)
         output = [
@@ -473,9 +747,15 @@ class Lexer:
                     f"execute if score {VAR} {DataPack.var_name} matches 0 run function {self.datapack.namespace}:{DataPack.private_name}/{name}/{count_alt}"
                 ], count_tmp)
 
-                self.datapack.add_custom_private_function(name, else_if[1], tokenizer, count, postcommands=[
-                    f"scoreboard players set {VAR} {DataPack.var_name} 1"
-                ])
+                if else_ is None and else_if is if_else_box[-1] and self.datapack.optimizer.is_enabled("drop_if_else_flag"):
+                    # Nothing reads the flag after the last branch
+                    self.datapack.optimizer.hit("drop_if_else_flag")
+                    postcommands = []
+                else:
+                    postcommands = [
+                        f"scoreboard players set {VAR} {DataPack.var_name} 1"]
+                self.datapack.add_custom_private_function(
+                    name, else_if[1], tokenizer, count, postcommands=postcommands)
         # `else`
         if else_ is None:
             self.datapack.private_functions[name][count_tmp].delete(-1)
@@ -484,6 +764,53 @@ class Lexer:
                 name, else_, tokenizer, count_alt)
         return "\n".join(output)
 
+    def __parse_if_else_return(self, if_else_box: list[tuple[Token | None, Token]], condition: str, precommand: str,
+                               tokenizer: Tokenizer, name: str) -> str:
+        """
+        Parse if-else chain into a function where the first branch whose condition passes returns (`return run`)
+        instead of setting and checking `__if_else__` flag
+
+        :param if_else_box: if_else_box attribute with at least 2 branches
+        :param condition: Condition of the first branch (from parse_condition)
+        :param precommand: Precommands of the first branch (from parse_condition)
+        :param tokenizer: Tokenizer
+        :param name: Private function's group name
+        :return: A minecraft command to initiate the if-else chain
+        """
+        count = self.datapack.get_count(name)
+        commands: list[str] = []
+        for index, (condition_token, body) in enumerate(if_else_box):
+            run = self.__get_if_else_run(body, tokenizer, name)
+            if condition_token is None:
+                # `else`
+                if run is not None:
+                    commands.append(run)
+                break
+            if index:
+                condition, precommand = parse_condition(
+                    condition_token, tokenizer, self.datapack)
+            commands.append(
+                f"{precommand}execute {condition} run {'return 0' if run is None else f'return run {run}'}")
+        self.datapack.add_raw_private_function(name, commands, count)
+        return self.datapack.call_func(name, count)
+
+    def __get_if_else_run(self, body: Token,
+                          tokenizer: Tokenizer, name: str) -> str | None:
+        """
+        Get a command running a branch of if-else chain (the command itself if the branch is a single command)
+
+        :param body: paren_curly token of the branch
+        :param tokenizer: Tokenizer
+        :param name: Private function's group name
+        :return: Minecraft command, None if the branch is empty
+        """
+        commands = self.datapack.parse_function_token(body, tokenizer)
+        if not commands:
+            return None
+        if len(commands) == 1 and '\n' not in commands[0] and not commands[0].startswith('$'):
+            return commands[0]
+        return self.datapack.add_raw_private_function(name, commands)
+
     def clean_up_paren_token(self, token: Token, tokenizer: Tokenizer,
                              is_nbt: bool = True) -> str:
         """
@@ -498,8 +825,8 @@ class Lexer:
             return token.string
         open_ = token.string[0]
         close = token.string[-1]
-        tokenizer = Tokenizer(token.string[1:-1], tokenizer.file_path, token.line,
-                              token.col + 1, tokenizer.file_string, expect_semicolon=False, allow_semicolon=token.token_type == TokenType.PAREN_SQUARE)
+        tokenizer = tokenizer.tokenize_paren(
+            token, expect_semicolon=False, allow_semicolon=token.token_type == TokenType.PAREN_SQUARE)
         string = ""
         if open_ == '{' and tokenizer.programs[0][0].token_type == TokenType.STRING:
             is_nbt = False
@@ -1,9 +1,11 @@
 """Module responsible for handling all Function Content parsing in Lexer"""
 from typing import TYPE_CHECKING
 from json import dumps
+import re
 
 
 from .vanilla_command import COMMANDS as VANILLA_COMMANDS
+from .command_ir import optimize_command, parse_command
 from .tokenizer import Tokenizer, Token, TokenType
 from .exception import JMCSyntaxException, MinecraftSyntaxWarning
 from .log import Logger
@@ -74,6 +76,29 @@ def append_commands(commands: list[str], string: str) -> None:
     commands.append(string)
 
 
+GENERATED_PLACEHOLDER = '\x01'
+"""Prefix of an argument standing in for a part of command made by JMC while optimizing (Not datapack.PRIVATE_COUNT_MARK, which can be inside any argument)"""
+GENERATED_PLACEHOLDER_PATTERN = re.compile(GENERATED_PLACEHOLDER + r'(\d+)')
+
+
+def optimize_commands(commands: list[str], generated: set[int]) -> str:
+    """
+    Optimize every line of minecraft command written by the user, parts made by JMC are kept as is
+
+    :param commands: Entire command(list of minecraft arguments)
+    :param generated: Indexes of arguments made by JMC
+    :return: Optimized command(s)
+    """
+    string = ' '.join(GENERATED_PLACEHOLDER + str(index) if index in generated else argument
+                      for index, argument in enumerate(commands))
+    string = '\n'.join(str(optimize_command(parse_command(line)))
+                       for line in string.split('\n'))
+    if not generated:
+        return string
+    return GENERATED_PLACEHOLDER_PATTERN.sub(
+        lambda match: commands[int(match.group(1))], string)
+
+
 class FuncContent:
     """
     A class representation of a row function for parsing content inside the function
@@ -82,7 +107,7 @@ class FuncContent:
     :param programs: List of commands(List of arguments(Token))
     :param is_load: Whether the function is a load function
     """
-    __slots__ = 'tokenizer', 'programs', 'is_load', 'command_strings', 'commands', 'command', 'is_expect_command', 'is_execute', 'lexer'
+    __slots__ = 'tokenizer', 'programs', 'is_load', 'command_strings', 'commands', 'generated', 'command', 'is_expect_command', 'is_execute', 'lexer'
 
     command: list[Token]
     is_expect_command: bool
@@ -96,6 +121,8 @@ class FuncContent:
         self.is_load = is_load
         self.command_strings: list[str] = []
         self.commands: list[str] = []
+        self.generated: set[int] = set()
+        """Indexes of arguments in self.commands made by JMC (They're not optimized)"""
         self.lexer = lexer
 
     def parse(self) -> list[str]:
@@ -128,13 +155,11 @@ class FuncContent:
                         "Expected 'while'", self.command[0], self.tokenizer)
             if self.lexer.if_else_box:
                 if self.command[0].string != 'else':
-                    append_commands(
-                        self.commands, self.lexer.parse_if_else(
+                    self.__append_generated(
+                        self.lexer.parse_if_else(
                             self.tokenizer))
 
-            if self.commands:
-                self.command_strings.append(' '.join(self.commands))
-                self.commands = []
+            self.__flush_commands()
 
             self.__parse_commands()
         # End of Program
@@ -144,15 +169,29 @@ class FuncContent:
             raise JMCSyntaxException(
                 "Expected 'while'", self.programs[-1][-1], self.tokenizer)
         if self.lexer.if_else_box:
-            append_commands(
-                self.commands,
+            self.__append_generated(
                 self.lexer.parse_if_else(
                     self.tokenizer))
 
+        self.__flush_commands()
+        return self.command_strings
+
+    def __flush_commands(self) -> None:
+        """Optimize the command in self.commands and move it into self.command_strings"""
         if self.commands:
-            self.command_strings.append(' '.join(self.commands))
+            self.command_strings.append(
+                optimize_commands(self.commands, self.generated))
             self.commands = []
-        return self.command_strings
+            self.generated = set()
+
+    def __append_generated(self, string: str) -> None:
+        """
+        Append an argument made by JMC (instead of written by the user) to self.commands
+
+        :param string: A new argument to add
+        """
+        self.generated.add(len(self.commands))
+        append_commands(self.commands, string)
 
     def __parse_commands(self) -> None:
         """Parse command in self.commands"""
@@ -170,46 +209,6 @@ class FuncContent:
             if self.__expect_command(key_pos, token):
                 break
 
-    def __optimize(self, token: Token) -> bool:
-        """
-        Optimize minecraft command by removing redundancy
-        :param token: Current token
-        :return: Whether to cancel appending this token
-        """
-        if token.token_type != TokenType.KEYWORD:
-            return False
-        if not self.commands:
-            return False
-
-        # `execute as @s`
-        if (
-            token.string == '@s' and
-            self.commands[-1] == 'as' and
-            self.commands[-2] not in {'rotated', 'positioned'}
-        ):
-
-            self.commands[-1] = 'if entity'
-            return False
-
-        # `execute run`
-        if (
-            token.string == 'run'
-            and self.commands[-1] == 'execute'
-        ):
-            del self.commands[-1]
-            return True
-
-        # `run execute`
-        if (
-            token.string == 'execute'
-            and self.commands[-1] == 'run'
-            and self.commands[0] == 'execute'
-        ):
-            del self.commands[-1]
-            return True
-
-        return False
-
     def __not_expect_command(
             self, key_pos: int, token: Token, command_pos: int) -> None:
         """
@@ -238,9 +237,6 @@ class FuncContent:
             raise JMCSyntaxException(
                 f"Keyword({token.string}) at line {token.line} col {token.col} is recognized as a command.\nExpected semicolon(;)", self.command[key_pos - 1], self.tokenizer, col_length=True)
 
-        if self.__optimize(token):
-            return
-
         if token.token_type == TokenType.PAREN_ROUND:
             self.commands[-1], success = search_to_string(
                 self.commands[-1], token, DataPack.var_name, self.tokenizer)
@@ -276,7 +272,7 @@ class FuncContent:
         # Handle Errors
         if token.token_type != TokenType.KEYWORD:
             if token.token_type == TokenType.PAREN_CURLY and self.is_execute:
-                append_commands(self.commands, self.lexer.datapack.add_arrow_function(
+                self.__append_generated(self.lexer.datapack.add_arrow_function(
                     'anonymous', token, self.tokenizer))
                 return True
             raise JMCSyntaxException(
@@ -322,16 +318,14 @@ class FuncContent:
             if self.command[key_pos + 1].string != '()':
                 raise JMCSyntaxException(
                     f"Custom function({token.string})'s parameter is not supported.\nExpected empty bracket", self.command[key_pos + 1], self.tokenizer)
-            append_commands(self.commands,
-                            f"function {self.lexer.datapack.namespace}:{convention_jmc_to_mc(token, self.tokenizer)}")
+            self.__append_generated(
+                f"function {self.lexer.datapack.namespace}:{convention_jmc_to_mc(token, self.tokenizer)}")
             return True
 
         if token.string not in VANILLA_COMMANDS and token.string not in Header().commands:
             raise JMCSyntaxException(
                 f"Unrecognized command ({token.string})", token, self.tokenizer)
 
-        if self.__optimize(token):
-            return False
         append_commands(self.commands, token.string)
         return False
 
@@ -376,18 +370,18 @@ class FuncContent:
         if '\n' in self.command[key_pos + 1].string:
             raise JMCSyntaxException(
                 "Newline found in say command", self.command[key_pos + 1], self.tokenizer, suggestion=r"Use '\\n' instead of '\n'")
-        append_commands(
-            self.commands, f"say {self.command[key_pos+1].string}")
+        self.__append_generated(
+            f"say {self.command[key_pos+1].string}")
 
     def __is_startswith_varsign(self, key_pos: int, token: Token) -> bool:
         if len(
                 self.command) > key_pos + 1 and self.command[key_pos + 1].string == 'run' and self.command[key_pos + 1].token_type == TokenType.KEYWORD:
             self.is_execute = True
-            append_commands(self.commands,
-                            f"execute store result score {token.string} {DataPack.var_name}")
+            self.__append_generated(
+                f"execute store result score {token.string} {DataPack.var_name}")
             return False
 
-        append_commands(self.commands, variable_operation(
+        self.__append_generated(variable_operation(
             self.command[key_pos:], self.tokenizer, self.lexer.datapack, self.is_execute))
         return True
 
@@ -405,7 +399,7 @@ class FuncContent:
                     f"This feature({token.string}) can only be used in load function", token, self.tokenizer)
 
             self.lexer.datapack.used_command.add(token.string)
-            append_commands(self.commands, load_once_command(
+            self.__append_generated(load_once_command(
                 self.command[key_pos + 1], self.lexer.datapack, self.tokenizer).call())
             return True
 
@@ -416,7 +410,7 @@ class FuncContent:
                 raise JMCSyntaxException(
                     f"This feature({token.string}) cannot be used with 'execute'", token, self.tokenizer)
             self.lexer.datapack.used_command.add(token.string)
-            append_commands(self.commands, execute_excluded_command(
+            self.__append_generated(execute_excluded_command(
                 self.command[key_pos + 1], self.lexer.datapack, self.tokenizer).call())
             return True
 
@@ -428,7 +422,7 @@ class FuncContent:
             if not self.is_load:
                 raise JMCSyntaxException(
                     f"This feature({token.string}) can only be used in load function", token, self.tokenizer)
-            append_commands(self.commands, load_only_command(
+            self.__append_generated(load_only_command(
                 self.command[key_pos + 1], self.lexer.datapack, self.tokenizer).call())
             return True
 
@@ -437,7 +431,7 @@ class FuncContent:
             if len(self.command) > key_pos + 2:
                 raise JMCSyntaxException(
                     "Unexpected token", self.command[key_pos + 2], self.tokenizer, display_col_length=False)
-            append_commands(self.commands, jmc_command(
+            self.__append_generated(jmc_command(
                 self.command[key_pos + 1], self.lexer.datapack, self.tokenizer, is_execute=self.is_execute).call())
             return True
 
@@ -457,7 +451,7 @@ class FuncContent:
             return_value = flow_control_command(
                 self.command[key_pos:], self.lexer.datapack, self.tokenizer)
             if return_value is not None:
-                append_commands(self.commands, return_value)
+                self.__append_generated(return_value)
             return True
         return False
 
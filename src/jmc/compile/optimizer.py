@@ -0,0 +1,554 @@
+"""Module optimizing commands of every function after they're generated (Enabled with `#optimize` in header)"""
+from typing import Callable
+
+from .command_ir import Command, Execute, FunctionCall, RawCommand, ScoreboardPlayers, optimize_command
+from .log import Logger
+
+logger = Logger(__name__)
+
+OPTIMIZATIONS = {
+    "fuse_execute": "Fuse `execute ... run execute ...` chains and remove `execute run`",
+    "merge_score_add": "Merge consecutive `scoreboard players add/remove` on the same holder",
+    "drop_overwritten_set": "Remove a score change that is immediately overwritten by `scoreboard players set`",
+    "drop_if_else_flag": "Remove the `__if_else__` flag write of the last branch of an if-else chain without `else`",
+    "deduplicate": "Keep only 1 copy of private functions and private jsons with the same content",
+    "fold_constants": "Fold scoreboard operations on variables with values known at compile time into `scoreboard players set` and resolve their conditions",
+    "inline": "Move content of small private functions called from only 1 place into their caller",
+    "unroll": "Repeat the body of `for` loops with constant bounds instead of calling a function per iteration (or per block of iterations for long loops)",
+    "tree_shake": "Remove functions that can't be reached from load, tick, jsons, static folders or `#keep`",
+}
+"""Dictionary of optimization's name and its description"""
+EXPLICIT_OPTIMIZATIONS = {"tree_shake"}
+"""Optimizations that are only enabled by name (not by `#optimize` without arguments)"""
+WHOLE_DATAPACK_OPTIMIZATIONS = {"deduplicate", "inline", "tree_shake"}
+"""Optimizations that need every function of the datapack at once (Functions aren't streamed when any of them is enabled)"""
+SWITCH_STRATEGIES = {
+    "binary": "Binary tree of functions checking half of the remaining cases each (default)",
+    "linear": "A function checking every case one by one",
+    "weighted": "Binary tree split by `case <number> (weight=<weight>):` so that frequent cases take fewer checks",
+    "macro": "Jump table calling the function of the case with a function macro (pack_format 18+, falls back to binary)",
+    "auto": "linear for a few cases, weighted if any case has a weight, otherwise macro",
+}
+"""Dictionary of switch-case strategy's name (`#switch`) and its description"""
+
+MAX_SCORE = 2147483647
+SCORE_OPERATIONS: dict[str, Callable[[int, int], int | None]] = {
+    '=': lambda _, source: source,
+    '+=': lambda target, source: target + source,
+    '-=': lambda target, source: target - source,
+    '*=': lambda target, source: target * source,
+    # Minecraft uses floored division and skips dividing by zero
+    '/=': lambda target, source: target // source if source else None,
+    '%=': lambda target, source: target % source if source else None,
+    '<': min,
+    '>': max,
+}
+"""Dictionary of `scoreboard players operation` operator and its result (None if the operation fails)"""
+SCORE_COMPARISONS: dict[str, Callable[[int, int], bool]] = {
+    '<': lambda target, source: target < source,
+    '<=': lambda target, source: target <= source,
+    '=': lambda target, source: target == source,
+    '>=': lambda target, source: target >= source,
+    '>': lambda target, source: target > source,
+}
+"""Dictionary of `execute if score` comparison operator and its result"""
+
+
+def wrap_score(value: int) -> int:
+    """
+    Wrap an integer into the range of a score (32-bit signed integer overflow)
+
+    :param value: Integer
+    :return: Score
+    """
+    return (value + MAX_SCORE + 1) % (2 * (MAX_SCORE + 1)) - MAX_SCORE - 1
+
+
+def is_in_range(value: int, range_: str) -> bool | None:
+    """
+    Whether a score matches a range (`1`, `1..`, `..5`, `1..5`)
+
+    :param value: Score
+    :param range_: Range of `matches`
+    :return: Whether the score is in the range, None if the range is invalid
+    """
+    try:
+        if '..' not in range_:
+            return value == int(range_)
+        minimum, maximum = range_.split('..')
+        return ((not minimum or int(minimum) <= value) and
+                (not maximum or value <= int(maximum)))
+    except ValueError:
+        return None
+
+
+def is_stable_holder(target: str) -> bool:
+    """
+    Whether a score holder always means the same scores between 2 consecutive commands
+
+    :param target: Score holder of scoreboard players command
+    :return: Whether it's a fake player or `@s`
+    """
+    return target == '@s' or not target.startswith(('@', '*'))
+
+
+def get_score_change(command: Command) -> int | None:
+    """
+    Get the amount a `scoreboard players add/remove <holder> <objective> <integer>` changes the score by
+
+    :param command: Command
+    :return: Amount (negative for remove), None if it's not an add/remove of a stable holder
+    """
+    if (
+        not isinstance(command, ScoreboardPlayers) or
+        command.action not in {'add', 'remove'} or
+        len(command.arguments) != 1 or
+        not is_stable_holder(command.target)
+    ):
+        return None
+    try:
+        value = int(command.arguments[0])
+    except ValueError:
+        return None
+    return value if command.action == 'add' else -value
+
+
+def is_same_score(command: Command, other: Command) -> bool:
+    """
+    Whether 2 scoreboard players commands are on the same score
+
+    :param command: Command
+    :param other: Other command
+    :return: Whether both are scoreboard players commands with the same stable holder and objective
+    """
+    return (
+        isinstance(command, ScoreboardPlayers) and
+        isinstance(other, ScoreboardPlayers) and
+        command.objective != '' and
+        command.target == other.target and
+        command.objective == other.objective and
+        is_stable_holder(command.target)
+    )
+
+
+def is_inlinable(command: Command) -> bool:
+    """
+    Whether a command does the same thing when moved out of its function into the caller
+
+    :param command: Command
+    :return: Whether it isn't a macro line or a `return`
+    """
+    string = str(command)
+    return not string.startswith(('$', 'return')) and ' run return' not in string
+
+
+def is_early_exit(command: Command) -> bool:
+    """
+    Whether a command may end its function before the last command
+
+    :param command: Command
+    :return: Whether it's a `return` (including `execute ... run return`)
+    """
+    while isinstance(command, Execute) and command.run is not None:
+        command = command.run
+    return str(command).split(' ', 1)[0] == 'return'
+
+
+RESOURCE_READING_COMMANDS = {'loot', 'item'}
+"""Commands that evaluate loot tables or item modifiers (which can read any score)"""
+
+
+def is_resource_reading(command: Command) -> bool:
+    """
+    Whether a command may evaluate a predicate, loot table or item modifier of a datapack, which can read scores that aren't in the command
+
+    :param command: Command
+    :return: Whether it uses a predicate or is `loot`/`item` (including `execute ... run loot/item`)
+    """
+    if 'predicate' in str(command):
+        return True
+    while isinstance(command, Execute) and command.run is not None:
+        command = command.run
+    return str(command).split(' ', 1)[0] in RESOURCE_READING_COMMANDS
+
+
+def get_condition_holder(subcommand: str) -> str | None:
+    """
+    Get the fake player an `if/unless score <holder> <objective> matches <range>` subcommand checks
+
+    :param subcommand: Execute subcommand
+    :return: Holder, None if it's not a score range check of a fake player
+    """
+    arguments = subcommand.split(' ')
+    if (
+        len(arguments) != 6 or
+        arguments[0] not in {'if', 'unless'} or
+        arguments[1] != 'score' or
+        arguments[4] != 'matches' or
+        not is_stable_holder(arguments[2]) or
+        arguments[2] == '@s'
+    ):
+        return None
+    return arguments[2]
+
+
+class Optimizer:
+    """
+    Peephole optimizer of minecraft commands, keeping how many times each optimization is applied
+
+    :param optimizations: Names of enabled optimizations (from OPTIMIZATIONS)
+    :param int_objective: Objective of integer constants, defaults to no integer constants
+    """
+    __slots__ = ('optimizations', 'hits', 'int_objective')
+    inline_max_length: int = 4
+    """Maximum amount of commands in a function to inline it"""
+    unroll_max_length: int = 16
+    """Maximum amount of commands of an unrolled loop (or of a block of iterations of a longer loop)"""
+    unroll_max_iterations: int = 65536
+    """Maximum amount of iterations of a loop to unroll"""
+
+    optimizations: set[str]
+    """Names of enabled optimizations"""
+    hits: dict[str, int]
+    """Dictionary of optimization's name and how many times it's applied"""
+    int_objective: str
+    """Objective of integer constants (`<n> <int_objective>` is always n)"""
+
+    def __init__(self, optimizations: set[str], int_objective: str = '') -> None:
+        self.optimizations = optimizations
+        self.hits = {name: 0 for name in OPTIMIZATIONS}
+        self.int_objective = int_objective
+
+    def is_enabled(self, optimization: str) -> bool:
+        """
+        Whether an optimization is enabled
+
+        :param optimization: Name of the optimization
+        :return: Whether it's enabled
+        """
+        return optimization in self.optimizations
+
+    @property
+    def is_whole_datapack(self) -> bool:
+        """
+        Whether any enabled optimization needs every function of the datapack at once
+
+        :return: Whether functions must be kept until the datapack is built
+        """
+        return not self.optimizations.isdisjoint(WHOLE_DATAPACK_OPTIMIZATIONS)
+
+    def hit(self, optimization: str) -> None:
+        """
+        Count an optimization being applied
+
+        :param optimization: Name of the optimization
+        """
+        self.hits[optimization] += 1
+
+    def optimize(self, commands: list[Command]) -> list[Command]:
+        """
+        Run enabled peephole optimizations over commands of a function
+
+        :param commands: Commands of the function
+        :return: Optimized commands
+        """
+        if not self.optimizations:
+            return commands
+        is_fuse_execute = self.is_enabled("fuse_execute")
+        is_merge_score_add = self.is_enabled("merge_score_add")
+        is_drop_overwritten_set = self.is_enabled("drop_overwritten_set")
+        if self.is_enabled("fold_constants"):
+            commands = self.fold_constants(commands)
+
+        output: list[Command] = []
+        for command in commands:
+            if is_fuse_execute:
+                optimized = optimize_command(command)
+                if optimized is not command:
+                    self.hit("fuse_execute")
+                    command = optimized
+
+            if is_drop_overwritten_set and isinstance(
+                    command, ScoreboardPlayers) and command.action == 'set':
+                while output and is_same_score(command, output[-1]) and output[-1].action in {  # type: ignore[attr-defined]
+                        'set', 'add', 'remove', 'reset'}:
+                    del output[-1]
+                    self.hit("drop_overwritten_set")
+
+            if is_merge_score_add and output:
+                change = get_score_change(command)
+                last_change = get_score_change(output[-1])
+                if change is not None and last_change is not None and is_same_score(
+                        command, output[-1]) and abs(change + last_change) <= MAX_SCORE:
+                    total = change + last_change
+                    self.hit("merge_score_add")
+                    if total == 0 and len(output) >= 2 and is_same_score(
+                            command, output[-2]) and output[-2].action in {'set', 'add', 'remove'}:  # type: ignore[attr-defined]
+                        del output[-1]
+                        continue
+                    # `add 0` is otherwise kept since it still creates the score if it doesn't exist
+                    output[-1] = ScoreboardPlayers(
+                        'add' if total >= 0 else 'remove', command.target, command.objective, (str(abs(total)), ))  # type: ignore[attr-defined]
+                    continue
+
+            output.append(command)
+        return output
+
+    def get_constant(self, holder: str, objective: str,
+                     knowns: dict[tuple[str, str], int]) -> int | None:
+        """
+        Get the value of a score if it's known
+
+        :param holder: Score holder
+        :param objective: Objective
+        :param knowns: Dictionary of fake player and objective and their known values
+        :return: Value, None if it's unknown
+        """
+        if objective == self.int_objective:
+            try:
+                return int(holder)
+            except ValueError:
+                pass
+        return knowns.get((holder, objective))
+
+    def resolve_condition(self, subcommand: str,
+                          knowns: dict[tuple[str, str], int]) -> bool | None:
+        """
+        Resolve an `if/unless score` subcommand on known scores
+
+        :param subcommand: Execute subcommand
+        :param knowns: Dictionary of fake player and objective and their known values
+        :return: Whether the condition passes, None if it isn't known
+        """
+        arguments = subcommand.split(' ')
+        if len(arguments) not in {6, 7} or arguments[0] not in {
+                'if', 'unless'} or arguments[1] != 'score':
+            return None
+        value = self.get_constant(arguments[2], arguments[3], knowns)
+        if value is None:
+            return None
+        if len(arguments) == 6:
+            if arguments[4] != 'matches':
+                return None
+            result = is_in_range(value, arguments[5])
+        else:
+            source = self.get_constant(arguments[5], arguments[6], knowns)
+            if source is None or arguments[4] not in SCORE_COMPARISONS:
+                return None
+            result = SCORE_COMPARISONS[arguments[4]](value, source)
+        if result is None:
+            return None
+        return result == (arguments[0] == 'if')
+
+    def fold_constants(self, commands: list[Command]) -> list[Command]:
+        """
+        Track fake players with values known at compile time through a function and fold commands on them
+
+        - A change to a known score becomes `scoreboard players set`, the previous set is removed if nothing read it in between
+        - `execute if/unless score` on known scores is removed (or the whole command if the condition fails),
+          unless the execute stores a result or runs a function (`execute if function`) that may change them
+        - Anything that may change scores in a way that isn't tracked (function calls, `execute store`, macro lines, `*`) forgets the scores it may touch
+        - A set is never removed across a command that may end the function (`return`, function calls), the score is read once it ends
+        - A set is never removed across a command that may read any score through a datapack json (predicates, `loot`, `item`)
+          or run a function (`advancement`, whose rewards can)
+
+        :param commands: Commands of the function
+        :return: Folded commands
+        """
+        output: list[Command | None] = []
+        knowns: dict[tuple[str, str], int] = {}
+        definitions: dict[tuple[str, str], int] = {}
+        """Dictionary of known score and index of its set in output that nothing read yet"""
+
+        def read(string: str, is_forget: bool = False) -> None:
+            for key in [key for key in definitions if key[0] in string]:
+                del definitions[key]
+            if is_forget:
+                for key in [key for key in knowns if key[0] in string]:
+                    del knowns[key]
+
+        def forget_all() -> None:
+            knowns.clear()
+            definitions.clear()
+
+        def define(key: tuple[str, str], value: int) -> None:
+            if key in definitions:
+                output[definitions[key]] = None
+            knowns[key] = value
+            definitions[key] = len(output)
+            output.append(ScoreboardPlayers('set', key[0], key[1], (str(value), )))
+
+        for command in commands:
+            string = str(command)
+            if isinstance(command, Execute) and command.run is not None and not any(
+                    subcommand.startswith(('store ', 'if function ', 'unless function ')) for subcommand in command.subcommands):
+                results = [self.resolve_condition(subcommand, knowns)
+                           for subcommand in command.subcommands]
+                if False in results:
+                    self.hit("fold_constants")
+                    continue
+                if True in results:
+                    self.hit("fold_constants")
+                    subcommands = tuple(subcommand for subcommand, result in zip(
+                        command.subcommands, results) if result is None)
+                    command = Execute(
+                        subcommands, command.run) if subcommands else command.run  # type: ignore[assignment]
+                    string = str(command)
+
+            if isinstance(command, ScoreboardPlayers) and command.objective and is_stable_holder(
+                    command.target) and command.target != '@s':
+                key = (command.target, command.objective)
+                value = knowns.get(key)
+                result: int | None = None
+                is_folded = False
+                if command.action == 'set' and len(command.arguments) == 1:
+                    try:
+                        result = int(command.arguments[0])
+                    except ValueError:
+                        pass
+                elif command.action in {'add', 'remove'} and len(command.arguments) == 1 and value is not None:
+                    change = get_score_change(command)
+                    if change is not None:
+                        result = wrap_score(value + change)
+                        is_folded = True
+                elif command.action == 'operation' and len(command.arguments) == 3 and command.arguments[0] in SCORE_OPERATIONS:
+                    source = self.get_constant(
+                        command.arguments[1], command.arguments[2], knowns)
+                    if source is not None and (value is not None or command.arguments[0] == '='):
+                        result = SCORE_OPERATIONS[command.arguments[0]](
+                            0 if value is None else value, source)
+                        if result is not None:
+                            result = wrap_score(result)
+                            is_folded = True
+                if result is not None:
+                    if is_folded:
+                        self.hit("fold_constants")
+                    define(key, result)
+                    continue
+
+            if is_early_exit(command) or is_resource_reading(command):
+                definitions.clear()
+            if string.startswith('$') or ' * ' in string or 'function ' in string or 'advancement ' in string or string.startswith('scoreboard objectives'):
+                # Scores that aren't mentioned can be changed
+                forget_all()
+            elif 'scoreboard ' in string or 'store ' in string:
+                read(string, is_forget=True)
+            else:
+                read(string)
+            output.append(command)
+        return [command for command in output if command is not None]
+
+    def get_loop_values(self, start: list[Command], conditions: tuple[str, ...],
+                        step: list[Command]) -> list[int] | None:
+        """
+        Get the value of the variable of a loop (`for`) at the start of every iteration, if it's known at compile time
+
+        - Commands of the start and the step must only set or change the variable by constants
+
+        :param start: Commands setting the variable before the loop
+        :param conditions: Execute subcommands checked before every iteration
+        :param step: Commands changing the variable after every iteration
+        :return: List of values, None if they're unknown or there are more than Optimizer.unroll_max_iterations
+        """
+        if not start or not isinstance(start[0], ScoreboardPlayers):
+            return None
+        key = (start[0].target, start[0].objective)
+        knowns: dict[tuple[str, str], int] = {}
+
+        def run(commands: list[Command]) -> bool:
+            for command in commands:
+                if not isinstance(command, ScoreboardPlayers) or (
+                        command.target, command.objective) != key or not is_stable_holder(command.target):
+                    return False
+                value = knowns.get(key)
+                result: int | None = None
+                if command.action == 'set' and len(command.arguments) == 1:
+                    try:
+                        result = int(command.arguments[0])
+                    except ValueError:
+                        return False
+                elif command.action in {'add', 'remove'} and value is not None:
+                    change = get_score_change(command)
+                    result = None if change is None else value + change
+                elif command.action == 'operation' and len(command.arguments) == 3 and command.arguments[0] in SCORE_OPERATIONS:
+                    source = self.get_constant(
+                        command.arguments[1], command.arguments[2], knowns)
+                    if source is not None and (value is not None or command.arguments[0] == '='):
+                        result = SCORE_OPERATIONS[command.arguments[0]](
+                            0 if value is None else value, source)
+                if result is None or wrap_score(result) != result:
+                    # The loop isn't worth unrolling if the variable overflows
+                    return False
+                knowns[key] = result
+            return True
+
+        if not run(start):
+            return None
+        values: list[int] = []
+        while True:
+            results = [self.resolve_condition(subcommand, knowns)
+                       for subcommand in conditions]
+            if None in results:
+                return None
+            if False in results:
+                return values
+            if len(values) >= self.unroll_max_iterations:
+                return None
+            values.append(knowns[key])
+            if not run(step):
+                return None
+
+    def inline_call(self, command: Command, location: str,
+                    commands: list[Command]) -> list[Command] | None:
+        """
+        Turn a command calling a function into commands of the function
+
+        - `function <location>` is replaced by the commands
+        - `execute ... run function <location>` is replaced by `execute ... run <command>` for each command,
+          only if it's 1 command or every subcommand is a score check of a fake player that the commands never touch
+        - Functions with macro lines or `return` aren't inlined, since they'd behave differently in the caller
+
+        :param command: Command that may call the function
+        :param location: Resource location of the function
+        :param commands: Commands of the function
+        :return: Commands replacing the command, None if it can't be inlined
+        """
+        commands = [command_ for command_ in commands if str(command_)]
+        if len(commands) > self.inline_max_length or not all(
+                is_inlinable(command_) for command_ in commands):
+            return None
+        if command == FunctionCall(location):
+            return commands
+        if not isinstance(command, Execute):
+            return None
+        subcommands = command.subcommands
+        run = command.run
+        while isinstance(run, Execute):
+            subcommands += run.subcommands
+            run = run.run
+        if run != FunctionCall(location):
+            return None
+        if any(subcommand.startswith('store ') for subcommand in subcommands):
+            # Stores the result of the function instead of the last command
+            return None
+        if len(commands) > 1:
+            holders = [get_condition_holder(subcommand)
+                       for subcommand in subcommands]
+            if None in holders:
+                return None
+            for command_ in commands:
+                string = str(command_)
+                # The condition can change halfway through the commands
+                if any(holder in string for holder in holders) or 'function ' in string or ' * ' in string or string.startswith('scoreboard objectives'):  # type: ignore[operator]
+                    return None
+        return [Execute(subcommands + command_.subcommands, command_.run) if isinstance(command_, Execute)
+                else Execute(subcommands, command_) for command_ in commands]
+
+    def report(self) -> str:
+        """
+        Summarize how many times each enabled optimization is applied
+
+        :return: Report
+        """
+        return ", ".join(f"{name} {self.hits[name]}" for name in OPTIMIZATIONS
+                         if name in self.optimizations)
@@ -0,0 +1,345 @@
+"""Module writing built files into a folder (skipping files that didn't change since the last build), a zip file or a dictionary"""
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from json import JSONDecodeError, dump, load
+from pathlib import Path
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+import os
+
+from .build_record import hash_string
+from .log import Logger
+
+logger = Logger(__name__)
+OUTPUT_MANIFEST_FILE_NAME = 'jmc_output.json'
+OUTPUT_MANIFEST_VERSION = 1
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+"""Modified time of every file in a zip output (so that the same datapack is always the same zip file)"""
+
+
+class OutputSink(ABC):
+    """
+    Destination of built files
+    """
+    __slots__ = ()
+
+    @property
+    def is_merge_tags(self) -> bool:
+        """
+        Whether function tags (load.json and tick.json) from outside JMC can exist and need to be merged
+
+        :return: Whether to read existing function tags
+        """
+        return False
+
+    @abstractmethod
+    def add(self, path: Path, content: str) -> None:
+        """
+        Add a built file
+
+        :param path: Path to the file
+        :param content: Content of the file
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """
+        Finish writing (Must be called after every file is added)
+        """
+
+
+class VirtualSink(OutputSink):
+    """
+    Sink collecting built files into a dictionary instead of writing them
+    """
+    __slots__ = ('outputs', )
+
+    outputs: dict[str, str]
+    """Dictionary of file path and file content"""
+
+    def __init__(self) -> None:
+        self.outputs = {}
+
+    def add(self, path: Path, content: str) -> None:
+        self.outputs[path.as_posix()] = content
+
+    def close(self) -> None:
+        pass
+
+
+class ZipSink(OutputSink):
+    """
+    Sink streaming built files straight into a zip file
+
+    - The zip file is replaced only after every file is written
+
+    :param zip_path: Path to the zip file (Paths of built files are relative to it)
+    """
+    __slots__ = ('zip_path', 'temp_path', 'zip_file')
+
+    zip_path: Path
+    """Path to the zip file"""
+    temp_path: Path
+    """Path to the zip file being written"""
+    zip_file: ZipFile
+
+    def __init__(self, zip_path: Path) -> None:
+        self.zip_path = zip_path
+        self.temp_path = zip_path.with_name(zip_path.name + '.tmp')
+        zip_path.parent.mkdir(parents=True, exist_ok=True)
+        self.zip_file = ZipFile(self.temp_path, 'w', ZIP_DEFLATED)
+
+    def add(self, path: Path, content: str) -> None:
+        info = ZipInfo(path.relative_to(self.zip_path).as_posix(),
+                       date_time=ZIP_DATE_TIME)
+        info.compress_type = ZIP_DEFLATED
+        self.zip_file.writestr(info, content)
+
+    def close(self) -> None:
+        self.zip_file.close()
+        os.replace(self.temp_path, self.zip_path)
+        logger.info(f"Output: {len(self.zip_file.infolist())} files zipped")
+
+
+class OutputWriter(OutputSink):
+    """
+    Sink writing built files into a folder and keeping a manifest of every file it wrote (next to JMC.txt)
+
+    - A file is written by a pool of threads as soon as it's added, only if its content changed or it was modified since the last build
+    - Files inside owned folders that weren't built are deleted (only if there's a manifest of the last build)
+
+    :param output_folder: Output folder of the datapack (Paths in the manifest are relative to it)
+    :param manifest_path: Path to the manifest
+    :param owned_folders: Folders whose files that weren't built are deleted
+    :param keeps: Paths (and everything inside them) that are never deleted
+    """
+    __slots__ = ('output_folder', 'manifest_path', 'owned_folders', 'keeps', 'manifest', 'executor',
+                 'folders', 'pending', 'files', 'error', 'written', 'skipped', 'deleted')
+
+    output_folder: Path
+    """Output folder of the datapack"""
+    manifest_path: Path
+    """Path to the manifest"""
+    owned_folders: list[Path]
+    """Folders whose files that weren't built are deleted"""
+    keeps: set[Path]
+    """Paths (and everything inside them) that are never deleted"""
+    manifest: dict[str, list[str | int]] | None
+    """Dictionary of relative path and [content hash, size, modified time] of the last build, None if there's no manifest"""
+    executor: ThreadPoolExecutor | None
+    """Pool of threads writing files, None if no file was added since closing"""
+    folders: set[Path]
+    """Set of folders that were already created"""
+    pending: deque[tuple[str, Future[tuple[bool, list[str | int]]]]]
+    """Queue of relative path and write of every file that was added but not collected"""
+    files: dict[str, list[str | int]]
+    """Manifest of files collected since closing"""
+    error: Exception | None
+    """Error of the first failed write since closing"""
+    written: int
+    skipped: int
+    deleted: int
+    write_workers: int | None = None
+    """Maximum amount of threads writing files, None to use ThreadPoolExecutor's default"""
+
+    def __init__(self, output_folder: Path, manifest_path: Path,
+                 owned_folders: list[Path], keeps: set[Path]) -> None:
+        self.output_folder = output_folder
+        self.manifest_path = manifest_path
+        self.owned_folders = owned_folders
+        self.keeps = keeps
+        self.manifest = self.load_manifest(manifest_path)
+        self.executor = None
+        self.folders = set()
+        self.pending = deque()
+        self.files = {}
+        self.error = None
+        self.written = 0
+        self.skipped = 0
+        self.deleted = 0
+
+    @property
+    def is_merge_tags(self) -> bool:
+        # The minecraft folder is owned by JMC after the first build
+        return self.manifest is None
+
+    def add(self, path: Path, content: str) -> None:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.write_workers)
+        if path.parent not in self.folders:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.folders.add(path.parent)
+        key = path.relative_to(self.output_folder).as_posix()
+        self.pending.append(
+            (key, self.executor.submit(self.write_file, path, key, content)))
+        self.collect()
+
+    def collect(self, is_wait: bool = False) -> None:
+        """
+        Record finished writes (in the order they were added) and release them
+
+        :param is_wait: Whether to wait for every write, defaults to False
+        """
+        while self.pending and (is_wait or self.pending[0][1].done()):
+            key, future = self.pending.popleft()
+            try:
+                is_written, entry = future.result()
+            except Exception as error:  # pylint: disable=broad-except
+                if self.error is None:
+                    self.error = error
+                continue
+            if is_written:
+                self.written += 1
+            else:
+                self.skipped += 1
+            self.files[key] = entry
+
+    def close(self) -> None:
+        """
+        Wait for every write, delete stale files and save the manifest
+
+        - If writing fails, the error of the first file (in the order they were added) is raised after every write finishes
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        # Every write has finished here, so the same error is raised no matter which thread failed first
+        self.collect(is_wait=True)
+        if self.error is not None:
+            error = self.error
+            self.error = None
+            self.files = {}
+            raise error
+
+        if self.manifest is not None:
+            self.delete_stale()
+
+        self.manifest = self.files
+        self.files = {}
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.manifest_path.open('w+') as file:
+            dump({"version": OUTPUT_MANIFEST_VERSION,
+                 "files": self.manifest}, file)
+        logger.info(
+            f"Output: {self.written} written, {self.skipped} unchanged, {self.deleted} deleted")
+
+    @staticmethod
+    def load_manifest(path: Path) -> dict[str, list[str | int]] | None:
+        """
+        Read a manifest
+
+        :param path: Path to the manifest
+        :return: Dictionary of relative path and [content hash, size, modified time], None if it doesn't exist or is unreadable
+        """
+        try:
+            with path.open('r') as file:
+                json = load(file)
+            if json["version"] != OUTPUT_MANIFEST_VERSION:
+                return None
+            return json["files"]
+        except (OSError, JSONDecodeError, KeyError, TypeError):
+            return None
+
+    @classmethod
+    def is_intact(cls, output_folder: Path, manifest_path: Path) -> bool:
+        """
+        Whether every file in a manifest is still on disk exactly as the last build wrote it
+
+        :param output_folder: Output folder of the datapack
+        :param manifest_path: Path to the manifest
+        :return: Whether no file was deleted or modified since the last build, False if there's no manifest
+        """
+        manifest = cls.load_manifest(manifest_path)
+        if manifest is None:
+            return False
+        for key, (_, size, modified_time) in manifest.items():
+            try:
+                stat = (output_folder / key).stat()
+            except OSError:
+                logger.info(f"Output file deleted: {key}")
+                return False
+            if stat.st_size != size or stat.st_mtime_ns != modified_time:
+                logger.info(f"Output file modified: {key}")
+                return False
+        return True
+
+    def is_unchanged(self, path: Path, key: str, content_hash: str) -> bool:
+        """
+        Whether a file on disk is exactly what the last build wrote and has the same content
+
+        :param path: Path to the file
+        :param key: Path relative to the output folder
+        :param content_hash: Hash of the new content
+        :return: Whether writing the file can be skipped
+        """
+        if self.manifest is None or key not in self.manifest:
+            return False
+        old_hash, size, modified_time = self.manifest[key]
+        if old_hash != content_hash:
+            return False
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        return stat.st_size == size and stat.st_mtime_ns == modified_time
+
+    def is_kept(self, path: Path) -> bool:
+        """
+        Whether a path must never be deleted
+
+        :param path: Path to a file or a folder
+        :return: Whether the path is or is inside one of OutputWriter.keeps
+        """
+        return path in self.keeps or any(
+            parent in self.keeps for parent in path.parents)
+
+    def write_file(self, path: Path, key: str,
+                   content: str) -> tuple[bool, list[str | int]]:
+        """
+        Write a file if it changed (Its folder must already exist)
+
+        :param path: Path to the file
+        :param key: Path relative to the output folder
+        :param content: Content of the file
+        :return: Whether the file was written and its manifest entry
+        """
+        content_hash = hash_string(content)
+        is_written = not self.is_unchanged(path, key, content_hash)
+        if is_written:
+            with path.open('w+') as file:
+                file.write(content)
+        stat = path.stat()
+        return is_written, [content_hash, stat.st_size, stat.st_mtime_ns]
+
+    def write(self, outputs: dict[str, str]) -> None:
+        """
+        Write built files, delete stale files and save the manifest
+
+        :param outputs: Dictionary of file path and file content
+        """
+        for path_str, content in outputs.items():
+            self.add(Path(path_str), content)
+        self.close()
+
+    def delete_stale(self) -> None:
+        """
+        Delete files inside owned folders that weren't built (not in OutputWriter.files) and folders left empty
+        """
+        for owned_folder in self.owned_folders:
+            if not owned_folder.is_dir():
+                continue
+            for root, _, file_names in os.walk(owned_folder, topdown=False):
+                folder = Path(root)
+                for file_name in file_names:
+                    path = folder / file_name
+                    if path.relative_to(self.output_folder).as_posix() in self.files or self.is_kept(path):
+                        continue
+                    path.unlink()
+                    self.deleted += 1
+                if folder == owned_folder or self.is_kept(folder):
+                    continue
+                try:
+                    folder.rmdir()
+                except OSError:
+                    # Folder isn't empty
+                    pass
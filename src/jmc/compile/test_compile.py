@@ -1,11 +1,12 @@
 """Module for testing compilation"""
 from json import dumps
 from pathlib import Path
+from typing import Iterator
 
 from ..terminal.configuration import Configuration, GlobalData
 from .log import Logger
 from .header import Header
-from .compiling import read_cert, read_header, build
+from .compiling import read_cert, read_header, build, iter_build
 from .lexer import Lexer
 
 
@@ -17,6 +18,7 @@ class JMCPack:
     Class representation of folder structure containing entire JMC files
 
     - Used for testing to prevent having to write and read files
+    - Used for embedding JMC, JMCPack.iter_build streams the datapack without writing files
 
     :param namespace: Namespace of the virtual datapack, defaults to "TEST"
     :param output: virtual directory for output, defaults to "VIRTUAL"
@@ -58,6 +60,16 @@ INT=__int__"""
         self.cert = file_content
         return self
 
+    def set_pack_format(self, pack_format: str) -> "JMCPack":
+        """
+        Set pack_format of the datapack
+
+        :param pack_format: pack_format
+        :return: Self
+        """
+        self.config.pack_format = pack_format
+        return self
+
     def set_jmc_file(self, file_content: str) -> "JMCPack":
         """
         Set main jmc file
@@ -91,6 +103,23 @@ INT=__int__"""
         self.__built = build(lexer.datapack, self.config, _is_virtual=True)
         return self
 
+    def iter_build(self) -> Iterator[tuple[str, str]]:
+        """
+        Build datapack lazily, without keeping the result
+
+        - Every file is made only when it's reached, use it to pipe a large datapack into other storage
+        - Header is shared, so no other datapack can be built until the iterator is exhausted
+
+        :return: Iterator of file path and file content (Same as JMCPack.built)
+        """
+        logger.info("Building lazily from JMCPack")
+        Header.clear()
+        read_cert(self.config, _test_file=self.cert)
+        read_header(self.config, _test_file=self.header_file)
+        lexer = Lexer(self.config, _test_file=self.jmc_file)
+        for path, content in iter_build(lexer.datapack, self.config, is_pack_meta=False):
+            yield path.as_posix(), content
+
     @property
     def built(self) -> dict[str, str]:
         if self.__built is None:
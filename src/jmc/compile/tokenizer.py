@@ -1,6 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from array import array
 from ast import literal_eval
+from bisect import bisect_right
 from enum import Enum
+from typing import Callable
 import re
 
 from .utils import is_connected
@@ -24,6 +27,7 @@ class TokenType(Enum):
     COMMENT = "Comment"
     COMMA = "Comma"
     FUNC = "Function"
+    SEMICOLON = "Semicolon"
 
 
 @dataclass(frozen=True, eq=False, slots=True)
@@ -35,45 +39,24 @@ class Token:
     :param line: Which line it's found in
     :param col: Which column it's found in
     :param string: The string representation (including parentheses, excluding quotation mark)
+    :param children: Tokens inside the parentheses (including semicolon tokens), None if they weren't tokenized yet
     """
     token_type: TokenType
     line: int
     col: int
     string: str
     """The string representation (including parentheses, excluding quotation mark)"""
+    children: list["Token"] | None = field(default=None, repr=False)
+    """Tokens inside the parentheses (including semicolon tokens), None if they weren't tokenized yet"""
 
     # def __new__(cls: type["Token"], token_type: TokenType, line: int, col: int, string: str) -> "Token":
     #     return super().__new__(cls)
 
     def __post_init__(self) -> None:
-        """
-        Edit string and _length according to macros(`#define something`) defined
-        """
-        header = Header()
-        if self.token_type == TokenType.PAREN_CURLY:
-            if not self.string.startswith(
-                    '{') or not self.string.endswith('}'):
-                raise ValueError(
-                    "paren_curly Token created but string doesn't start and end with the parenthesis")
-
-        if not header.is_enable_macro:
-            return
-
-        if self.token_type != TokenType.KEYWORD:
-            return
-
-        string = header.macros.get(self.string, self.string)
-
-        splitters = {":", "."}
-        for splitter in splitters:
-            if splitter in string:
-                string = splitter.join(
-                    [header.macros[keyword] if keyword in header.macros else keyword for keyword in string.split(splitter)])
-
-        if string == self.string:
-            return
-
-        object.__setattr__(self, "string", string)
+        if self.token_type == TokenType.PAREN_CURLY and (not self.string.startswith(
+                '{') or not self.string.endswith('}')):
+            raise ValueError(
+                "paren_curly Token created but string doesn't start and end with the parenthesis")
 
     @property
     def length(self) -> int:
@@ -97,6 +80,17 @@ class Token:
         return repr(
             self.string) if self.token_type == TokenType.STRING else self.string
 
+    def get_end(self) -> tuple[int, int]:
+        """
+        Get the position right after the last character of the token
+
+        :return: Line and column
+        """
+        string = self.get_full_string()
+        if '\n' in string:
+            return self.line + string.count('\n'), self.length - string.rfind('\n')
+        return self.line, self.col + self.length
+
     @classmethod
     def empty(cls, string: str = "",
               token_type: TokenType = TokenType.KEYWORD) -> "Token":
@@ -110,6 +104,284 @@ class Token:
         return cls(token_type, -1, -1, string)
 
 
+class LineIndex:
+    """
+    Offsets of the first character of every line in a string
+
+    - The string is only scanned on first use, so a LineIndex can be made ahead of time and shared
+
+    :param string: String to index
+    """
+    __slots__ = ('string', '_offsets')
+
+    string: str
+    _offsets: array | None
+    """Index of the first character of each line in string, None if it isn't scanned yet"""
+
+    def __init__(self, string: str) -> None:
+        self.string = string
+        self._offsets = None
+
+    @property
+    def offsets(self) -> array:
+        """Index of the first character of each line in string"""
+        if self._offsets is None:
+            self._offsets = array('i', [0])
+            self._offsets.extend(match.end()
+                                 for match in re.finditer('\n', self.string))
+        return self._offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def get_line(self, line: int) -> str:
+        """
+        Get a line without the newline character (Same as `string.split('\\n')[line-1]`)
+
+        :param line: Line number (Starts at 1)
+        :raises IndexError: Line is out of range
+        :return: String of the line
+        """
+        offsets = self.offsets
+        index = line - 1
+        if index < 0:
+            index += len(offsets)
+        if not 0 <= index < len(offsets):
+            raise IndexError("line index out of range")
+        if index + 1 == len(offsets):
+            return self.string[offsets[index]:]
+        return self.string[offsets[index]:offsets[index + 1] - 1]
+
+    def get_offset(self, line: int, col: int) -> int:
+        """
+        Get the index of a character in the string
+
+        :param line: Line number (Starts at 1)
+        :param col: Column number (Starts at 1)
+        :return: Index in string
+        """
+        return self.offsets[line - 1] + col - 1
+
+    def get_pos(self, offset: int) -> tuple[int, int]:
+        """
+        Get the position of a character in the string
+
+        :param offset: Index in string
+        :return: Line and column (Starts at 1)
+        """
+        line = bisect_right(self.offsets, offset)
+        return line, offset - self.offsets[line - 1] + 1
+
+
+TOKEN_TYPES = tuple(TokenType)
+"""Tuple of all TokenType, TokenStream stores the index of a TokenType"""
+TOKEN_TYPE_INDEX = {token_type: index for index,
+                    token_type in enumerate(TOKEN_TYPES)}
+"""Dictionary of TokenType and its index in TOKEN_TYPES"""
+STRING_TYPE_INDEX = TOKEN_TYPE_INDEX[TokenType.STRING]
+
+
+class TokenStream:
+    """
+    Compact storage of tokens found in a string, information of each token is kept in parallel arrays
+    and their strings are sliced out of the source string only when needed
+
+    - Tokens are stored in the order they appear, tokens inside parentheses right after the paren token
+
+    :param source: String the tokens were found in
+    :param line_index: LineIndex of source if there already is one, defaults to None
+    """
+    __slots__ = ('source', 'types', 'lines', 'cols',
+                 'starts', 'ends', 'skips', 'strings', 'lengths', '_line_index')
+
+    source: str
+    """String the tokens were found in"""
+    types: array
+    """Index of TokenType in TOKEN_TYPES"""
+    lines: array
+    cols: array
+    starts: array
+    """Index of the first character of the token in source"""
+    ends: array
+    """Index after the last character of the token in source"""
+    skips: array
+    """Index of the first token after children of a paren token, 0 if its children weren't tokenized"""
+    strings: dict[int, str]
+    """Dictionary of index and string of a token whose string isn't the same as in source (string literal, macro)"""
+    lengths: dict[int, int]
+    """Dictionary of index and length of a string literal token that was already calculated"""
+    _line_index: LineIndex | None
+    """LineIndex of source, None if it isn't needed yet"""
+
+    def __init__(self, source: str, line_index: LineIndex | None = None) -> None:
+        self.source = source
+        self.types = array('B')
+        self.lines = array('i')
+        self.cols = array('i')
+        self.starts = array('i')
+        self.ends = array('i')
+        self.skips = array('i')
+        self.strings = {}
+        self.lengths = {}
+        self._line_index = line_index
+
+    @property
+    def line_index(self) -> LineIndex:
+        """LineIndex of source, created on first use"""
+        if self._line_index is None:
+            self._line_index = LineIndex(self.source)
+        return self._line_index
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def append(self, token_type: TokenType, line: int, col: int,
+               start: int, end: int, string: str | None = None) -> int:
+        """
+        Add a token
+
+        :param token_type: Type of the token
+        :param line: Which line it's found in
+        :param col: Which column it's found in
+        :param start: Index of the first character of the token in source
+        :param end: Index after the last character of the token in source
+        :param string: The string representation if it's not the same as in source, defaults to None
+        :return: Index of the new token
+        """
+        index = len(self.types)
+        self.types.append(TOKEN_TYPE_INDEX[token_type])
+        self.lines.append(line)
+        self.cols.append(col)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.skips.append(0)
+        if string is not None:
+            self.strings[index] = string
+        return index
+
+    def truncate(self, length: int) -> None:
+        """
+        Remove every token from the index
+
+        :param length: Amount of tokens to keep
+        """
+        for array_ in (self.types, self.lines, self.cols,
+                       self.starts, self.ends, self.skips):
+            del array_[length:]
+        for index in [index for index in self.strings if index >= length]:
+            del self.strings[index]
+        for index in [index for index in self.lengths if index >= length]:
+            del self.lengths[index]
+
+    def get_string(self, index: int) -> str:
+        """
+        Get the string representation of a token
+
+        :param index: Index of the token
+        :return: The string representation (including parentheses, excluding quotation mark)
+        """
+        string = self.strings.get(index)
+        if string is None:
+            return self.source[self.starts[index]:self.ends[index]]
+        return string
+
+    def get_length(self, index: int) -> int:
+        """
+        Get the length of a token (Same as Token.length)
+
+        :param index: Index of the token
+        :return: Length of the string (including quotation mark)
+        """
+        string = self.strings.get(index)
+        if string is None:
+            return self.ends[index] - self.starts[index]
+        if self.types[index] != STRING_TYPE_INDEX:
+            return len(string)
+        length = self.lengths.get(index)
+        if length is None:
+            length = self.lengths[index] = len(repr(string))
+        return length
+
+    def get_end(self, index: int) -> tuple[int, int]:
+        """
+        Get the position right after the last character of a token (Same as Token.get_end)
+
+        :param index: Index of the token
+        :return: Line and column
+        """
+        line = self.lines[index]
+        col = self.cols[index]
+        if index in self.strings:
+            return line, col + self.get_length(index)
+        line_index = self.line_index
+        start_line = line_index.get_pos(self.starts[index])[0]
+        end_line, end_col = line_index.get_pos(self.ends[index])
+        if start_line == end_line:
+            return line, col + self.ends[index] - self.starts[index]
+        return line + end_line - start_line, end_col
+
+    def get_children(self, index: int) -> list[Token] | None:
+        """
+        Get tokens inside a paren token
+
+        :param index: Index of the paren token
+        :return: List of tokens, None if they weren't tokenized
+        """
+        end = self.skips[index]
+        if end == 0:
+            return None
+        children: list[Token] = []
+        index += 1
+        while index < end:
+            children.append(StreamToken(self, index))
+            index = self.skips[index] or index + 1
+        return children
+
+
+class StreamToken(Token):
+    """
+    A token stored in TokenStream, its information is read from the stream when needed
+
+    :param stream: TokenStream containing the token
+    :param index: Index of the token in the stream
+    """
+    __slots__ = ('stream', 'index')
+
+    stream: TokenStream
+    index: int
+
+    def __init__(self, stream: TokenStream, index: int) -> None:  # pylint: disable=super-init-not-called
+        object.__setattr__(self, "stream", stream)
+        object.__setattr__(self, "index", index)
+
+    @property  # type: ignore[override]
+    def token_type(self) -> TokenType:
+        return TOKEN_TYPES[self.stream.types[self.index]]
+
+    @property  # type: ignore[override]
+    def line(self) -> int:
+        return self.stream.lines[self.index]
+
+    @property  # type: ignore[override]
+    def col(self) -> int:
+        return self.stream.cols[self.index]
+
+    @property  # type: ignore[override]
+    def string(self) -> str:
+        return self.stream.get_string(self.index)
+
+    @property  # type: ignore[override]
+    def children(self) -> list[Token] | None:
+        return self.stream.get_children(self.index)
+
+    @property
+    def length(self) -> int:
+        return self.stream.get_length(self.index)
+
+    def get_end(self) -> tuple[int, int]:
+        return self.stream.get_end(self.index)
+
+
 @dataclass(frozen=True, eq=False, slots=True)
 class Pos:
     """
@@ -121,6 +393,25 @@ class Pos:
     col: int
 
 
+@dataclass(slots=True)
+class Frame:
+    """
+    Dataclass containing information of a bracket whose content is being tokenized
+    :var paren: Left bracket
+    :var pos: Position of the left bracket
+    :var index: Index of the left bracket in the parsed string
+    :var token_index: Index of the paren token in the TokenStream
+    """
+    paren: str
+    pos: Pos
+    index: int
+    token_index: int
+
+
+class IrregularParenError(Exception):
+    """Content of the outermost bracket has to be tokenized on its own later"""
+
+
 class Re:
     NEW_LINE = '\n'
     BACKSLASH = '\\'
@@ -154,6 +445,46 @@ PAREN_PAIR = {
 }
 """Dictionary of left bracket(string) and right bracket(string)"""
 
+PAREN_TOKEN_TYPE = {
+    Paren.L_CURLY: TokenType.PAREN_CURLY,
+    Paren.L_SQUARE: TokenType.PAREN_SQUARE,
+    Paren.L_ROUND: TokenType.PAREN_ROUND,
+}
+"""Dictionary of left bracket(string) and TokenType of the bracket"""
+
+QUOTES = frozenset((Quote.SINGLE, Quote.DOUBLE))
+L_PARENS = frozenset((Paren.L_CURLY, Paren.L_ROUND, Paren.L_SQUARE))
+R_PARENS = frozenset((Paren.R_CURLY, Paren.R_ROUND, Paren.R_SQUARE))
+KEYWORD_TERMINATORS = QUOTES | L_PARENS | {Re.COMMA}
+"""Characters (other than whitespaces and semicolon) that end a keyword"""
+
+
+class Scan:
+    """
+    Precompiled patterns matching runs of characters that the tokenizer can consume at once,
+    all of them stop before any character that changes the tokenizer's state
+    """
+    NONE = re.compile(
+        r'[^\S\n]*([^\s\'"{(\[,;/#)\]}][^\s\'"{(\[,;/]*)?')
+    """Whitespaces followed by an optional keyword"""
+    NESTED_NONE = re.compile(
+        r'[^\S\n]*([^\s\'"{(\[,;/#)\]}][^\s\'"{(\[,;/)\]}]*)?')
+    KEYWORD = re.compile(r'[^\s\'"{(\[,;/]+')
+    NESTED_KEYWORD = re.compile(r'[^\s\'"{(\[,;/)\]}]+')
+    COMMENT = re.compile(r'[^\n]+')
+    STRING = {
+        Quote.SINGLE: re.compile(r"[^'\\/\n]+"),
+        Quote.DOUBLE: re.compile(r'[^"\\/\n]+')
+    }
+    PAREN_STRING = {
+        Quote.SINGLE: re.compile(r"[^'\\\n]+"),
+        Quote.DOUBLE: re.compile(r'[^"\\\n]+')
+    }
+    PAREN = {
+        paren: re.compile(
+            f"[^{re.escape(paren + r_paren)}'\"#/\\n]+") for paren, r_paren in PAREN_PAIR.items()
+    }
+
 
 class Tokenizer:
     """
@@ -166,6 +497,8 @@ class Tokenizer:
     :param file_string: Entire string read from current file, defaults to None
     :param expect_semicolon: Whether to expect semicolon at the end, defaults to True
     :param allow_semicolon: Whether to allow semicolon at the 2nd char(For minecraft array `[I;int, ...]`), defaults to False
+    :param programs: Already tokenized lines, defaults to None
+    :param line_index: LineIndex of file_string shared with the parent tokenizer, defaults to None
     """
     __slots__ = ('line', 'col', 'state',
                  'token_str', 'token_pos', 'keywords',
@@ -173,7 +506,12 @@ class Tokenizer:
                  'paren', 'r_paren', 'paren_count',
                  'is_string', 'is_slash', 'raw_string',
                  'file_string', 'file_path', 'programs',
-                 'is_comment', 'allow_semicolon')
+                 'is_comment', 'allow_semicolon', 'frames',
+                 'stream', 'index', 'token_start', 'expand_macros',
+                 '_line_index')
+
+    is_fast_scan: bool = True
+    """Whether to consume runs of uneventful characters at once instead of one character at a time"""
 
     programs: list[list[Token]]
     """List of lines(list of tokens)"""
@@ -189,6 +527,8 @@ class Tokenizer:
     """Current string for token"""
     token_pos: Pos | None
     """Position for creating token"""
+    token_start: int
+    """Index of the first character of the current token in the parsed string"""
     keywords: list[Token]
     """Current list of tokens"""
 
@@ -221,8 +561,22 @@ class Tokenizer:
     allow_semicolon: bool
     """Whether to allow semicolon at the next char(For minecraft array `[I;int, ...]`)"""
 
+    # Nested brackets
+    frames: list[Frame]
+    """Stack of brackets whose content is being tokenized"""
+    stream: TokenStream
+    """Storage of tokens found in the string being parsed"""
+    index: int
+    """Index of the current character in the string being parsed"""
+
+    expand_macros: Callable[[str], str] | None
+    """Function replacing macros in a keyword (None if there's no macro defined)"""
+    _line_index: LineIndex | None
+    """LineIndex of file_string, None if it isn't needed yet"""
+
     def __init__(self, raw_string: str, file_path_str: str, line: int = 1, col: int = 1,
-                 file_string: str | None = None, expect_semicolon: bool = True, allow_semicolon: bool = False) -> None:
+                 file_string: str | None = None, expect_semicolon: bool = True, allow_semicolon: bool = False,
+                 programs: list[list[Token]] | None = None, line_index: LineIndex | None = None) -> None:
         logger.debug("Initializing Tokenizer")
         self.allow_semicolon = allow_semicolon
         self.raw_string = raw_string
@@ -231,9 +585,24 @@ class Tokenizer:
         else:
             self.file_string = file_string
         self.file_path = file_path_str
+        self._line_index = line_index
+        header = Header()
+        self.expand_macros = header.expand_macros if header.macro_pattern is not None else None
+        if programs is not None:
+            self.line = line
+            self.col = col
+            self.programs = programs
+            return
         self.programs = self.parse(
             self.raw_string, line=line, col=col, expect_semicolon=expect_semicolon)
 
+    @property
+    def line_index(self) -> LineIndex:
+        """LineIndex of the entire string read from current file, created on first use"""
+        if self._line_index is None:
+            self._line_index = LineIndex(self.file_string)
+        return self._line_index
+
     def append_token(self) -> None:
         """
         Append the current token into self.keywords
@@ -244,12 +613,20 @@ class Tokenizer:
         if self.token_pos is None:
             raise ValueError(
                 "Tokenizer.token_pos() called but Tokenizer.token_pos is still None")
-        self.keywords.append(
-            Token(self.state,
-                  self.token_pos.line,
-                  self.token_pos.col,
-                  self.token_str)
-        )
+        if self.state == TokenType.KEYWORD:
+            end = self.token_start + len(self.token_str)
+            string = None
+            if self.expand_macros is not None:
+                string = self.expand_macros(self.token_str)
+                if string == self.token_str:
+                    string = None
+        else:
+            end = self.index + 1
+            string = self.token_str if self.state == TokenType.STRING else None
+        index = self.stream.append(self.state, self.token_pos.line, self.token_pos.col,
+                                   self.token_start, end, string)
+        if not self.frames:
+            self.keywords.append(StreamToken(self.stream, index))
         self.token_str = ""
         self.token_pos = None
         self.state = None
@@ -269,23 +646,20 @@ class Tokenizer:
                 "Unnecessary semicolon(;)", None, self)
 
     def __parse_none(self, char: str) -> bool:
-        if char in {Quote.SINGLE, Quote.DOUBLE}:
+        if char in QUOTES:
             self.state = TokenType.STRING
             self.token_pos = Pos(self.line, self.col)
+            self.token_start = self.index
             self.quote = char
             self.token_str += char
-        elif re.match(Re.WHITESPACE, char):
+        elif char.isspace():
             return True
         elif char == Re.SEMICOLON:
             self.append_keywords()
-        elif char in {Paren.L_CURLY, Paren.L_ROUND, Paren.L_SQUARE}:
-            self.state = TokenType.PAREN
-            self.token_str += char
-            self.token_pos = Pos(self.line, self.col)
-            self.paren = char
-            self.r_paren = PAREN_PAIR[char]
-            self.paren_count = 0
-        elif char in {Paren.R_CURLY, Paren.R_ROUND, Paren.R_SQUARE}:
+        elif char in L_PARENS:
+            self.frames.append(Frame(char, Pos(self.line, self.col), self.index, self.stream.append(
+                PAREN_TOKEN_TYPE[char], self.line, self.col, self.index, self.index)))
+        elif char in R_PARENS:
             raise JMCSyntaxException(
                 "Unexpected bracket", None, self, display_col_length=False)
         elif char == Re.HASH and self.col == 1:
@@ -293,23 +667,18 @@ class Tokenizer:
         elif char == Re.COMMA:
             self.token_str += char
             self.token_pos = Pos(self.line, self.col)
+            self.token_start = self.index
             self.state = TokenType.COMMA
             self.append_token()
         else:
             self.state = TokenType.KEYWORD
             self.token_pos = Pos(self.line, self.col)
+            self.token_start = self.index
             self.token_str += char
         return False
 
     def __parse_keyword(self, char: str, expect_semicolon: bool) -> bool:
-        if char in {
-            Quote.SINGLE,
-            Quote.DOUBLE,
-            Paren.L_CURLY,
-            Paren.L_ROUND,
-            Paren.L_SQUARE,
-            Re.COMMA
-        } or re.match(Re.WHITESPACE, char):
+        if char in KEYWORD_TERMINATORS or char.isspace():
             self.append_token()
             return False
         if char == Re.SEMICOLON:
@@ -388,7 +757,7 @@ class Tokenizer:
             self.paren_count += 1
         elif char == self.r_paren:
             self.paren_count -= 1
-        elif char in {Quote.SINGLE, Quote.DOUBLE}:
+        elif char in QUOTES:
             self.is_string = True
             self.quote = char
         elif char == Re.HASH and self.col == 1:
@@ -400,45 +769,206 @@ class Tokenizer:
                 self.is_slash = True
         return False
 
-    def __parse_chars(self, string: str, expect_semicolon: bool):
-        for char in string:
-            self.col += 1
-            if char == Re.SEMICOLON and self.state is None and not expect_semicolon:
-                raise JMCSyntaxException(
-                    "Unexpected semicolon(;)", None, self)
+    def __close_frame(self, char: str, expect_semicolon: bool):
+        frame = self.frames[-1]
+        if char != PAREN_PAIR[frame.paren]:
+            raise IrregularParenError
+        self.frames.pop()
+        self.stream.ends[frame.token_index] = self.index + 1
+        self.stream.skips[frame.token_index] = len(self.stream)
+        if self.frames:
+            return
+        self.keywords.append(StreamToken(self.stream, frame.token_index))
+        if frame.paren == Paren.L_CURLY and expect_semicolon:
+            self.append_keywords()
 
-            if char == Re.NEW_LINE:
-                self.__parse_newline(char)
-                continue
+    def __parse_nested_char(self, char: str, expect_semicolon: bool):
+        """
+        Parse a character inside brackets, semicolons become semicolon tokens
+        and anything the bracket content can't be tokenized the same way as on its own raises IrregularParenError
+        """
+        self.col += 1
+        if char == Re.NEW_LINE:
+            if self.state == TokenType.STRING:
+                raise IrregularParenError
+            self.__parse_newline(char)
+            return
 
-            if char == Re.SLASH and self.is_slash and self.state != TokenType.PAREN:
-                self.token_str = self.token_str[:-1]
-                if self.token_str:
-                    self.append_token()
-                self.state = TokenType.COMMENT
-                continue
+        if char == Re.SLASH and self.is_slash:
+            if self.state == TokenType.STRING or self.stream.source[self.index - 1] != Re.SLASH:
+                raise IrregularParenError
+            self.token_str = self.token_str[:-1]
+            if self.token_str:
+                self.append_token()
+            self.state = TokenType.COMMENT
+            return
 
-            if self.state == TokenType.KEYWORD:
+        if self.state == TokenType.KEYWORD:
+            if char in R_PARENS:
+                self.append_token()
+            elif self.__parse_keyword(char, expect_semicolon=True):
+                self.is_slash = (char == Re.SLASH)
+                return
 
-                if self.__parse_keyword(char, expect_semicolon):
-                    self.is_slash = (char == Re.SLASH)
-                    continue
+        if self.state is None:
+            if char == Re.SEMICOLON:
+                self.stream.append(TokenType.SEMICOLON, self.line,
+                                   self.col, self.index, self.index + 1)
+            elif char in R_PARENS:
+                self.__close_frame(char, expect_semicolon)
+            elif self.__parse_none(char):
+                return
 
-            if self.state is None:
-                if self.__parse_none(char):
-                    continue
+        elif self.state == TokenType.STRING:
+            self.__parse_string(char)
 
-            elif self.state == TokenType.STRING:
-                self.__parse_string(char)
+        self.is_slash = (char == Re.SLASH)
 
-            elif self.state == TokenType.PAREN:
-                if self.__parse_paren(char, expect_semicolon):
-                    continue
+    def __skip_frames(self) -> None:
+        """
+        Give up tokenizing content of the outermost bracket and collect it as a string instead
+        """
+        frame = self.frames[0]
+        self.frames = []
+        self.stream.truncate(frame.token_index)
+        self.line = frame.pos.line
+        self.col = frame.pos.col
+        self.index = frame.index
+        self.state = TokenType.PAREN
+        self.token_str = frame.paren
+        self.token_pos = frame.pos
+        self.token_start = frame.index
+        self.paren = frame.paren
+        self.r_paren = PAREN_PAIR[frame.paren]
+        self.paren_count = 0
+        self.is_string = False
+        self.is_comment = False
+        self.is_escaped = False
+        self.is_slash = False
 
-            elif self.state == TokenType.COMMENT:
-                pass
+    def __parse_char(self, char: str, expect_semicolon: bool):
+        if self.frames:
+            self.__parse_nested_char(char, expect_semicolon)
+            return
+        self.col += 1
+        if char == Re.SEMICOLON and self.state is None and not expect_semicolon:
+            raise JMCSyntaxException(
+                "Unexpected semicolon(;)", None, self)
 
-            self.is_slash = (char == Re.SLASH)
+        if char == Re.NEW_LINE:
+            self.__parse_newline(char)
+            return
+
+        if char == Re.SLASH and self.is_slash and self.state != TokenType.PAREN:
+            self.token_str = self.token_str[:-1]
+            if self.token_str:
+                self.append_token()
+            self.state = TokenType.COMMENT
+            return
+
+        if self.state == TokenType.KEYWORD:
+
+            if self.__parse_keyword(char, expect_semicolon):
+                self.is_slash = (char == Re.SLASH)
+                return
+
+        if self.state is None:
+            if self.__parse_none(char):
+                return
+
+        elif self.state == TokenType.STRING:
+            self.__parse_string(char)
+
+        elif self.state == TokenType.PAREN:
+            if self.__parse_paren(char, expect_semicolon):
+                return
+
+        elif self.state == TokenType.COMMENT:
+            pass
+
+        self.is_slash = (char == Re.SLASH)
+
+    def __get_run_pattern(self) -> re.Pattern[str] | None:
+        """
+        Get the pattern matching characters that the current state consumes without any side effect
+
+        :return: Compiled pattern, None if the next character has to be parsed on its own
+        """
+        if self.state is None:
+            if self.frames:
+                return Scan.NESTED_NONE
+            return Scan.NONE
+        if self.state == TokenType.KEYWORD:
+            if self.frames:
+                return Scan.NESTED_KEYWORD
+            return Scan.KEYWORD
+        if self.state == TokenType.STRING:
+            if self.is_escaped or self.quote is None:
+                return None
+            return Scan.STRING[self.quote]
+        if self.state == TokenType.PAREN:
+            if self.is_string:
+                if self.is_escaped or self.quote is None:
+                    return None
+                return Scan.PAREN_STRING[self.quote]
+            if self.is_comment:
+                return Scan.COMMENT
+            if self.paren is None:
+                return None
+            return Scan.PAREN[self.paren]
+        return Scan.COMMENT
+
+    def __parse_chars(self, string: str, expect_semicolon: bool):
+        # The whole file shares its LineIndex with the tokens found in it
+        self.stream = TokenStream(
+            string, self.line_index if string is self.file_string else None)
+        self.index = 0
+        while True:
+            try:
+                if self.is_fast_scan:
+                    self.__scan(expect_semicolon)
+                else:
+                    self.__scan_each_char(expect_semicolon)
+                return
+            except IrregularParenError:
+                self.__skip_frames()
+                self.index += 1
+
+    def __scan_each_char(self, expect_semicolon: bool):
+        string = self.stream.source
+        length = len(string)
+        while self.index < length:
+            self.__parse_char(string[self.index], expect_semicolon)
+            self.index += 1
+
+    def __scan(self, expect_semicolon: bool):
+        string = self.stream.source
+        length = len(string)
+        while self.index < length:
+            pattern = self.__get_run_pattern()
+            if pattern is not None:
+                match = pattern.match(string, self.index)
+                if match is not None and match.end() != self.index:
+                    end = match.end()
+                    if self.state is None:
+                        keyword = match.group(1)
+                        if keyword is not None:
+                            self.state = TokenType.KEYWORD
+                            self.token_pos = Pos(
+                                self.line, self.col + match.start(1) - self.index + 1)
+                            self.token_start = match.start(1)
+                            self.token_str = keyword
+                            self.is_slash = False
+                    else:
+                        if self.state != TokenType.COMMENT:
+                            self.token_str += string[self.index:end]
+                        self.is_slash = (string[end - 1] == Re.SLASH)
+                    self.col += end - self.index
+                    self.index = end
+                    if end == length:
+                        break
+            self.__parse_char(string[self.index], expect_semicolon)
+            self.index += 1
 
     def parse(self, string: str, line: int, col: int, expect_semicolon: bool,
               allow_last_missing_semicolon: bool = False) -> list[list[Token]]:
@@ -476,9 +1006,15 @@ class Tokenizer:
         self.is_comment = False  # For paranthesis
         # Comment
         self.is_slash = False
+        # Nested brackets
+        self.frames = []
 
         self.__parse_chars(string, expect_semicolon)
 
+        if self.frames:
+            raise JMCSyntaxException(
+                "Bracket was never closed", Token(TokenType.KEYWORD, self.frames[0].pos.line, self.frames[0].pos.col, self.frames[0].paren), self, suggestion="This can be the result of unclosed string as well")
+
         # if self.state == TokenType.COMMENT:
         #     self.state = None
 
@@ -507,6 +1043,92 @@ class Tokenizer:
 
         return self.list_of_keywords
 
+    def __group_children(self, children: list[Token], expect_semicolon: bool,
+                         allow_last_missing_semicolon: bool) -> list[list[Token]] | None:
+        """
+        Group children of a paren token into lines the same way `parse` would
+
+        :param children: Children of a paren token
+        :param expect_semicolon: Whether to expect a semicolon at the end
+        :param allow_last_missing_semicolon: Whether to allow last missing last semicolon
+        :raises JMCSyntaxWarning: Unnecessary semicolon
+        :raises JMCSyntaxException: Semicolon missing
+        :return: List of keywords(list of tokens), None if the content has to be parsed from its string
+        """
+        if not expect_semicolon:
+            if any(token.token_type == TokenType.SEMICOLON for token in children):
+                return None
+            return [list(children)] if children else []
+
+        programs: list[list[Token]] = []
+        keywords: list[Token] = []
+        for token in children:
+            if token.token_type == TokenType.SEMICOLON:
+                if not keywords:
+                    raise JMCSyntaxWarning(
+                        "Unnecessary semicolon(;)", token, self)
+                programs.append(keywords)
+                keywords = []
+                continue
+            keywords.append(token)
+            if token.token_type == TokenType.PAREN_CURLY:
+                programs.append(keywords)
+                keywords = []
+        if keywords:
+            if not allow_last_missing_semicolon:
+                raise JMCSyntaxException(
+                    "Expected semicolon(;)", keywords[-1], self, col_length=True)
+            programs.append(keywords)
+        return programs
+
+    def parse_paren(self, token: Token, expect_semicolon: bool,
+                    allow_last_missing_semicolon: bool = False) -> list[list[Token]]:
+        """
+        Parse content inside a paren token, using its children when it was already tokenized
+
+        :param token: Paren token or arrow function token
+        :param expect_semicolon: Whether to expect a semicolon at the end
+        :param allow_last_missing_semicolon: Whether to allow last missing last semicolon, defaults to False
+        :return: List of keywords(list of tokens)
+        """
+        if token.children is not None:
+            programs = self.__group_children(
+                token.children, expect_semicolon, allow_last_missing_semicolon)
+            if programs is not None:
+                return programs
+        return self.parse(token.string[1:-1], line=token.line, col=self.__get_content_col(token),
+                          expect_semicolon=expect_semicolon, allow_last_missing_semicolon=allow_last_missing_semicolon)
+
+    def tokenize_paren(self, token: Token, expect_semicolon: bool = True,
+                       allow_semicolon: bool = False) -> "Tokenizer":
+        """
+        Create a tokenizer for content inside a paren token, using its children when it was already tokenized
+
+        :param token: Paren token or arrow function token
+        :param expect_semicolon: Whether to expect semicolon at the end, defaults to True
+        :param allow_semicolon: Whether to allow semicolon at the 2nd char(For minecraft array `[I;int, ...]`), defaults to False
+        :return: New tokenizer
+        """
+        programs = None
+        if token.children is not None:
+            programs = self.__group_children(
+                token.children, expect_semicolon, allow_last_missing_semicolon=False)
+        return Tokenizer(token.string[1:-1], self.file_path, token.line, self.__get_content_col(token),
+                         self.file_string, expect_semicolon=expect_semicolon, allow_semicolon=allow_semicolon, programs=programs,
+                         line_index=self.line_index)
+
+    @staticmethod
+    def __get_content_col(token: Token) -> int:
+        """
+        Get the column of the first character inside the parentheses of a token
+
+        :param token: Paren token or arrow function token (which is already positioned after the left bracket)
+        :return: Column
+        """
+        if token.token_type == TokenType.FUNC:
+            return token.col
+        return token.col + 1
+
     def split_keyword_token(self, token: Token, split_str: str) -> list[Token]:
         """
         Split a keyword token into multiple tokens
@@ -530,7 +1152,7 @@ class Tokenizer:
         col = token.col
         for string in strings:
             tokens.append(Token(
-                TokenType.KEYWORD, token.line, col, string))
+                TokenType.KEYWORD, token.line, col, string if self.expand_macros is None else self.expand_macros(string)))
             col += len(string)
         return tokens
 
@@ -676,7 +1298,8 @@ class Tokenizer:
                 if state == max_state:
                     state = 0
                     result.append(
-                        Token(TokenType.KEYWORD, token_array[0].line, token_array[0].col, string))
+                        Token(TokenType.KEYWORD, token_array[0].line, token_array[0].col,
+                              string if self.expand_macros is None else self.expand_macros(string)))
                     token_array = []
             else:
                 state = 0
@@ -698,8 +1321,7 @@ class Tokenizer:
         if token.token_type != TokenType.PAREN_ROUND:
             raise JMCSyntaxException(
                 "Expected (", token, self, display_col_length=False)
-        _keywords = self.parse(
-            token.string[1:-1], line=token.line, col=token.col + 1, expect_semicolon=False)
+        _keywords = self.parse_paren(token, expect_semicolon=False)
         if not _keywords:
             return ([], {})
         keywords = _keywords[0]
@@ -726,7 +1348,7 @@ class Tokenizer:
                     "Positional argument follows keyword argument", token, self, display_col_length=False, suggestion='Try rearranging arguments')
 
             args.append(Token(string=arg, line=token.line,
-                              col=token.col, token_type=token.token_type))
+                              col=token.col, token_type=token.token_type, children=token.children))
             arg = ""
 
         def add_kwarg(token: Token) -> None:
@@ -748,7 +1370,7 @@ class Tokenizer:
                     f"Duplicated key({key})", token, self, display_col_length=False)
 
             kwargs[key] = Token(string=arg, line=token.line,
-                                col=token.col, token_type=token.token_type)
+                                col=token.col, token_type=token.token_type, children=token.children)
             key = ""
             arg = ""
 
@@ -783,7 +1405,7 @@ class Tokenizer:
                 if arrow_func_state == 2:
                     if token_.token_type == TokenType.PAREN_CURLY:
                         new_token = Token(
-                            string=token_.string, line=token_.line, col=token_.col + 1, token_type=TokenType.FUNC)
+                            string=token_.string, line=token_.line, col=token_.col + 1, token_type=TokenType.FUNC, children=token_.children)
                         arg = new_token.string
                         if key:
                             add_kwarg(new_token)
@@ -860,9 +1482,7 @@ class Tokenizer:
         if token.string == '[]':
             return []
 
-        keywords = self.parse(token.string[1:-
-                                           1], line=token.line, col=token.col +
-                              1, expect_semicolon=False)[0]
+        keywords = self.parse_paren(token, expect_semicolon=False)[0]
         is_expect_comma = False  # Whether to expect comma token
         tokens: list[Token] = []
 
@@ -892,8 +1512,7 @@ class Tokenizer:
         if token.token_type != TokenType.PAREN_CURLY:
             raise JMCSyntaxException(
                 "Expected JavaScript Object", token, self, suggestion="Expected {")
-        keywords = self.parse(
-            token.string[1:-1], line=token.line, col=token.col + 1, expect_semicolon=False)[0]
+        keywords = self.parse_paren(token, expect_semicolon=False)[0]
         keywords = self.split_keyword_tokens(keywords, [':'])
         kwargs: dict[str, Token] = {}
         key: str = ""
@@ -923,7 +1542,7 @@ class Tokenizer:
                     f"Duplicated key({key})", token, self, display_col_length=False)
 
             kwargs[key] = Token(string=arg, line=token.line,
-                                col=token.col, token_type=token.token_type)
+                                col=token.col, token_type=token.token_type, children=token.children)
             key = ""
             arg = ""
 
@@ -949,7 +1568,7 @@ class Tokenizer:
                 if arrow_func_state == 2:
                     if token_.token_type == TokenType.PAREN_CURLY:
                         new_token = Token(
-                            string=token_.string[1:-1], line=token_.line, col=token_.col + 1, token_type=TokenType.FUNC)
+                            string=token_.string, line=token_.line, col=token_.col + 1, token_type=TokenType.FUNC, children=token_.children)
                         arg = new_token.string
                         if key:
                             add_kwarg(new_token)
@@ -173,15 +173,15 @@ class Configuration:
         # Output
         while True:
             output_str = get_input(
-                "Output directory(Leave blank for default[current directory]): "
+                "Output directory or .zip file(Leave blank for default[current directory]): "
             )
             if output_str == "":
                 output = self.global_data.cwd.resolve()
                 break
             try:
                 output = Path(output_str).resolve()
-                if output.is_file():
-                    pprint("Path is not a directory.", Colors.FAIL)
+                if output.is_file() and output.suffix.lower() != ".zip":
+                    pprint("Path is not a directory or a .zip file.", Colors.FAIL)
                     continue
             except BaseException:
                 pprint("Invalid path", Colors.FAIL)
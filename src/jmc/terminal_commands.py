@@ -42,14 +42,14 @@ def exit_() -> None:
     sys.exit(0)
 
 
-@add_command("compile [debug]", "compile")
-def compile_(debug: str = "") -> None:
-    """Compile main JMC file"""
-    if debug:
-        if debug != 'debug':
-            raise TypeError(f"Unrecognized argument '{debug}'")
-        pprint("DEBUG MODE", Colors.INFO)
-    debug_compile = bool(debug)
+@add_command("compile [debug|stream]", "compile")
+def compile_(mode: str = "") -> None:
+    """Compile main JMC file (Skipped if nothing changed since the last build, unless in debug mode, stream mode writes functions while parsing to lower memory usage)"""
+    if mode:
+        if mode not in {'debug', 'stream'}:
+            raise TypeError(f"Unrecognized argument '{mode}'")
+        pprint(f"{mode.upper()} MODE", Colors.INFO)
+    debug_compile = mode == 'debug'
 
     pprint("Compiling...", Colors.INFO)
     if not global_data.config:
@@ -57,7 +57,8 @@ def compile_(debug: str = "") -> None:
         return
     try:
         start_time = perf_counter()
-        compile_jmc(global_data.config, debug=True)
+        compile_jmc(global_data.config, debug=True,
+                    is_force_build=debug_compile, is_streaming=mode == 'stream')
         stop_time = perf_counter()
         pprint(
             f"Compiled successfully in {stop_time-start_time} seconds", Colors.INFO)
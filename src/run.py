@@ -1,4 +1,6 @@
+from multiprocessing import freeze_support
 from jmc.__main__ import main
 
 if __name__ == "__main__":
+    freeze_support()
     main()
@@ -0,0 +1,171 @@
+"""
+Micro benchmarks for the compiler
+
+Run from the repository root: `python src/tests/benchmark.py [name ...]`
+"""
+import sys  # noqa
+sys.path.append('./src')  # noqa
+import re
+import timeit
+from typing import Callable
+
+from jmc.compile import tokenizer
+from jmc.compile.test_compile import JMCPack
+
+
+FUNCTION_TEMPLATE = '''
+// Function number {index}
+function test{index}() {{
+    $counter{index} = {index};
+    if ($counter{index} > 10 && !entity @s[tag=test, scores={{a=1..}}]) {{
+        tellraw @a {{"text": "counter {index} is high", "color": "red"}}
+        execute as @a[tag=player{index}] at @s run particle minecraft:flame ~ ~1 ~ 0.1 0.1 0.1 0 10;
+    }} else {{
+        data merge entity @s {{Tags: ["a", "b"], Motion: [0.0d, 1.0d, 0.0d], UUID: [I; 1, 2, 3, 4]}}
+    }}
+    say 'Done with {index}';
+}}
+'''
+
+
+def generate_source(function_count: int = 500) -> str:
+    """
+    Generate a large JMC source
+
+    :param function_count: Amount of functions in the source, defaults to 500
+    :return: JMC source
+    """
+    return ''.join(FUNCTION_TEMPLATE.format(index=index)
+                   for index in range(function_count))
+
+
+class CharTokenizer(tokenizer.Tokenizer):
+    is_fast_scan = False
+
+
+def bench_tokenizer() -> list[tuple[str, float]]:
+    source = generate_source()
+    return [
+        (name, min(timeit.repeat(
+            lambda: tokenizer_type(source, ''), number=1, repeat=5)) * 1000)
+        for name, tokenizer_type in (
+            ("char-by-char", CharTokenizer),
+            ("fast scan", tokenizer.Tokenizer)
+        )
+    ]
+
+
+def generate_nested_source(depth: int, function_count: int = 50) -> str:
+    """
+    Generate a JMC source with deeply nested if statements
+
+    :param depth: Nesting depth of each function
+    :param function_count: Amount of functions in the source, defaults to 50
+    :return: JMC source
+    """
+    body = 'say "innermost";'
+    for level in range(depth):
+        body = f'if ($level{level} == {level}) {{\n$x{level} += 1;\n{body}\n}}'
+    return ''.join(f'function nested{index}() {{\n{body}\n}}\n'
+                   for index in range(function_count))
+
+
+def bench_compile() -> list[tuple[str, float]]:
+    results = []
+    for label, source in (("flat", generate_source(100)),
+                          ("nested depth 20", generate_nested_source(20))):
+        results.append((label, min(timeit.repeat(
+            lambda: JMCPack().set_jmc_file(source).build(), number=1, repeat=3)) * 1000))
+    return results
+
+
+SWITCH_CASE_COUNT = 16
+SWITCH_HOT_WEIGHT = 50
+"""Weight of the last case of the switch benchmark (every other case has weight 1)"""
+SWITCH_LINE_PATTERN = re.compile(
+    r"(?:execute if score \S+ \S+ matches (-?\d+)(?:\.\.(-?\d+))? run )?(?:function ([^\s$]+)(?: with .*)?)?.*")
+"""Pattern of a line of switch-case output (range of the check and the function called)"""
+
+
+def build_switch(strategy: str) -> dict[str, str]:
+    """
+    Build a switch-case with a strategy
+
+    :param strategy: Name of the strategy (`#switch`)
+    :return: Built files
+    """
+    cases = ''.join(f'case {case}: say "{case}";'
+                    for case in range(1, SWITCH_CASE_COUNT))
+    cases += f'case {SWITCH_CASE_COUNT} (weight={SWITCH_HOT_WEIGHT}): say "hot";'
+    return JMCPack().set_pack_format("18").set_jmc_file(
+        f"function lookup() {{ switch($x) {{ {cases} }} }}").set_header_file(f"#switch {strategy}").build().built
+
+
+def count_executed(built: dict[str, str], function: str, value: int) -> int:
+    """
+    Count commands run by a function of switch-case output when the switched score is a value
+
+    :param built: Built files
+    :param function: Resource location of the function
+    :param value: Value of the score
+    :return: Amount of commands run
+    """
+    namespace, path = function.split(':')
+    executed = 0
+    for line in built.get(f"VIRTUAL/data/{namespace}/functions/{path}.mcfunction", '').split('\n'):
+        if line.startswith('$'):
+            line = line[1:].replace('$(case)', str(value))
+        executed += 1
+        match = SWITCH_LINE_PATTERN.fullmatch(line)
+        assert match is not None
+        min_, max_, callee = match.groups()
+        if min_ is not None and not int(min_) <= value <= int(max_ or min_):
+            continue
+        if callee is not None:
+            executed += count_executed(built, callee, value)
+    return executed
+
+
+def bench_switch_size() -> list[tuple[str, float]]:
+    return [(strategy, sum(content.count('\n') + 1 for path, content in build_switch(strategy).items()
+                           if path.endswith('.mcfunction') and '__load__' not in path))
+            for strategy in ("binary", "linear", "weighted", "macro")]
+
+
+def bench_switch_steps() -> list[tuple[str, float]]:
+    weights = {case: SWITCH_HOT_WEIGHT if case == SWITCH_CASE_COUNT else 1
+               for case in range(1, SWITCH_CASE_COUNT + 1)}
+    results = []
+    for strategy in ("binary", "linear", "weighted", "macro"):
+        built = build_switch(strategy)
+        results.append((strategy, sum(
+            count_executed(built, "TEST:lookup", case) * weight for case, weight in weights.items()) / sum(weights.values())))
+    return results
+
+
+BENCHMARKS: dict[str, Callable[[], list[tuple[str, float]]]] = {
+    "tokenizer": bench_tokenizer,
+    "compile": bench_compile,
+    "switch_size": bench_switch_size,
+    "switch_steps": bench_switch_steps,
+}
+"""Dictionary of benchmark name and function returning list of (label, result), lower result is better"""
+UNITS = {
+    "switch_size": "commands emitted",
+    "switch_steps": "commands run per lookup (weighted)",
+}
+"""Dictionary of benchmark name and unit of its results, defaults to milliseconds"""
+
+
+def main(names: list[str]) -> None:
+    for name in names or BENCHMARKS:
+        results = BENCHMARKS[name]()
+        baseline = results[0][1]
+        print(f"{name}:")
+        for label, result in results:
+            print(
+                f"    {label:<20}{result:>10.2f} {UNITS.get(name, 'ms')}{baseline / result:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
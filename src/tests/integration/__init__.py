@@ -4,7 +4,8 @@ from . import (test_flow_controls,
                test_jmc_function,
                test_new,
                test_variable,
-               test_header
+               test_header,
+               test_incremental
                )
 
 ALL: tuple[__ModuleType, ...] = (test_flow_controls,
@@ -12,5 +13,6 @@ ALL: tuple[__ModuleType, ...] = (test_flow_controls,
                                  test_jmc_function,
                                  test_new,
                                  test_variable,
-                                 test_header
+                                 test_header,
+                                 test_incremental
                                  )
@@ -4,6 +4,7 @@ sys.path.append('./src')  # noqa
 import unittest
 from tests.utils import string_to_tree_dict
 from jmc.compile.test_compile import JMCPack
+from jmc.compile.exception import JMCSyntaxException
 
 
 class TestIfElse(unittest.TestCase):
@@ -63,6 +64,43 @@ say FALSE
             """)
         )
 
+    def test_if_else_return(self):
+        pack = JMCPack().set_pack_format("26").set_jmc_file("""
+if (entity condition) {
+    say "CONDITION1";
+} else if (entity condition2) {
+    say "CONDITION2";
+    say "CONDITION2";
+} else if (entity condition3) {
+} else {
+    say "ELSE";
+}
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+function TEST:__private__/if_else/0
+> VIRTUAL/data/TEST/functions/__private__/if_else/0.mcfunction
+execute if entity condition run return run say CONDITION1
+execute if entity condition2 run return run function TEST:__private__/if_else/1
+execute if entity condition3 run return 0
+say ELSE
+> VIRTUAL/data/TEST/functions/__private__/if_else/1.mcfunction
+say CONDITION2
+say CONDITION2
+            """)
+        )
+
     def test_if_elif(self):
         pack = JMCPack().set_jmc_file("""
 if (entity condition) {
@@ -204,6 +242,70 @@ execute if score __logic__0 __variable__ matches 1 run say Hello World
             """)
         )
 
+    def test_logic_gate_function(self):
+        pack = JMCPack().set_pack_format("26").set_jmc_file("""
+if (!entity @s[type=skeleton] || (entity @s[type=zombie] && $deathCount>5)) {
+    say "Hello World";
+}
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+execute if function TEST:__private__/logic/0 run say Hello World
+> VIRTUAL/data/TEST/functions/__private__/logic/0.mcfunction
+execute unless entity @s[type=skeleton] run return 1
+execute if entity @s[type=zombie] if score $deathCount __variable__ matches 6.. run return 1
+            """)
+        )
+
+    def test_logic_temporary_reuse(self):
+        pack = JMCPack().set_jmc_file("""
+if (String.isEqual(storage, path, "a") || $x == 1) { say "1"; }
+if (String.isEqual(storage, path, "b")) { say "2"; }
+if (($a == 1 || $b == 2) || $c == 3) { say "3"; }
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+scoreboard players set __logic__0 __variable__ 0
+data modify storage TEST:__storage__ currentObject set from storage TEST:storage path
+execute store success score __bool_result__0 __variable__ run data modify storage TEST:__storage__ currentObject set value a
+execute if score __bool_result__0 __variable__ matches 0 run scoreboard players set __logic__0 __variable__ 1
+execute unless score __logic__0 __variable__ matches 1 if score $x __variable__ matches 1 run scoreboard players set __logic__0 __variable__ 1
+execute if score __logic__0 __variable__ matches 1 run say 1
+data modify storage TEST:__storage__ currentObject set from storage TEST:storage path
+execute store success score __bool_result__0 __variable__ run data modify storage TEST:__storage__ currentObject set value b
+execute if score __bool_result__0 __variable__ matches 0 run say 2
+scoreboard players set __logic__1 __variable__ 0
+execute if score $a __variable__ matches 1 run scoreboard players set __logic__1 __variable__ 1
+execute unless score __logic__1 __variable__ matches 1 if score $b __variable__ matches 2 run scoreboard players set __logic__1 __variable__ 1
+scoreboard players set __logic__0 __variable__ 0
+execute if score __logic__1 __variable__ matches 1 run scoreboard players set __logic__0 __variable__ 1
+execute unless score __logic__0 __variable__ matches 1 if score $c __variable__ matches 3 run scoreboard players set __logic__0 __variable__ 1
+execute if score __logic__0 __variable__ matches 1 run say 3
+            """)
+        )
+
 
 class TestFor(unittest.TestCase):
     def test_for(self):
@@ -234,6 +336,75 @@ execute if score $i __variable__ matches ..9 run function TEST:__private__/for_l
             """)
         )
 
+    def test_for_unroll(self):
+        pack = JMCPack().set_jmc_file("""
+for ($i=0;$i<3;$i++) {
+    tellraw @a $i.toString();
+}
+for ($j=10;$j>0;$j-=2) {
+    say "a";
+    say "b";
+    say "c";
+}
+for ($k=0;$k<3;$k++) {
+    $k += 1;
+}
+        """).set_header_file("""
+#optimize unroll
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+scoreboard players set $i __variable__ 0
+tellraw @a {"score": {"name": "$i", "objective": "__variable__"}}
+scoreboard players add $i __variable__ 1
+tellraw @a {"score": {"name": "$i", "objective": "__variable__"}}
+scoreboard players add $i __variable__ 1
+tellraw @a {"score": {"name": "$i", "objective": "__variable__"}}
+scoreboard players add $i __variable__ 1
+scoreboard players set $j __variable__ 10
+say a
+say b
+say c
+scoreboard players remove $j __variable__ 2
+execute if score $j __variable__ matches 1.. run function TEST:__private__/for_loop/1
+scoreboard players set $k __variable__ 0
+execute if score $k __variable__ matches ..2 run function TEST:__private__/for_loop/2
+> VIRTUAL/data/TEST/functions/__private__/for_loop/1.mcfunction
+say a
+say b
+say c
+scoreboard players remove $j __variable__ 2
+say a
+say b
+say c
+scoreboard players remove $j __variable__ 2
+say a
+say b
+say c
+scoreboard players remove $j __variable__ 2
+say a
+say b
+say c
+scoreboard players remove $j __variable__ 2
+execute if score $j __variable__ matches 1.. run function TEST:__private__/for_loop/1
+> VIRTUAL/data/TEST/functions/__private__/for_loop/2.mcfunction
+scoreboard players add $k __variable__ 1
+scoreboard players add $k __variable__ 1
+execute if score $k __variable__ matches ..2 run function TEST:__private__/for_loop/2
+            """)
+        )
+
 
 class TestSwitchCase(unittest.TestCase):
     def test_switch_case(self):
@@ -302,6 +473,164 @@ tellraw @s "You are a god?"
             """)
         )
 
+    def test_switch_case_sparse(self):
+        pack = JMCPack().set_jmc_file("""
+switch($x) {
+    case 5:
+        say "five";
+    case -1:
+        say "minus one";
+    case 2:
+        say "two";
+        say "again";
+}
+switch($y) {
+    case 1: say "only";
+}
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+function TEST:__private__/switch_case/0
+execute if score $y __variable__ matches 1 run function TEST:__private__/switch_case/5
+> VIRTUAL/data/TEST/functions/__private__/switch_case/0.mcfunction
+execute if score $x __variable__ matches -1 run function TEST:__private__/switch_case/1
+execute if score $x __variable__ matches 2..5 run function TEST:__private__/switch_case/2
+> VIRTUAL/data/TEST/functions/__private__/switch_case/1.mcfunction
+say minus one
+> VIRTUAL/data/TEST/functions/__private__/switch_case/2.mcfunction
+execute if score $x __variable__ matches 2 run function TEST:__private__/switch_case/3
+execute if score $x __variable__ matches 5 run function TEST:__private__/switch_case/4
+> VIRTUAL/data/TEST/functions/__private__/switch_case/3.mcfunction
+say two
+say again
+> VIRTUAL/data/TEST/functions/__private__/switch_case/4.mcfunction
+say five
+> VIRTUAL/data/TEST/functions/__private__/switch_case/5.mcfunction
+say only
+            """)
+        )
+
+    def test_switch_case_duplicated(self):
+        with self.assertRaises(JMCSyntaxException):
+            JMCPack().set_jmc_file("""
+switch($x) {
+    case 1: say "a";
+    case 1: say "b";
+}
+            """).build()
+
+    def test_switch_case_linear(self):
+        pack = JMCPack().set_jmc_file("""
+switch($x) {
+    case 1: say "one";
+    case 2: say "two"; say "again";
+    case 3: say "three";
+}
+        """).set_header_file("""
+#switch linear
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+function TEST:__private__/switch_case/0
+> VIRTUAL/data/TEST/functions/__private__/switch_case/0.mcfunction
+execute if score $x __variable__ matches 1 run say one
+execute if score $x __variable__ matches 2 run function TEST:__private__/switch_case/1
+execute if score $x __variable__ matches 3 run say three
+> VIRTUAL/data/TEST/functions/__private__/switch_case/1.mcfunction
+say two
+say again
+            """)
+        )
+
+    def test_switch_case_weighted(self):
+        pack = JMCPack().set_jmc_file("""
+switch($x) {
+    case 1: say "1";
+    case 2: say "2";
+    case 3: say "3";
+    case 4 (weight=10): say "4";
+}
+        """).set_header_file("""
+#switch weighted
+        """).build()
+
+        self.assertEqual(
+            pack.built["VIRTUAL/data/TEST/functions/__private__/switch_case/0.mcfunction"],
+            """execute if score $x __variable__ matches 1..3 run function TEST:__private__/switch_case/1
+execute if score $x __variable__ matches 4 run function TEST:__private__/switch_case/2"""
+        )
+        self.assertEqual(
+            pack.built["VIRTUAL/data/TEST/functions/__private__/switch_case/2.mcfunction"],
+            "say 4"
+        )
+
+    def test_switch_case_macro(self):
+        jmc_file = """
+switch($x) {
+    case 1: say "1";
+    case 2: say "2";
+    case 4: say "4";
+}
+        """
+        header_file = """
+#switch macro
+#optimize
+        """
+        pack = JMCPack().set_pack_format("18").set_jmc_file(
+            jmc_file).set_header_file(header_file).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+execute store result storage TEST:__storage__ switch.case int 1 run scoreboard players get $x __variable__
+execute if score $x __variable__ matches 1..4 run function TEST:__private__/switch_case/0/jump with storage TEST:__storage__ switch
+> VIRTUAL/data/TEST/functions/__private__/switch_case/0/1.mcfunction
+say 1
+> VIRTUAL/data/TEST/functions/__private__/switch_case/0/2.mcfunction
+say 2
+> VIRTUAL/data/TEST/functions/__private__/switch_case/0/4.mcfunction
+say 4
+> VIRTUAL/data/TEST/functions/__private__/switch_case/0/jump.mcfunction
+$function TEST:__private__/switch_case/0/$(case)
+            """)
+        )
+
+        # Function macros don't exist before pack_format 18
+        pack = JMCPack().set_jmc_file(jmc_file).set_header_file(header_file).build()
+        self.assertNotIn(
+            "VIRTUAL/data/TEST/functions/__private__/switch_case/0/jump.mcfunction", pack.built)
+
 
 if __name__ == '__main__':
     unittest.main()
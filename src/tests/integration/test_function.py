@@ -2,8 +2,13 @@ import sys  # noqa
 sys.path.append('./src')  # noqa
 
 import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
 from tests.utils import string_to_tree_dict
 from jmc.compile.test_compile import JMCPack
+from jmc.compile.lexer import Lexer
 
 from jmc.compile.exception import JMCFileNotFoundError, JMCSyntaxException
 
@@ -148,6 +153,22 @@ new advancements(foo) {}
 
 
 class TestFeatures(unittest.TestCase):
+    def test_iter_build(self):
+        pack = JMCPack().set_jmc_file("""
+function a() {
+    if ($x == 1) {say "a"; say "b";}
+}
+new advancements(foo) {"criteria": {}}
+function __tick__() {say "tick";}
+        """)
+        iterator = pack.iter_build()
+        path, content = next(iterator)
+        self.assertEqual(
+            path, "VIRTUAL/data/minecraft/tags/functions/load.json")
+        self.assertDictEqual(
+            {path: content, **dict(iterator)},
+            pack.build().built)
+
     def test_import_error(self):
         with self.assertRaises(JMCFileNotFoundError):
             JMCPack().set_jmc_file("""
@@ -166,6 +187,111 @@ class TestFeatures(unittest.TestCase):
 @import foo;
             """).build()
 
+    def test_import(self):
+        with TemporaryDirectory() as directory:
+            folder = Path(directory)
+            (folder / "a.jmc").write_text("""
+@import "b";
+function a() {say "a";}
+say "load a";
+            """)
+            (folder / "b.jmc").write_text("""
+function b() {say "b";}
+say "load b";
+            """)
+            (folder / "c.jmc").write_text("""
+function c() {say "c";}
+@import "d.jmc";
+            """)
+            (folder / "d.jmc").write_text("""
+function d() {
+            """)
+            main = f"""
+@import "{(folder / 'a').as_posix()}";
+say "main";
+@import "{(folder / 'c').as_posix()}";
+            """
+            for import_workers, import_pool_threshold in ((1, 1), (2, 1), (2, 8)):
+                with patch.object(Lexer, "import_workers", import_workers), \
+                        patch.object(Lexer, "import_pool_threshold", import_pool_threshold), \
+                        patch("jmc.compile.lexer.ProcessPoolExecutor", wraps=ProcessPoolExecutor) as executor:
+                    with self.assertRaises(JMCSyntaxException):
+                        JMCPack().set_jmc_file(main).build()
+                    pack = JMCPack().set_jmc_file(main.replace(
+                        f'@import "{(folder / "c").as_posix()}";', "")).build()
+                self.assertEqual(
+                    executor.called, import_workers > 1 and import_pool_threshold <= 1)
+                self.assertDictEqual(
+                    pack.built,
+                    string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/b.mcfunction
+say b
+> VIRTUAL/data/TEST/functions/a.mcfunction
+say a
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+say load b
+say load a
+say main
+                    """)
+                )
+
+    def test_import_graph(self):
+        with TemporaryDirectory() as directory:
+            folder = Path(directory)
+            (folder / "hub.jmc").write_text("\n".join(
+                f'@import "file{index}";' for index in range(6)))
+            for index in range(6):
+                (folder / f"file{index}.jmc").write_text(
+                    f'function file{index}() {{say "{index}";}}')
+            main = f"""
+@import "{(folder / 'hub').as_posix()}";
+            """
+            outputs = []
+            for import_workers in (1, 2):
+                with patch.object(Lexer, "import_workers", import_workers), \
+                        patch.object(Lexer, "import_pool_threshold", 3), \
+                        patch("jmc.compile.lexer.ProcessPoolExecutor", wraps=ProcessPoolExecutor) as executor:
+                    outputs.append(JMCPack().set_jmc_file(main).build().built)
+                # The main file only imports 1 file, the pool is started for the files found through it
+                self.assertEqual(executor.called, import_workers > 1)
+            self.assertDictEqual(outputs[0], outputs[1])
+            self.assertEqual(len(outputs[0]), 8)
+
+    def test_execute_redundancy(self):
+        pack = JMCPack().set_jmc_file("""
+execute as @s run $a = 1;
+execute run tp @s ~ ~1 ~;
+execute as @a run execute at @s run $b += 2;
+execute as @a run tellraw @s $a.toString();
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+execute if entity @s run scoreboard players set $a __variable__ 1
+tp @s ~ ~1 ~
+execute as @a at @s run scoreboard players add $b __variable__ 2
+execute as @a run tellraw @s {"score": {"name": "$a", "objective": "__variable__"}}
+            """)
+        )
+
     def test_comment(self):
         pack = JMCPack().set_jmc_file("""
 say "Hello World 1";
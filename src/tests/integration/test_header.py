@@ -32,6 +32,32 @@ say Hello World
             """)
         )
 
+    def test_define_segment(self):
+        pack = JMCPack().set_jmc_file("""
+$a.OBJ:VALUE = VALUE;
+$b=VALUE;
+        """).set_header_file("""
+#define VALUE 5
+#define OBJ obj
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+scoreboard players set $a.obj:5 __variable__ 5
+scoreboard players set $b __variable__ 5
+            """)
+        )
+
     def test_syntax_error(self):
         with self.assertRaises(HeaderSyntaxException):
             JMCPack().set_jmc_file("""
@@ -199,6 +225,339 @@ scoreboard objectives add __int__ dummy
             """)
         )
 
+    def test_hash_private_names(self):
+        pack = JMCPack().set_jmc_file("""
+while ($x < 5) {
+    $x += 1;
+}
+        """).set_header_file("""
+#hash_private_names
+        """).build()
+        loop_paths = [path for path in pack.built
+                      if "__private__/while_loop/" in path]
+        self.assertEqual(len(loop_paths), 1)
+        loop_name = loop_paths[0].split('/')[-1].removesuffix('.mcfunction')
+        self.assertNotEqual(loop_name, "0")
+        self.assertEqual(
+            pack.built[loop_paths[0]],
+            f"scoreboard players add $x __variable__ 1\nexecute if score $x __variable__ matches ..4 run function TEST:__private__/while_loop/{loop_name}")
+
+        pack2 = JMCPack().set_jmc_file("""
+while ($y < 5) {
+    $y += 1;
+}
+while ($x < 5) {
+    $x += 1;
+}
+        """).set_header_file("""
+#hash_private_names
+        """).build()
+        self.assertEqual(pack2.built[loop_paths[0]],
+                         pack.built[loop_paths[0]])
+        self.assertEqual(len([path for path in pack2.built
+                              if "__private__/while_loop/" in path]), 2)
+
+    def test_optimize(self):
+        pack = JMCPack().set_jmc_file("""
+$x = 1;
+$x = 2;
+$x += 3;
+$x -= 1;
+$y++;
+$y--;
+execute as @s run execute at @s run tp @s ~ ~1 ~;
+if ($x > 1) {
+    say "a";
+} else if ($x < 0) {
+    say "b";
+}
+        """).set_header_file("""
+#optimize fuse_execute merge_score_add drop_overwritten_set drop_if_else_flag inline
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+scoreboard players set $x __variable__ 2
+scoreboard players add $x __variable__ 2
+scoreboard players add $y __variable__ 0
+execute if entity @s at @s run tp @s ~ ~1 ~
+scoreboard players set __if_else__ __variable__ 0
+execute if score $x __variable__ matches 2.. run say a
+execute if score $x __variable__ matches 2.. run scoreboard players set __if_else__ __variable__ 1
+execute if score __if_else__ __variable__ matches 0 if score $x __variable__ matches ..-1 run say b
+            """)
+        )
+
+        with self.assertRaises(HeaderSyntaxException):
+            JMCPack().set_jmc_file("""
+        """).set_header_file("""
+#optimize unknown_optimization
+        """).build()
+
+    def test_switch(self):
+        with self.assertRaises(HeaderSyntaxException):
+            JMCPack().set_jmc_file("""
+        """).set_header_file("""
+#switch jump_table
+        """).build()
+        with self.assertRaises(HeaderSyntaxException):
+            JMCPack().set_jmc_file("""
+        """).set_header_file("""
+#switch
+        """).build()
+
+    def test_cache(self):
+        with self.assertRaises(HeaderSyntaxException):
+            JMCPack().set_jmc_file("""
+        """).set_header_file("""
+#cache folder
+        """).build()
+        with self.assertRaises(HeaderSyntaxException):
+            JMCPack().set_jmc_file("""
+        """).set_header_file("""
+#cache "a" "b"
+        """).build()
+
+    def test_optimize_fold_constants(self):
+        pack = JMCPack().set_jmc_file("""
+$a = 5;
+$a += 3;
+$a *= 2;
+$b = $a;
+$b %= 3;
+$c = $a;
+$c /= 5;
+if ($a > 10) { say "big"; }
+if ($a < 10) { say "small"; }
+$d = 5;
+tellraw @a $d.toString();
+$d = 6;
+$e = 1;
+myFunc();
+$e += 1;
+$x = obj:@s;
+$x += 1;
+$p = 5;
+execute if predicate test:p run say "x";
+$p += 3;
+$l = 1;
+loot spawn ~ ~ ~ fish test:l ~ ~ ~;
+$l = 2;
+$v = 1;
+advancement grant @a only test:adv;
+$v += 1;
+        """).set_header_file("""
+#optimize fold_constants
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+scoreboard players set $a __variable__ 16
+scoreboard players set $b __variable__ 1
+scoreboard players set $c __variable__ 3
+say big
+scoreboard players set $d __variable__ 5
+tellraw @a {"score": {"name": "$d", "objective": "__variable__"}}
+scoreboard players set $d __variable__ 6
+scoreboard players set $e __variable__ 1
+function TEST:myfunc
+scoreboard players add $e __variable__ 1
+scoreboard players operation $x __variable__ = @s obj
+scoreboard players add $x __variable__ 1
+scoreboard players set $p __variable__ 5
+execute if predicate test:p run say x
+scoreboard players set $p __variable__ 8
+scoreboard players set $l __variable__ 1
+loot spawn ~ ~ ~ fish test:l ~ ~ ~
+scoreboard players set $l __variable__ 2
+scoreboard players set $v __variable__ 1
+advancement grant @a only test:adv
+scoreboard players add $v __variable__ 1
+            """)
+        )
+
+    def test_optimize_fold_constants_return(self):
+        pack = JMCPack().set_jmc_file("""
+$a = 1;
+execute if entity @p run return 1;
+$a = 2;
+        """).set_header_file("""
+#optimize
+#command return
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+scoreboard players set $a __variable__ 1
+execute if entity @p run return 1
+scoreboard players set $a __variable__ 2
+            """)
+        )
+
+    def test_optimize_deduplicate(self):
+        pack = JMCPack().set_jmc_file("""
+if ($x > 1) { say "a"; say "b"; }
+if ($y > 1) { say "a"; say "b"; }
+while ($x < 5) { $x += 1; }
+while ($x < 5) { $x += 1; }
+if ($z > 1) { say "c"; say "d"; }
+if ($w > 1) { say "c"; say "d"; }
+schedule function TEST:__private__/if_else/3 1t;
+        """).set_header_file("""
+#optimize deduplicate
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+execute if score $x __variable__ matches 2.. run function TEST:__private__/if_else/0
+execute if score $y __variable__ matches 2.. run function TEST:__private__/if_else/0
+execute if score $x __variable__ matches ..4 run function TEST:__private__/while_loop/0
+execute if score $x __variable__ matches ..4 run function TEST:__private__/while_loop/0
+execute if score $z __variable__ matches 2.. run function TEST:__private__/if_else/2
+execute if score $w __variable__ matches 2.. run function TEST:__private__/if_else/3
+schedule function TEST:__private__/if_else/3 1t
+> VIRTUAL/data/TEST/functions/__private__/if_else/0.mcfunction
+say a
+say b
+> VIRTUAL/data/TEST/functions/__private__/if_else/2.mcfunction
+say c
+say d
+> VIRTUAL/data/TEST/functions/__private__/if_else/3.mcfunction
+say c
+say d
+> VIRTUAL/data/TEST/functions/__private__/while_loop/0.mcfunction
+scoreboard players add $x __variable__ 1
+execute if score $x __variable__ matches ..4 run function TEST:__private__/while_loop/0
+            """)
+        )
+
+    def test_optimize_tree_shake(self):
+        pack = JMCPack().set_jmc_file("""
+function used() { say "used"; if ($x > 1) { say "a"; say "b"; } }
+function unused() { say "unused"; if ($y > 1) { say "c"; say "d"; } }
+function kept.api() { say "api"; }
+function reward() { say "reward"; }
+function chain1() { chain2(); }
+function chain2() { chain1(); }
+used();
+new advancements(my_adv) {
+  "rewards": {"function": "TEST:reward"}
+}
+        """).set_header_file("""
+#optimize tree_shake
+#keep kept.api
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+function TEST:used
+> VIRTUAL/data/TEST/functions/used.mcfunction
+say used
+execute if score $x __variable__ matches 2.. run function TEST:__private__/if_else/0
+> VIRTUAL/data/TEST/functions/kept/api.mcfunction
+say api
+> VIRTUAL/data/TEST/functions/reward.mcfunction
+say reward
+> VIRTUAL/data/TEST/functions/__private__/if_else/0.mcfunction
+say a
+say b
+> VIRTUAL/data/TEST/advancements/my_adv.json
+{
+  "rewards": {
+    "function": "TEST:reward"
+  }
+}
+            """)
+        )
+
+    def test_optimize_inline(self):
+        pack = JMCPack().set_jmc_file("""
+if ($x > 1) {
+    say "a";
+} else if ($x < 0) {
+    say "b";
+}
+while ($x < 5) { $x += 1; }
+        """).set_header_file("""
+#optimize inline
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+scoreboard players set __if_else__ __variable__ 0
+execute if score $x __variable__ matches 2.. run say a
+execute if score $x __variable__ matches 2.. run scoreboard players set __if_else__ __variable__ 1
+execute if score __if_else__ __variable__ matches 0 if score $x __variable__ matches ..-1 run function TEST:__private__/if_else/2
+execute if score $x __variable__ matches ..4 run function TEST:__private__/while_loop/0
+> VIRTUAL/data/TEST/functions/__private__/if_else/2.mcfunction
+say b
+scoreboard players set __if_else__ __variable__ 1
+> VIRTUAL/data/TEST/functions/__private__/while_loop/0.mcfunction
+scoreboard players add $x __variable__ 1
+execute if score $x __variable__ matches ..4 run function TEST:__private__/while_loop/0
+            """)
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,345 @@
+import sys  # noqa
+sys.path.append('./src')  # noqa
+
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from zipfile import ZipFile
+
+from jmc.compile import compiling
+from jmc.compile.build_record import BUILD_RECORD_FILE_NAME, BuildRecord
+from jmc.compile.exception import JMCSyntaxException
+from jmc.compile.function_cache import FUNCTION_CACHE_FOLDER_NAME
+from jmc.compile.lexer import Lexer
+from jmc.compile.output_writer import OUTPUT_MANIFEST_FILE_NAME, OutputWriter
+from jmc.terminal import GlobalData
+from jmc.terminal.configuration import Configuration
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = TemporaryDirectory()
+        self.folder = Path(self.directory.name)
+        self.config = Configuration(
+            GlobalData(),
+            namespace="test",
+            description="__THIS_IS_FOR_TESTING__",
+            pack_format="10",
+            target=self.folder / "main.jmc",
+            output=self.folder / "output"
+        )
+        (self.folder / "main.jmc").write_text("""
+@import "lib";
+say "main";
+        """)
+        (self.folder / "lib.jmc").write_text("""
+function lib() {say "lib";}
+        """)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def compile(self) -> bool:
+        """Compile and return whether the files were parsed"""
+        with patch.object(compiling, "Lexer", wraps=compiling.Lexer) as lexer:
+            compiling.compile_jmc(self.config)
+        return lexer.called
+
+    def test_no_op(self):
+        self.assertTrue(self.compile())
+        self.assertTrue(
+            (self.folder / "output/data/test/functions/lib.mcfunction").is_file())
+        self.assertFalse(self.compile())
+
+    def test_changed_output(self):
+        self.compile()
+        lib = self.folder / "output/data/test/functions/lib.mcfunction"
+        lib.unlink()
+        self.assertTrue(self.compile())
+        self.assertEqual(lib.read_text(), "say lib")
+        self.assertFalse(self.compile())
+
+        lib.write_text("say edited")
+        self.assertTrue(self.compile())
+        self.assertEqual(lib.read_text(), "say lib")
+        self.assertFalse(self.compile())
+
+    def test_failed_write(self):
+        self.compile()
+        (self.folder / "lib.jmc").write_text("""
+function lib() {say "changed";}
+        """)
+        write_file = OutputWriter.write_file
+
+        def fail_lib(writer, path, key, content):
+            if path.name == "lib.mcfunction":
+                raise OSError("Write failed")
+            return write_file(writer, path, key, content)
+        with patch.object(OutputWriter, "write_file", fail_lib):
+            with self.assertRaises(OSError):
+                self.compile()
+        self.assertTrue(self.compile())
+        self.assertEqual(
+            (self.folder / "output/data/test/functions/lib.mcfunction").read_text(), "say changed")
+        self.assertFalse(self.compile())
+
+    def test_changed_file(self):
+        self.compile()
+        (self.folder / "lib.jmc").write_text("""
+function lib() {say "changed";}
+        """)
+        self.assertTrue(self.compile())
+        self.assertEqual(
+            (self.folder / "output/data/test/functions/lib.mcfunction").read_text(), "say changed")
+        self.assertFalse(self.compile())
+
+    def test_changed_header(self):
+        self.compile()
+        (self.folder / "main.hjmc").write_text("#define main something")
+        self.assertTrue(self.compile())
+        self.assertFalse(self.compile())
+
+    def test_changed_config(self):
+        self.compile()
+        self.config.description = "changed"
+        self.assertTrue(self.compile())
+
+    def test_dependents(self):
+        self.compile()
+        record = BuildRecord.load(
+            self.folder / "output/data/test" / BUILD_RECORD_FILE_NAME)
+        assert record is not None
+        lib = (self.folder / "lib.jmc").resolve().as_posix()
+        main = (self.folder / "main.jmc").resolve().as_posix()
+        self.assertEqual(record.imports[main], [lib])
+        self.assertSetEqual(record.get_dependents({lib}), {lib, main})
+        self.assertSetEqual(record.get_dependents({main}), {main})
+
+    def test_function_cache(self):
+        (self.folder / "lib.jmc").write_text("""
+function lib() {if ($a == 1) {say "a"; say "b";} else {say "c"; say "d";}}
+function lib2() {if ($a == 2) {say "a"; say "b";}}
+        """)
+        self.compile()
+        self.assertFalse((self.folder / FUNCTION_CACHE_FOLDER_NAME).exists())
+
+        (self.folder / "main.hjmc").write_text("#cache")
+        self.compile()
+        functions = self.folder / "output/data/test/functions"
+        outputs = {path: path.read_text()
+                   for path in functions.glob("**/*.mcfunction")}
+        self.assertTrue(any((self.folder / FUNCTION_CACHE_FOLDER_NAME).glob("*.json")))
+        self.assertEqual(
+            (self.folder / FUNCTION_CACHE_FOLDER_NAME / ".gitignore").read_text(), "*\n")
+
+        with patch.object(Lexer, "parse_func_content", autospec=True,
+                          side_effect=Lexer.parse_func_content) as parse_func_content:
+            compiling.compile_jmc(self.config, is_force_build=True)
+        parse_func_content.assert_not_called()
+        self.assertDictEqual(
+            {path: path.read_text()
+             for path in functions.glob("**/*.mcfunction")},
+            outputs)
+
+        (self.folder / "lib.jmc").write_text("""
+function lib() {if ($a == 1) {say "a"; say "b";} else {say "c"; say "d";}}
+function lib2() {if ($a == 3) {say "a"; say "b";}}
+        """)
+        with patch.object(Lexer, "parse_func_content", autospec=True,
+                          side_effect=Lexer.parse_func_content) as parse_func_content:
+            self.compile()
+        # Only lib2's content and its code block are parsed again
+        self.assertEqual(parse_func_content.call_count, 2)
+
+    def test_function_cache_counts(self):
+        (self.folder / "main.hjmc").write_text("#cache")
+        (self.folder / "lib.jmc").write_text("""
+function lib() {say "a";}
+function lib2() {if ($a == 2) {say "a"; say "b";}}
+        """)
+        self.compile()
+
+        (self.folder / "lib.jmc").write_text("""
+function lib() {if ($a == 1) {say "a"; say "b";}}
+function lib2() {if ($a == 2) {say "a"; say "b";}}
+        """)
+        with patch.object(Lexer, "parse_func_content", autospec=True,
+                          side_effect=Lexer.parse_func_content) as parse_func_content:
+            self.compile()
+        # lib2's private function count moved, but only lib's content and its code block are parsed again
+        self.assertEqual(parse_func_content.call_count, 2)
+        functions = self.folder / "output/data/test/functions"
+        outputs = {path: path.read_text()
+                   for path in functions.glob("**/*.mcfunction")}
+        self.assertIn(
+            "execute if score $a __variable__ matches 2 run function test:__private__/if_else/1",
+            outputs[functions / "lib2.mcfunction"])
+
+        (self.folder / "main.hjmc").unlink()
+        compiling.compile_jmc(self.config, is_force_build=True)
+        self.assertDictEqual(
+            {path: path.read_text()
+             for path in functions.glob("**/*.mcfunction")},
+            outputs)
+
+    def test_file_reuse(self):
+        (self.folder / "main.hjmc").write_text("#cache")
+        (self.folder / "main.jmc").write_text("""
+@import "lib";
+@import "other";
+say "main";
+        """)
+        (self.folder / "lib.jmc").write_text("""
+$lib = 1;
+function lib() {if ($a == 1) {say "a"; say "b";}}
+        """)
+        (self.folder / "other.jmc").write_text("""
+$other = 1;
+function other() {if ($a == 2) {say "c"; say "d";}}
+        """)
+        self.compile()
+        functions = self.folder / "output/data/test/functions"
+
+        def compile_files() -> set[str]:
+            """Compile and return names of files that were parsed"""
+            with patch.object(Lexer, "parse_file", autospec=True,
+                              side_effect=Lexer.parse_file) as parse_file:
+                self.compile()
+            return {call.args[1].name for call in parse_file.call_args_list}
+
+        (self.folder / "other.jmc").write_text("""
+$other = 2;
+function other() {if ($a == 2) {say "c"; say "d";}}
+        """)
+        self.assertSetEqual(compile_files(), {"main.jmc", "other.jmc"})
+
+        # Private function count of other.jmc moves
+        (self.folder / "lib.jmc").write_text("""
+$lib = 1;
+function lib() {if ($a == 1) {say "a"; say "b";} if ($a == 3) {say "e"; say "f";}}
+        """)
+        self.assertSetEqual(compile_files(), {"main.jmc", "lib.jmc"})
+        outputs = {path: path.read_text()
+                   for path in functions.glob("**/*.mcfunction")}
+        self.assertIn(
+            "execute if score $a __variable__ matches 2 run function test:__private__/if_else/2",
+            outputs[functions / "other.mcfunction"])
+        self.assertIn("scoreboard players set $other __variable__ 2",
+                      outputs[functions / "__load__.mcfunction"])
+
+        (self.folder / "main.hjmc").unlink()
+        compiling.compile_jmc(self.config, is_force_build=True)
+        self.assertDictEqual(
+            {path: path.read_text()
+             for path in functions.glob("**/*.mcfunction")},
+            outputs)
+
+    def test_output_writer(self):
+        self.compile()
+        functions = self.folder / "output/data/test/functions"
+        lib = functions / "lib.mcfunction"
+        load = functions / "__load__.mcfunction"
+
+        (self.folder / "lib.jmc").write_text("""
+function lib2() {say "lib2";}
+        """)
+        (functions / "manual.mcfunction").write_text("say manual")
+        load.write_text("say edited")
+        (self.folder / "output/data/test/static").mkdir()
+        (self.folder / "output/data/test/static/keep.json").write_text("{}")
+        (self.folder / "main.hjmc").write_text('#static "static"')
+        self.compile()
+        self.assertFalse(lib.exists())
+        self.assertFalse((functions / "manual.mcfunction").exists())
+        self.assertEqual((functions / "lib2.mcfunction").read_text(), "say lib2")
+        self.assertNotEqual(load.read_text(), "say edited")
+        self.assertTrue(
+            (self.folder / "output/data/test/static/keep.json").is_file())
+
+        modified_time = (functions / "lib2.mcfunction").stat().st_mtime_ns
+        compiling.compile_jmc(self.config, is_force_build=True)
+        self.assertEqual(
+            (functions / "lib2.mcfunction").stat().st_mtime_ns, modified_time)
+
+    def test_output_writer_workers(self):
+        outputs = {}
+        for write_workers in (1, 4):
+            output = self.folder / f"output{write_workers}"
+            writer = OutputWriter(
+                output, output / OUTPUT_MANIFEST_FILE_NAME, [output], set())
+            with patch.object(OutputWriter, "write_workers", write_workers):
+                writer.write({(output / f"folder{index % 3}/file{index}.txt").as_posix(): str(index)
+                              for index in range(20)})
+            self.assertEqual(writer.written, 20)
+            outputs[write_workers] = {path.relative_to(output): path.read_text()
+                                      for path in output.glob("folder*/*")}
+        self.assertDictEqual(outputs[1], outputs[4])
+
+        output = self.folder / "output_error"
+        (output / "folder/file3.txt").mkdir(parents=True)
+        (output / "folder/file7.txt").mkdir(parents=True)
+        writer = OutputWriter(
+            output, output / OUTPUT_MANIFEST_FILE_NAME, [output], set())
+        with self.assertRaises(OSError) as error:
+            writer.write({(output / f"folder/file{index}.txt").as_posix(): str(index)
+                          for index in range(10)})
+        self.assertEqual(Path(str(error.exception.filename)).name, "file3.txt")
+        self.assertEqual((output / "folder/file9.txt").read_text(), "9")
+
+    def test_zip_output(self):
+        self.compile()
+        folder_outputs = {path.relative_to(self.config.output).as_posix(): path.read_text()
+                          for path in self.config.output.glob("**/*")
+                          if path.is_file() and path.name != BUILD_RECORD_FILE_NAME
+                          and path.name != OUTPUT_MANIFEST_FILE_NAME}
+
+        self.config.output = self.folder / "pack.zip"
+        self.assertTrue(self.compile())
+        with ZipFile(self.config.output) as zip_file:
+            zip_outputs = {name: zip_file.read(name).decode()
+                           for name in zip_file.namelist()}
+        self.assertIn(f"data/test/{BUILD_RECORD_FILE_NAME}", zip_outputs)
+        del zip_outputs[f"data/test/{BUILD_RECORD_FILE_NAME}"]
+        self.assertDictEqual(zip_outputs, folder_outputs)
+        self.assertFalse(self.compile())
+
+        (self.folder / "lib.jmc").write_text("""
+function lib() {say "changed";}
+        """)
+        self.assertTrue(self.compile())
+        with ZipFile(self.config.output) as zip_file:
+            self.assertEqual(zip_file.read(
+                "data/test/functions/lib.mcfunction").decode(), "say changed")
+
+    def test_streaming(self):
+        (self.folder / "lib.jmc").write_text("""
+function lib() {if ($a == 1) {say "a"; say "b";} else {say "c"; say "d";}}
+function __tick__() {say "tick";}
+class foo {
+    function bar() {while ($a < 3) {$a += 1;}}
+}
+        """)
+        outputs = {}
+        for is_streaming in (False, True):
+            self.config.output = self.folder / f"output_{is_streaming}"
+            with patch.object(Lexer, "__init__", autospec=True, side_effect=Lexer.__init__) as lexer_init:
+                compiling.compile_jmc(
+                    self.config, is_force_build=True, is_streaming=is_streaming)
+            self.assertEqual(
+                lexer_init.call_args.kwargs["stream"] is not None, is_streaming)
+            outputs[is_streaming] = {path.relative_to(self.config.output): path.read_text()
+                                     for path in self.config.output.glob("**/*.mcfunction")}
+        self.assertDictEqual(outputs[False], outputs[True])
+
+        (self.folder / "lib.jmc").write_text("""
+function lib() {say "a";}
+function lib() {say "b";}
+        """)
+        with self.assertRaises(JMCSyntaxException):
+            compiling.compile_jmc(
+                self.config, is_force_build=True, is_streaming=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
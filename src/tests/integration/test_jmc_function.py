@@ -118,6 +118,22 @@ scoreboard players operation __math__.seed __variable__ += __math__.rng.c __vari
 $x = Math.random(min=100,max=1);
         """).build()
 
+    def test_MathRandom_random_command(self):
+        pack = JMCPack().set_pack_format("18").set_jmc_file("""
+$x = Math.random();
+$y = Math.random(min=5, max=10);
+$z = Math.random(min=3, max=3);
+        """).build()
+
+        self.assertEqual(
+            pack.built["VIRTUAL/data/TEST/functions/__load__.mcfunction"],
+            """scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+execute store result score $x __variable__ run random value 1..2147483647
+execute store result score $y __variable__ run random value 5..10
+scoreboard players set $z __variable__ 3"""
+        )
+
 
 class TestBoolFunction(unittest.TestCase):
     def test_TimerIsOver(self):
@@ -688,7 +704,7 @@ scoreboard players enable @s help
 > VIRTUAL/data/TEST/functions/__private__/trigger_setup/1.mcfunction
 tellraw @s {"text":"Cool help commands","color":"gold"}
 > VIRTUAL/data/TEST/functions/__private__/trigger_setup/0.mcfunction
-function TEST:__private__/trigger_setup/1
+execute if score @s help matches 1 run function TEST:__private__/trigger_setup/1
 scoreboard players set @s help 0
 scoreboard players enable @s help
 > VIRTUAL/data/TEST/advancements/__private__/trigger_setup/enable.json
@@ -705,6 +721,16 @@ scoreboard players enable @s help
             """)
         )
 
+    def test_TriggerSetup_inline_arrow_function(self):
+        pack = JMCPack().set_jmc_file("""
+Trigger.setup(help, {1: ()=>{tellraw @s "help";}});
+        """).build()
+
+        self.assertEqual(
+            pack.built["VIRTUAL/data/TEST/functions/__private__/trigger_setup/1.mcfunction"],
+            'tellraw @s "help"'
+        )
+
     def test_TimerAdd(self):
         pack = JMCPack().set_jmc_file("""
 Timer.add(help_cd, runOnce, @a, ()=>{
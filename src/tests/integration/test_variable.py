@@ -149,6 +149,108 @@ execute store result score @s obj run scoreboard players get $x __variable__
 $x.get(key=value);
         """).build()
 
+    def test_expression(self):
+        pack = JMCPack().set_jmc_file("""
+$x = -3;
+$y = 2 * (3 + 4) - 10 / 3;
+$x = $a * 3 + $b/$c;
+$x = ($a + 1) * ($b - 2) - $c % $d;
+$x = $a - $x * 3;
+$x = $x + 1 + 2;
+execute as @a run $z = obj:@s * 3 + $a;
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+scoreboard players set 3 __int__ 3
+scoreboard players set $x __variable__ -3
+scoreboard players set $y __variable__ 11
+scoreboard players operation $x __variable__ = $a __variable__
+scoreboard players operation $x __variable__ *= 3 __int__
+scoreboard players operation __expr__.0 __variable__ = $b __variable__
+scoreboard players operation __expr__.0 __variable__ /= $c __variable__
+scoreboard players operation $x __variable__ += __expr__.0 __variable__
+scoreboard players operation $x __variable__ = $a __variable__
+scoreboard players add $x __variable__ 1
+scoreboard players operation __expr__.0 __variable__ = $b __variable__
+scoreboard players remove __expr__.0 __variable__ 2
+scoreboard players operation $x __variable__ *= __expr__.0 __variable__
+scoreboard players operation __expr__.0 __variable__ = $c __variable__
+scoreboard players operation __expr__.0 __variable__ %= $d __variable__
+scoreboard players operation $x __variable__ -= __expr__.0 __variable__
+scoreboard players operation __expr__.0 __variable__ = $x __variable__
+scoreboard players operation __expr__.0 __variable__ *= 3 __int__
+scoreboard players operation $x __variable__ = $a __variable__
+scoreboard players operation $x __variable__ -= __expr__.0 __variable__
+scoreboard players add $x __variable__ 3
+execute as @a run function TEST:__private__/expression/0
+> VIRTUAL/data/TEST/functions/__private__/expression/0.mcfunction
+scoreboard players operation $z __variable__ = @s obj
+scoreboard players operation $z __variable__ *= 3 __int__
+scoreboard players operation $z __variable__ += $a __variable__
+            """)
+        )
+
+    def test_expression_unary_minus(self):
+        pack = JMCPack().set_jmc_file("""
+$y = $a - -$c;
+$y = ($a + 1) * ($b - 2) - -$c;
+        """).build()
+
+        self.assertDictEqual(
+            pack.built,
+            string_to_tree_dict("""
+> VIRTUAL/data/minecraft/tags/functions/load.json
+{
+  "values": [
+    "TEST:__load__"
+  ]
+}
+> VIRTUAL/data/TEST/functions/__load__.mcfunction
+scoreboard objectives add __variable__ dummy
+scoreboard objectives add __int__ dummy
+scoreboard players set -1 __int__ -1
+scoreboard players operation $y __variable__ = $a __variable__
+scoreboard players operation __expr__.0 __variable__ = $c __variable__
+scoreboard players operation __expr__.0 __variable__ *= -1 __int__
+scoreboard players operation $y __variable__ -= __expr__.0 __variable__
+scoreboard players operation $y __variable__ = $a __variable__
+scoreboard players add $y __variable__ 1
+scoreboard players operation __expr__.0 __variable__ = $b __variable__
+scoreboard players remove __expr__.0 __variable__ 2
+scoreboard players operation $y __variable__ *= __expr__.0 __variable__
+scoreboard players operation __expr__.0 __variable__ = $c __variable__
+scoreboard players operation __expr__.0 __variable__ *= -1 __int__
+scoreboard players operation $y __variable__ -= __expr__.0 __variable__
+            """)
+        )
+
+    def test_expression_error(self):
+        with self.assertRaises(JMCSyntaxException):
+            JMCPack().set_jmc_file("""
+$x = $a + ;
+        """).build()
+
+        with self.assertRaises(JMCSyntaxException):
+            JMCPack().set_jmc_file("""
+$x = ($a + 1) $b;
+        """).build()
+
+        with self.assertRaises(JMCSyntaxException):
+            JMCPack().set_jmc_file("""
+$x = $a / (2 - 2);
+        """).build()
+
 
 if __name__ == '__main__':
     unittest.main()
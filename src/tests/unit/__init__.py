@@ -1,4 +1,5 @@
 from types import ModuleType as __ModuleType
-from . import test_tokenizer, test_utils
+from . import test_tokenizer, test_utils, test_command_ir
 ALL: tuple[__ModuleType, ...] = (test_tokenizer,
-                                 test_utils)
+                                 test_utils,
+                                 test_command_ir)
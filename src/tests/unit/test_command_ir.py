@@ -0,0 +1,210 @@
+import sys  # noqa
+sys.path.append('./src')  # noqa
+import unittest
+
+from jmc.compile.command_ir import (Execute, FunctionCall, RawCommand, ScoreboardPlayers,
+                                    optimize_command, parse_command, split_arguments)
+from jmc.compile.datapack import Function
+from jmc.compile.lexer_func_content import optimize_commands
+from jmc.compile.optimizer import Optimizer
+
+
+class TestParseCommand(unittest.TestCase):
+    def test_split_arguments(self):
+        self.assertListEqual(
+            split_arguments('tp @a[tag=a b,scores={x=1}] ~ ~1 ~'),
+            ['tp', '@a[tag=a b,scores={x=1}]', '~', '~1', '~'])
+        self.assertListEqual(
+            split_arguments('tellraw @a "a b"'), ['tellraw', '@a', '"a b"'])
+        self.assertIsNone(split_arguments('say a  b'))
+        self.assertIsNone(split_arguments('data merge storage a {a:"}'))
+
+    def test_types(self):
+        self.assertEqual(
+            parse_command('function TEST:a/b'), FunctionCall('TEST:a/b'))
+        self.assertEqual(
+            parse_command('function TEST:a {x:1}'), FunctionCall('TEST:a', '{x:1}'))
+        self.assertEqual(
+            parse_command('scoreboard players operation $a __variable__ += $b __variable__'),
+            ScoreboardPlayers('operation', '$a', '__variable__', ('+=', '$b', '__variable__')))
+        self.assertEqual(
+            parse_command('scoreboard players reset @s'), ScoreboardPlayers('reset', '@s', ''))
+        self.assertEqual(
+            parse_command(
+                'execute as @a if score @s obj matches 1.. positioned ~ ~1 ~ run function TEST:a'),
+            Execute(('as @a', 'if score @s obj matches 1..', 'positioned ~ ~1 ~'), FunctionCall('TEST:a')))
+        self.assertEqual(
+            parse_command('execute store result score $a obj if entity @a'),
+            Execute(('store result score $a obj', 'if entity @a')))
+        self.assertEqual(parse_command('say hello'), RawCommand('say hello'))
+        self.assertEqual(
+            parse_command('execute unknown @s run say a'), RawCommand('execute unknown @s run say a'))
+
+    def test_round_trip(self):
+        for string in (
+            'execute if data storage a:b {x:"a b"} run tellraw @a {"text":"a b"}',
+            'execute facing entity @p eyes rotated ~ 0 run tp @s ^ ^ ^1',
+            'scoreboard players set $a obj 1',
+            'function a:b',
+            'say a',
+            '',
+        ):
+            self.assertEqual(str(parse_command(string)), string)
+
+
+class TestOptimizeCommand(unittest.TestCase):
+    def test_optimize(self):
+        self.assertEqual(
+            str(optimize_command(parse_command('execute run say a'))), 'say a')
+        self.assertEqual(
+            str(optimize_command(parse_command(
+                'execute as @s run execute at @s run execute run say a'))),
+            'execute if entity @s at @s run say a')
+        self.assertEqual(
+            str(optimize_command(parse_command('execute positioned as @s run say a'))),
+            'execute positioned as @s run say a')
+        command = parse_command('execute as @a run say a')
+        self.assertIs(optimize_command(command), command)
+
+    def test_optimize_commands(self):
+        self.assertEqual(
+            optimize_commands(['execute', 'as', '@s', 'run', 'execute', 'run', 'say', 'a'], set()),
+            'execute if entity @s run say a')
+        # Commands made by JMC are kept as is, only the part written by the user is optimized
+        self.assertEqual(
+            optimize_commands(
+                ['execute', 'as', '@s', 'run', 'execute as @s run say a\nexecute run say b'], {4}),
+            'execute if entity @s run execute as @s run say a\nexecute run say b')
+        self.assertEqual(
+            optimize_commands(['execute run say a'], {0}), 'execute run say a')
+        # Private count marks of hashed private names aren't mistaken for placeholders
+        self.assertEqual(
+            optimize_commands(['execute', 'if', 'function', 'TEST:__private__/\x00if_else\x000\x00', 'run', 'say a'], {5}),
+            'execute if function TEST:__private__/\x00if_else\x000\x00 run say a')
+
+
+class TestOptimizer(unittest.TestCase):
+    def optimize(self, optimizations: set[str], lines: list[str]) -> tuple[list[str], Optimizer]:
+        optimizer = Optimizer(optimizations)
+        return [str(command) for command in optimizer.optimize(
+            [parse_command(line) for line in lines])], optimizer
+
+    def test_merge_score_add(self):
+        lines, optimizer = self.optimize({'merge_score_add'}, [
+            'scoreboard players add $a obj 5',
+            'scoreboard players remove $a obj 7',
+            'scoreboard players add $b obj 1',
+            'scoreboard players add @a obj 1',
+            'scoreboard players add @a obj 1',
+        ])
+        self.assertListEqual(lines, [
+            'scoreboard players remove $a obj 2',
+            'scoreboard players add $b obj 1',
+            'scoreboard players add @a obj 1',
+            'scoreboard players add @a obj 1',
+        ])
+        self.assertEqual(optimizer.hits['merge_score_add'], 1)
+        self.assertEqual(optimizer.hits['drop_overwritten_set'], 0)
+
+    def test_drop_overwritten_set(self):
+        lines, optimizer = self.optimize({'drop_overwritten_set'}, [
+            'scoreboard players set $a obj 1',
+            'scoreboard players add $a obj 1',
+            'scoreboard players set $a obj 3',
+            'scoreboard players set $a obj2 3',
+        ])
+        self.assertListEqual(lines, [
+            'scoreboard players set $a obj 3',
+            'scoreboard players set $a obj2 3',
+        ])
+        self.assertEqual(optimizer.hits['drop_overwritten_set'], 2)
+        self.assertEqual(optimizer.report(), 'drop_overwritten_set 2')
+
+    def test_fold_constants(self):
+        optimizer = Optimizer({'fold_constants'}, '__int__')
+        lines = [str(command) for command in optimizer.optimize([parse_command(line) for line in [
+            'scoreboard players set $a obj 7',
+            'scoreboard players operation $a obj /= -2 __int__',
+            'scoreboard players set $b obj 2147483647',
+            'scoreboard players add $b obj 1',
+            'scoreboard players operation $c obj = $a obj',
+            'scoreboard players operation $c obj %= 0 __int__',
+            'execute if score $a obj matches ..-4 if entity @a run say a',
+            'execute unless score $a obj < $b obj run say b',
+            'execute store result score $a obj run say c',
+            'scoreboard players add $a obj 1',
+            'function ns:func',
+            'scoreboard players add $b obj 1',
+        ]])]
+        self.assertListEqual(lines, [
+            'scoreboard players set $a obj -4',
+            'scoreboard players set $b obj -2147483648',
+            'scoreboard players set $c obj -4',
+            'scoreboard players operation $c obj %= 0 __int__',
+            'execute if entity @a run say a',
+            'say b',
+            'execute store result score $a obj run say c',
+            'scoreboard players add $a obj 1',
+            'function ns:func',
+            'scoreboard players add $b obj 1',
+        ])
+        self.assertEqual(optimizer.hits['fold_constants'], 5)
+
+    def test_disabled(self):
+        lines, _ = self.optimize(set(), [
+            'execute run say a',
+            'scoreboard players set $a obj 1',
+            'scoreboard players set $a obj 1',
+        ])
+        self.assertListEqual(lines, [
+            'execute run say a',
+            'scoreboard players set $a obj 1',
+            'scoreboard players set $a obj 1',
+        ])
+
+    def test_inline_call(self):
+        optimizer = Optimizer({'inline'})
+        location = 'TEST:__private__/a/0'
+
+        def inline_call(line: str, lines: list[str]) -> list[str] | None:
+            commands = optimizer.inline_call(parse_command(line), location, [
+                parse_command(line_) for line_ in lines])
+            return None if commands is None else [str(command) for command in commands]
+
+        self.assertListEqual(
+            inline_call(f'function {location}', ['say a', 'say b']), ['say a', 'say b'])
+        self.assertListEqual(
+            inline_call(f'execute as @a run function {location}', ['execute at @s run say a']),
+            ['execute as @a at @s run say a'])
+        self.assertListEqual(
+            inline_call(f'execute if score $x obj matches 1 run function {location}', ['say a', 'say b']),
+            ['execute if score $x obj matches 1 run say a', 'execute if score $x obj matches 1 run say b'])
+        # Condition is changed by the function
+        self.assertIsNone(
+            inline_call(f'execute if score $x obj matches 1 run function {location}', ['say a', 'scoreboard players add $x obj 1']))
+        self.assertIsNone(
+            inline_call(f'execute as @a run function {location}', ['say a', 'say b']))
+        self.assertIsNone(
+            inline_call(f'execute store result score $y obj run function {location}', ['say a']))
+        self.assertIsNone(
+            inline_call(f'function {location}', ['say a', 'return 1']))
+        self.assertIsNone(
+            inline_call(f'function {location}', ['say a'] * 5))
+        self.assertIsNone(
+            inline_call(f'function {location}/1', ['say a']))
+
+
+class TestFunction(unittest.TestCase):
+    def test_commands(self):
+        func = Function(['say a\nfunction a:b', 'execute as @a run function a:c'])
+        func.add_empty_line()
+        self.assertIsInstance(func.commands[1], FunctionCall)
+        self.assertIsInstance(func.commands[2], Execute)
+        self.assertListEqual(
+            func.lines, ['say a', 'function a:b', 'execute as @a run function a:c', ''])
+        self.assertEqual(
+            func.content, 'say a\nfunction a:b\nexecute as @a run function a:c\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ sys.path.append('./src')  # noqa
 import unittest
 
 import random
+import warnings
 from jmc.compile import tokenizer, JMCSyntaxException, JMCSyntaxWarning
 
 
@@ -11,6 +12,10 @@ class Tokenizer(tokenizer.Tokenizer):
         super().__init__(raw_string, '')
 
 
+class CharTokenizer(tokenizer.Tokenizer):
+    is_fast_scan = False
+
+
 class TestTokenizer(unittest.TestCase):
     SAMPLE = [
         'tp',
@@ -109,5 +114,210 @@ class TestTokenizer(unittest.TestCase):
             Tokenizer('"HELLO\nWORLD;"')
 
 
+class TestFastScan(unittest.TestCase):
+    SAMPLE = [
+        'tp @s ~ ~1 ~;',
+        'function test() {\n    say "Hello World";\n}',
+        'if ($a > 1 && !$b matches 2..3) {\n    tellraw @a "//not a comment";\n} else {\n    $x += 1;\n}',
+        '// comment\n# hash comment\n$a = 1; // trailing\nsay hi;',
+        "tellraw @a {'text': 'a\\'b', \"color\": \"red\"};",
+        'data merge entity @s {Tags:[I;1,2,3], Name:\'{"text":"x"}\'};',
+        'a/ /b;',
+        'a/b/c;\n/ /x;',
+        'execute as @a[tag=x,scores={a=1..}] run say 1;',
+        'class a {\n    function b() {\n        $c = d;\n    }\n}',
+        '"unclosed',
+        '{{}',
+        '{}{}}',
+        'x;;',
+        '{};',
+        'say "a\nb";',
+        '(a "b)" \'c]\' # x\n)',
+        '{a // }\n}',
+        '{\n# }\n}',
+        "{'a\\'}'}",
+        'x\t\r\x0b\x0c\u3000y;',
+        'keyword without semicolon',
+    ]
+    FRAGMENTS = ['a', 'I', ' ', '\n', '/', '//', '#', '"', "'", '\\', ';', ',',
+                 '(', ')', '[', ']', '{', '}', 'x:y.z', '@s', '\t']
+
+    def assertSameResult(self, string: str, **kwargs) -> None:
+        results = []
+        for tokenizer_type in (CharTokenizer, tokenizer.Tokenizer):
+            try:
+                results.append([
+                    [(token.token_type, token.line, token.col, token.string)
+                     for token in program]
+                    for program in tokenizer_type(string, '', **kwargs).programs
+                ])
+            except Exception as error:  # pylint: disable=broad-except
+                results.append((type(error), str(error)))
+        self.assertEqual(results[0], results[1], msg=repr(string))
+
+    def test_sample(self):
+        for string in self.SAMPLE:
+            self.assertSameResult(string)
+            self.assertSameResult(string, expect_semicolon=False)
+            self.assertSameResult(string, line=3, col=5)
+
+    def test_fuzz(self):
+        fuzz = random.Random(0)
+        with warnings.catch_warnings():
+            # literal_eval warns about invalid escapes from random backslashes
+            warnings.simplefilter('ignore', DeprecationWarning)
+            for _ in range(2000):
+                string = ''.join(fuzz.choices(
+                    self.FRAGMENTS, k=fuzz.randint(1, 30)))
+                self.assertSameResult(string)
+                self.assertSameResult(string, expect_semicolon=False,
+                                      allow_semicolon=True)
+
+
+class TestParenChildren(unittest.TestCase):
+    def get_result(self, function, *args, **kwargs):
+        try:
+            return [
+                [(token.token_type, token.line, token.col, token.string)
+                 for token in program]
+                for program in function(*args, **kwargs).programs
+            ]
+        except Exception as error:  # pylint: disable=broad-except
+            return (type(error), str(error))
+
+    def assertSameChildren(self, string: str) -> None:
+        try:
+            tokenizer_ = tokenizer.Tokenizer(string, '')
+        except Exception:  # pylint: disable=broad-except
+            return
+        stack = [token for program in tokenizer_.programs for token in program]
+        while stack:
+            token = stack.pop()
+            if token.children is None:
+                continue
+            stack.extend(token.children)
+            for kwargs in ({"expect_semicolon": True},
+                           {"expect_semicolon": False},
+                           {"expect_semicolon": False, "allow_semicolon": True}):
+                self.assertEqual(
+                    self.get_result(tokenizer_.tokenize_paren,
+                                    token, **kwargs),
+                    self.get_result(tokenizer.Tokenizer, token.string[1:-1], '',
+                                    token.line, token.col + 1, string, **kwargs),
+                    msg=repr(token.string)
+                )
+
+    def test_children(self):
+        tokenizer_ = Tokenizer('a {b (c [d]) e;} f;')
+        paren_curly = tokenizer_.programs[0][1]
+        self.assertEqual(paren_curly.string, '{b (c [d]) e;}')
+        self.assertListEqual(
+            [token.string for token in paren_curly.children],
+            ['b', '(c [d])', 'e', ';'])
+        self.assertListEqual(
+            [token.string for token in paren_curly.children[1].children],
+            ['c', '[d]'])
+
+    def test_irregular_paren(self):
+        tokenizer_ = Tokenizer('tellraw @a {"text":"http://example.com"}')
+        self.assertIsNone(tokenizer_.programs[0][2].children)
+        tokenizer_ = Tokenizer('a (b ]);')
+        self.assertIsNone(tokenizer_.programs[0][1].children)
+
+    def test_sample(self):
+        for string in TestFastScan.SAMPLE:
+            self.assertSameChildren(string)
+
+    def test_fuzz(self):
+        fuzz = random.Random(1)
+        with warnings.catch_warnings():
+            # literal_eval warns about invalid escapes from random backslashes
+            warnings.simplefilter('ignore', DeprecationWarning)
+            for _ in range(2000):
+                self.assertSameChildren('{' + ''.join(fuzz.choices(
+                    TestFastScan.FRAGMENTS, k=fuzz.randint(1, 30))) + '}')
+
+
+class TestTokenStream(unittest.TestCase):
+    def test_stream_token(self):
+        tokenizer_ = Tokenizer('a "b" {c;}')
+        keyword, string, paren_curly = tokenizer_.programs[0]
+        self.assertIsInstance(keyword, tokenizer.StreamToken)
+        self.assertIs(keyword.stream, paren_curly.stream)
+        self.assertEqual((keyword.token_type, keyword.line, keyword.col, keyword.string),
+                         (tokenizer.TokenType.KEYWORD, 1, 1, 'a'))
+        self.assertEqual((string.token_type, string.col, string.string),
+                         (tokenizer.TokenType.STRING, 3, 'b'))
+        self.assertEqual(paren_curly.string, '{c;}')
+        self.assertListEqual(
+            [(token.token_type, token.col, token.string)
+             for token in paren_curly.children],
+            [(tokenizer.TokenType.KEYWORD, 8, 'c'),
+             (tokenizer.TokenType.SEMICOLON, 9, ';')])
+
+    def test_truncate(self):
+        stream = tokenizer.TokenStream('a b')
+        stream.append(tokenizer.TokenType.KEYWORD, 1, 1, 0, 1)
+        stream.append(tokenizer.TokenType.KEYWORD, 1, 3, 2, 3)
+        stream.append(tokenizer.TokenType.STRING, 1, 3, 2, 3, 'c')
+        stream.truncate(1)
+        self.assertEqual(len(stream.types), 1)
+        self.assertEqual(tokenizer.StreamToken(stream, 0).string, 'a')
+        self.assertEqual(
+            stream.append(tokenizer.TokenType.KEYWORD, 1, 3, 2, 3), 1)
+        self.assertEqual(tokenizer.StreamToken(stream, 1).string, 'b')
+
+    def test_length(self):
+        for string in TestFastScan.SAMPLE:
+            try:
+                tokenizer_ = Tokenizer(string)
+            except Exception:  # pylint: disable=broad-except
+                continue
+            stack = [token for program in tokenizer_.programs
+                     for token in program]
+            while stack:
+                token = stack.pop()
+                copy = tokenizer.Token(
+                    token.token_type, token.line, token.col, token.string)
+                self.assertEqual(token.length, copy.length)
+                self.assertEqual(token.get_end(), copy.get_end())
+                stack.extend(token.children or [])
+
+
+class TestLineIndex(unittest.TestCase):
+    def test_get_line(self):
+        for string in ('', 'a', 'a\n', '\nb\n\ncd', 'ab\ncd\nef'):
+            line_index = tokenizer.LineIndex(string)
+            lines = string.split('\n')
+            self.assertEqual(len(line_index), len(lines))
+            for line in range(-len(lines) + 1, len(lines) + 1):
+                self.assertEqual(line_index.get_line(line), lines[line - 1])
+            with self.assertRaises(IndexError):
+                line_index.get_line(len(lines) + 1)
+
+    def test_get_pos(self):
+        string = 'ab\ncd\n\nef'
+        line_index = tokenizer.LineIndex(string)
+        for offset in range(len(string) + 1):
+            line = string.count('\n', 0, offset) + 1
+            col = offset - (string.rfind('\n', 0, offset) + 1) + 1
+            self.assertEqual(line_index.get_pos(offset), (line, col))
+            self.assertEqual(line_index.get_offset(line, col), offset)
+
+    def test_tokenizer_line_index(self):
+        string = 'say "a";\nsay "b";'
+        tokenizer_ = Tokenizer(string)
+        line_index = tokenizer_.line_index
+        self.assertIs(tokenizer_.line_index, line_index)
+        self.assertEqual(line_index.get_line(2), 'say "b";')
+        self.assertIsNot(Tokenizer(string).line_index, line_index)
+
+    def test_tokenize_paren_line_index(self):
+        tokenizer_ = Tokenizer('function a() {\n    say "a";\n}')
+        child = tokenizer_.tokenize_paren(tokenizer_.programs[0][3])
+        self.assertIs(child.line_index, tokenizer_.line_index)
+        self.assertEqual(child.line_index.get_line(2), '    say "a";')
+
+
 if __name__ == '__main__':
     unittest.main()